@@ -0,0 +1,71 @@
+import numpy as np
+
+from .mapa import map_gps_to_css
+
+# --- ALMACÉN DE BANCOS (STRUCT-OF-ARRAYS) ---
+# Lo que el ruteo, el mapa y la biomasa leen de cada banco, en arrays contiguos
+# que se arman una vez por dataset (fila i = banco i = índice i de la matriz):
+#   ids int32, lat/lon/toneladas float32, x/y CSS float32 (ya con el OFFSET
+#   visual) y la máscara "visible en el mapa". Los arrays quedan de solo lectura
+#   y las demás estructuras (índice espacial, capa del mapa, rejilla) los comparten
+#   en lugar de guardar cada una su copia float64. El DataFrame queda solo para
+#   la exportación (todas las columnas).
+# ESQUEMA: nombre normalizado -> nombres de columna aceptados (en minúsculas).
+ESQUEMA = {
+    "id": ("id banco", "id"),
+    "latitud": ("latitud",),
+    "longitud": ("longitud",),
+    "toneladas": ("toneladas estimadas", "toneladas"),
+}
+DECIMALES_COORD = 6  # float32 guarda ~7 cifras: al responder se redondea a lo que trae el archivo
+
+def columnas_normalizadas(df):
+    # {nombre normalizado: columna real del DataFrame o None}
+    cols = {c.lower(): c for c in df.columns}
+    return {k: next((cols[n] for n in nombres if n in cols), None) for k, nombres in ESQUEMA.items()}
+
+def _solo_lectura(v):
+    v.flags.writeable = False
+    return v
+
+class AlmacenBancos:
+    __slots__ = ("columnas", "ids", "lat", "lon", "toneladas", "x", "y", "visible")
+
+    def __init__(self, df, offset_x=0.0):
+        self.columnas = columnas_normalizadas(df)
+        def columna(nombre, dtype):
+            c = self.columnas[nombre]
+            return df[c].to_numpy(dtype=dtype) if c else np.zeros(len(df), dtype=dtype)
+
+        ids = columna("id", np.int64) if self.columnas["id"] else np.arange(len(df), dtype=np.int64)
+        tipo_id = np.int32 if not len(ids) or (ids.min() >= np.iinfo(np.int32).min and ids.max() <= np.iinfo(np.int32).max) else np.int64
+        self.ids = _solo_lectura(ids.astype(tipo_id))
+        lat, lon = columna("latitud", np.float64), columna("longitud", np.float64)
+        self.lat = _solo_lectura(lat.astype(np.float32))
+        self.lon = _solo_lectura(lon.astype(np.float32))
+        self.toneladas = _solo_lectura(columna("toneladas", np.float32))
+        # x/y y la máscara se calculan con las coordenadas originales (float64)
+        x, y = map_gps_to_css(lat, lon)
+        x = x - offset_x
+        self.visible = _solo_lectura((x >= 0) & (x <= 100) & (y >= 0) & (y <= 100))
+        self.x = _solo_lectura(x.astype(np.float32))
+        self.y = _solo_lectura(y.astype(np.float32))
+
+    @classmethod
+    def desde_arrays(cls, columnas, **arrays):
+        # Arrays ya armados (p. ej. memory-map del snapshot compartido, ver compartido.py)
+        almacen = cls.__new__(cls)
+        almacen.columnas = columnas
+        for k, v in arrays.items(): setattr(almacen, k, v)
+        return almacen
+
+    def __len__(self):
+        return len(self.ids)
+
+    def nbytes(self):
+        return sum(getattr(self, k).nbytes for k in self.__slots__ if k != "columnas")
+
+    def coordenadas(self, idx):
+        # lat/lon float64 redondeadas para las respuestas
+        return (np.round(self.lat[idx].astype(np.float64), DECIMALES_COORD),
+                np.round(self.lon[idx].astype(np.float64), DECIMALES_COORD))
@@ -0,0 +1,76 @@
+import time
+import threading
+from contextlib import contextmanager
+from . import bitacora
+from .metricas import CARGA_FASES
+
+log = bitacora.obtener(__name__)
+
+# --- ESTADO DEL ARRANQUE EN SEGUNDO PLANO ---
+# load_data corre en un hilo aparte; cada fase deja aquí su estado para que
+# /health y /ready lo reporten mientras la API ya acepta conexiones.
+PENDIENTE, EN_CURSO, LISTO, ERROR = "PENDIENTE", "EN_CURSO", "LISTO", "ERROR"
+
+class EstadoArranque:
+    def __init__(self, fases, requeridas):
+        self._lock = threading.Lock()
+        self.inicio = time.time()
+        self.fases = {f: {"estado": PENDIENTE, "segundos": None, "detalle": None} for f in fases}
+        self.requeridas = set(requeridas)
+        self.terminado = False
+
+    @contextmanager
+    def fase(self, nombre):
+        # Un error en una fase se registra y no corta el arranque: las siguientes
+        # fases siguen con lo que haya (igual que el load_data original)
+        t0 = time.perf_counter()
+        with self._lock: self.fases[nombre].update(estado=EN_CURSO)
+        try:
+            yield self.fases[nombre]
+        except Exception as e:
+            segundos = round(time.perf_counter() - t0, 3)
+            log.error(f"Error en la fase {nombre}: {e}", exc_info=True, extra={"campos": {"fase": nombre, "segundos": segundos}})
+            with self._lock:
+                self.fases[nombre].update(estado=ERROR, segundos=segundos, detalle=str(e))
+            CARGA_FASES.set(segundos, fase=nombre)
+            return
+        segundos = round(time.perf_counter() - t0, 3)
+        with self._lock:
+            self.fases[nombre].update(estado=LISTO, segundos=segundos)
+        CARGA_FASES.set(segundos, fase=nombre)
+        log.info(f"Fase {nombre} lista", extra={"campos": {"fase": nombre, "segundos": segundos}})
+
+    def marcar(self, nombre, estado=LISTO, detalle=None):
+        # Fase resuelta fuera de este proceso (p. ej. la armó otro worker, ver compartido.py)
+        with self._lock: self.fases[nombre].update(estado=estado, segundos=0.0, detalle=detalle)
+
+    def finalizar(self):
+        with self._lock: self.terminado = True
+
+    def fase_terminada(self, nombre):
+        with self._lock: return self.fases[nombre]["estado"] in (LISTO, ERROR)
+
+    @property
+    def listo(self):
+        # Listo cuando todas las fases requeridas terminaron (bien o con error controlado)
+        with self._lock:
+            return all(self.fases[f]["estado"] in (LISTO, ERROR) for f in self.requeridas)
+
+    def resumen(self):
+        with self._lock:
+            return {
+                "listo": all(self.fases[f]["estado"] in (LISTO, ERROR) for f in self.requeridas),
+                "terminado": self.terminado,
+                "segundos_desde_inicio": round(time.time() - self.inicio, 1),
+                "fases": {f: dict(v) for f, v in self.fases.items()},
+            }
+
+@contextmanager
+def medir_fase(nombre):
+    # Igual que EstadoArranque.fase (log + métrica) pero un error sí corta: en una
+    # recarga es preferible conservar el dataset anterior que publicar uno a medias
+    t0 = time.perf_counter()
+    yield {}
+    segundos = round(time.perf_counter() - t0, 3)
+    CARGA_FASES.set(segundos, fase=nombre)
+    log.info(f"Fase {nombre} lista", extra={"campos": {"fase": nombre, "segundos": segundos}})
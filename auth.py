@@ -2,6 +2,14 @@ from passlib.context import CryptContext
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
 from typing import Optional
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import os
+import time
+import asyncio
+import threading
+from .cache import CacheTTL
+from .metricas import AUTH, AUTH_RECHAZOS
 
 # --- CONFIGURACIÓN DE SEGURIDAD ---
 SECRET_KEY = "ringensoft_secret_key_super_segura" # En prod esto va en variables de entorno
@@ -18,6 +26,34 @@ def verificar_password(plain_password, hashed_password):
 def encriptar_password(password):
     return pwd_context.hash(password)
 
+# Versiones para endpoints async: bcrypt corre en su propio pool acotado, así una
+# ráfaga de logins no ocupa los hilos con los que FastAPI atiende las rutas.
+# Si hay más de BCRYPT_HILOS + BCRYPT_COLA_MAX operaciones pendientes se
+# rechaza de inmediato (AuthSaturado -> 503) en lugar de encolar sin límite.
+BCRYPT_HILOS = int(os.getenv("RINGEN_BCRYPT_HILOS", min(4, os.cpu_count() or 1)))
+BCRYPT_COLA_MAX = int(os.getenv("RINGEN_BCRYPT_COLA_MAX", 64))
+_ejecutor_bcrypt = ThreadPoolExecutor(max_workers=BCRYPT_HILOS, thread_name_prefix="bcrypt")
+_cupos_bcrypt = threading.BoundedSemaphore(BCRYPT_HILOS + BCRYPT_COLA_MAX)
+
+class AuthSaturado(Exception):
+    pass
+
+async def _en_ejecutor_bcrypt(operacion, fn, *args):
+    if not _cupos_bcrypt.acquire(blocking=False):
+        AUTH_RECHAZOS.inc(operacion=operacion)
+        raise AuthSaturado()
+    try:
+        with AUTH.medir(operacion=operacion):
+            return await asyncio.get_running_loop().run_in_executor(_ejecutor_bcrypt, fn, *args)
+    finally:
+        _cupos_bcrypt.release()
+
+async def verificar_password_async(plain_password, hashed_password):
+    return await _en_ejecutor_bcrypt("verificar_password", verificar_password, plain_password, hashed_password)
+
+async def encriptar_password_async(password):
+    return await _en_ejecutor_bcrypt("encriptar_password", encriptar_password, password)
+
 # 2. Crear Token de Acceso (JWT)
 def crear_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -36,4 +72,40 @@ def decodificar_token(token: str):
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+
+# 4. Caché de principales (token -> usuario ya resuelto)
+# Evita decodificar el JWT y consultar la tabla usuarios en cada petición. Se
+# guarda una copia plana del usuario (no el objeto ORM, que queda ligado a la
+# sesión de la petición que lo cargó) junto con el vencimiento del token.
+Principal = namedtuple("Principal", ["id_usuario", "username", "nombre_completo", "rol"])
+PRINCIPALES_MAX = 4096
+PRINCIPALES_TTL_SEGUNDOS = 60
+principales = CacheTTL(max_entradas=PRINCIPALES_MAX, ttl_segundos=PRINCIPALES_TTL_SEGUNDOS)
+
+def principal_de(usuario):
+    return Principal(usuario.id_usuario, usuario.username, usuario.nombre_completo, usuario.rol)
+
+async def obtener_principal(token, cargar):
+    # cargar(payload) -> corrutina que devuelve el Principal (o None). None si el token no vale.
+    # Solo se cachean los tokens que resuelven a un usuario: los inválidos o vencidos no
+    # desplazan a los buenos del LRU (decodificarlos de nuevo es barato, no hay bcrypt)
+    async def calcular():
+        payload = decodificar_token(token)
+        if payload is None: return None, 0
+        return await cargar(payload), payload.get("exp", 0)
+    principal, expira = await principales.obtener_o_calcular_async(token, calcular, cachear=lambda v: v[0] is not None)
+    if principal is None or expira <= time.time(): return None
+    return principal
+
+def _username_de_token(token):
+    # Solo se cachean tokens que ya se validaron: basta leer el "sub" sin verificar la firma
+    try:
+        return jwt.get_unverified_claims(token).get("sub")
+    except JWTError:
+        return None
+
+def invalidar_usuario(*usernames):
+    # Saca del caché solo los tokens de esos usuarios; el resto de sesiones sigue cacheada
+    usernames = set(usernames)
+    principales.invalidar(lambda token: _username_de_token(token) in usernames)
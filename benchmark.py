@@ -0,0 +1,320 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import numpy as np
+
+# --- BENCHMARK CON DATOS SINTÉTICOS ---
+# Genera bancos (sobre el mar peruano, cerca de la costa), puertos y flota de
+# distintos tamaños, levanta la API con TestClient sobre SQLite y mide:
+#   - las fases de load_data (arranque en frío y con la caché columnar ya hecha)
+#   - la construcción de la matriz de distancias
+#   - calcular_ruta por fases (greedy, búsqueda local, consumo) y de punta a punta
+#   - GET /bancos y GET /reportes/dashboard
+# Cada tamaño corre en su propio proceso (un tamaño que no entra en memoria no
+# tumba al resto). Si la matriz N x N supera --memoria-max-gb, ese tamaño corre
+# en modo "sin_matriz": solo lo que no depende de ella (lectura de bancos,
+# almacén, índice espacial, capa del mapa, rejilla y la consulta de /bancos).
+# El resultado es un JSON comparable entre commits:
+#   python -m <paquete>.benchmark --salida bench.json
+#   python -m <paquete>.benchmark --base bench_anterior.json --umbral 0.25
+TAMANOS = [10_000, 100_000, 1_000_000]
+BARCOS = 2000
+REPETICIONES = 20
+UMBRAL_REGRESION = 0.25   # +25% sobre la mediana de la base
+MIN_DIFERENCIA_MS = 1.0   # diferencias menores se consideran ruido
+MEMORIA_MAX_GB = 8.0      # tope para la matriz N x N (float32)
+SEMILLA = 42
+PAQUETE = __package__ or os.path.basename(os.path.dirname(os.path.abspath(__file__)))
+PUERTOS = ['CHIMBOTE', 'CALLAO', 'PISCO', 'PAITA', 'ILO', 'MATARANI', 'VEGUETA', 'TAMBO DE MORA',
+           'COISHCO', 'SAMANCO', 'SUPE', 'CHANCAY', 'MALABRIGO', 'BAYOVAR', 'CHAMA']
+
+# --- DATOS SINTÉTICOS ---
+def generar_bancos(n, rng):
+    from . import litoral
+    lats, lons = [], []
+    faltan = n
+    while faltan > 0:
+        lat = rng.uniform(-18.3, -3.6, faltan * 4)
+        lon = rng.uniform(-83.0, -70.0, faltan * 4)
+        # En el mar y a menos de ~3° de la costa (como los avistamientos reales)
+        ok = litoral.es_en_mar(lat, lon) & ~litoral.es_en_mar(lat, lon + 3.0)
+        lats.append(lat[ok][:faltan]); lons.append(lon[ok][:faltan])
+        faltan -= len(lats[-1])
+    import pandas as pd
+    lat, lon = np.concatenate(lats), np.concatenate(lons)
+    return pd.DataFrame({
+        'ID Banco': np.arange(1, n + 1),
+        'Latitud': lat.round(6), 'Longitud': lon.round(6),
+        'Toneladas Estimadas': rng.uniform(5, 100, n).round(2),
+        'Fecha de Avistamiento': (np.datetime64('2025-01-01') + rng.integers(0, 365, n)).astype(str),
+        'Profundidad (m)': rng.uniform(10, 200, n).round(1),
+        'Temperatura Agua (°C)': rng.uniform(14, 24, n).round(1),
+        'Distancia al Nodo Anterior (km)': rng.uniform(1, 50, n).round(2),
+    })
+
+def generar_flota(n, rng):
+    import pandas as pd
+    return pd.DataFrame({
+        'ID Embarcación': [f"EMB{i:05d}" for i in range(1, n + 1)],
+        'Tipo de Casco': rng.choice(['ACERO NAVAL', 'MADERA', 'FIBRA DE VIDRIO', 'ALUMINIO'], n),
+        'Material del Casco': rng.choice(['ACERO', 'MADERA', 'FIBRA', 'ALUMINIO'], n),
+        'Capacidad de Carga (TM)': rng.uniform(30, 600, n).round(1),
+        'Consumo Combustible (L/km)': rng.uniform(0.8, 3.0, n).round(2),
+        'Velocidad Promedio (nudos)': rng.uniform(8, 16, n).round(1),
+        'Tripulación Máxima': rng.integers(5, 25, n),
+        'Año de Fabricación': rng.integers(1990, 2024, n),
+    })
+
+def generar_dataset(directorio, n_bancos, n_barcos, semilla=SEMILLA):
+    import pandas as pd
+    rng = np.random.default_rng(semilla)
+    os.makedirs(directorio, exist_ok=True)
+    generar_bancos(n_bancos, rng).to_csv(os.path.join(directorio, f"bancos_sinteticos_{n_bancos}.csv"), index=False)
+    generar_flota(n_barcos, rng).to_excel(os.path.join(directorio, "datos_embarcaciones_sinteticos.xlsx"), index=False)
+    pd.DataFrame({'PUERTO': PUERTOS, 'FECHA': 1}).to_csv(os.path.join(directorio, "descargas_sinteticas.csv"), sep=';', index=False, encoding='latin-1')
+
+# --- MEDICIÓN ---
+def _estadistica(tiempos_s):
+    ms = np.asarray(tiempos_s, dtype=np.float64) * 1000
+    return {"mediana_ms": round(float(np.median(ms)), 3), "p95_ms": round(float(np.percentile(ms, 95)), 3),
+            "min_ms": round(float(ms.min()), 3), "n": int(len(ms))}
+
+def _medir(fn, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter(); fn(); tiempos.append(time.perf_counter() - t0)
+    return _estadistica(tiempos)
+
+def _fases(resumen):
+    return {f: {**_estadistica([v["segundos"] or 0.0]), "estado": v["estado"]} for f, v in resumen["fases"].items()}
+
+def correr_caso(n_bancos, n_barcos, repeticiones):
+    # Corre dentro del subproceso: RINGEN_DIR_DATOS y RINGEN_DB_URL ya apuntan al temporal
+    import importlib
+    from fastapi.testclient import TestClient
+    main = importlib.import_module(f"{PAQUETE}.main")
+    distancias = importlib.import_module(f"{PAQUETE}.distancias")
+    rng = np.random.default_rng(SEMILLA)
+    res = {"bancos": n_bancos, "barcos": n_barcos}
+
+    with TestClient(main.app) as c:
+        t0 = time.perf_counter()
+        while c.get("/ready").status_code == 503: time.sleep(0.05)
+        while not main.estado_arranque.resumen()["terminado"]: time.sleep(0.05)
+        res["arranque_ms"] = _estadistica([time.perf_counter() - t0])
+        res["carga_fria"] = _fases(main.estado_arranque.resumen())
+        # Segunda carga: la caché columnar de fuentes ya existe
+        main.load_data()
+        res["carga_caliente"] = _fases(main.estado_arranque.resumen())
+        ds = main.datos.actual
+        res["bancos_en_mar"] = len(ds.bancos)
+        res["mb_almacen_bancos"] = ds.resumen()["mb_almacen"]
+        if ds.matriz is None:
+            res["error"] = "sin matriz de distancias (ver carga_fria)"
+            return res
+
+        m = ds.matriz
+        res["matriz"] = _medir(lambda: distancias.MatrizDistancias(m.ids, m.lat, m.lon), max(1, min(3, repeticiones)))
+
+        # calcular_ruta por fases, con barcos y puertos al azar (semilla fija)
+        db = main.database.SessionLocal()
+        try:
+            barcos = db.query(main.models.Embarcacion).filter(main.models.Embarcacion.id_embarcacion.like("SYSTEM%")).all()
+            db.expunge_all()
+        finally:
+            db.close()
+        puertos = ds.puertos['id'].tolist()
+        casos = [(barcos[int(rng.integers(len(barcos)))], puertos[int(rng.integers(len(puertos)))]) for _ in range(repeticiones)]
+        t_greedy, t_local, t_consumo, largos = [], [], [], []
+        for barco, puerto in casos:
+            params = main._parametros_barco(barco)
+            t0 = time.perf_counter()
+            nodo_puerto = main._nodo_puerto(ds, puerto)
+            ruta, d_greedy = main._fase_greedy(ds, nodo_puerto, params['cap_max'])
+            t1 = time.perf_counter()
+            ruta_opt, d_opt = main._fase_busqueda_local(ds, ruta, d_greedy)
+            t2 = time.perf_counter()
+            main._armar_respuesta(ds, barco.id_embarcacion, params, nodo_puerto, ruta_opt, d_greedy, d_opt)
+            t3 = time.perf_counter()
+            t_greedy.append(t1 - t0); t_local.append(t2 - t1); t_consumo.append(t3 - t2); largos.append(len(ruta.indices))
+        res["ruta"] = {"greedy": _estadistica(t_greedy), "busqueda_local": _estadistica(t_local),
+                       "consumo": _estadistica(t_consumo), "paradas_mediana": float(np.median(largos))}
+
+        def ruta_http():
+            barco, puerto = casos[int(rng.integers(len(casos)))]
+            main.cache_resultados_ruta.invalidar()
+            r = c.post("/optimizar-ruta/", json={"id_embarcacion": barco.id_embarcacion, "puerto_salida_id": puerto})
+            assert r.status_code == 200, r.text
+        res["ruta"]["http"] = _medir(ruta_http, repeticiones)
+
+        # Barrido de 1000 escenarios (10 velocidades x 10 bodegas x 10 tripulaciones) sobre una ruta fija
+        barco, puerto = casos[0]
+        ruta_fija = [n["id_nodo"] for n in c.post("/optimizar-ruta/", json={"id_embarcacion": barco.id_embarcacion, "puerto_salida_id": puerto}).json()["secuencia_ruta"]]
+        rejilla = {"id_embarcacion": barco.id_embarcacion, "ruta": ruta_fija, "velocidades": np.linspace(8, 16, 10).tolist(),
+                   "capacidades": np.linspace(100, 2000, 10).tolist(), "tripulaciones": list(range(5, 15))}
+        res["escenarios_1000"] = _medir(lambda: c.post("/optimizar-ruta/escenarios", json=rejilla), repeticiones)
+
+        # /bancos: vista por defecto, costa completa a zoom bajo y un recorte a zoom alto
+        vistas = {"defecto": {}, "costa_zoom2": {"bbox": "-84,-19,-70,-3", "zoom": 2},
+                  "chimbote_zoom8": {"bbox": "-79.5,-10,-78,-8.5", "zoom": 8, "limite": 5000}}
+        res["bancos_api"] = {k: _medir(lambda p=p: c.get("/bancos", params=p), repeticiones) for k, p in vistas.items()}
+
+        def dashboard_frio():
+            main.estadisticas_flota.invalidar(); c.get("/reportes/dashboard")
+        res["dashboard"] = {"frio": _medir(dashboard_frio, repeticiones),
+                            "caliente": _medir(lambda: c.get("/reportes/dashboard"), repeticiones)}
+    return res
+
+def correr_caso_sin_matriz(n_bancos, repeticiones):
+    # Mismas piezas que _construir_dataset salvo la matriz y el ruteo, llamadas directamente
+    # (load_data armaría la matriz). /bancos se mide como en el endpoint: consulta + columnas.
+    import importlib
+    main = importlib.import_module(f"{PAQUETE}.main")
+    fuentes = importlib.import_module(f"{PAQUETE}.fuentes")
+    res = {"bancos": n_bancos, "modo": "sin_matriz"}
+    pocas = max(1, min(3, repeticiones))
+
+    t0 = time.perf_counter()
+    main._leer_bancos()
+    res["carga_fria"] = {"bancos": _estadistica([time.perf_counter() - t0])}
+    res["carga_caliente"] = {"bancos": _medir(main._leer_bancos, pocas)}
+    bancos = main._leer_bancos()
+    res["bancos_en_mar"] = len(bancos)
+    if bancos.empty:
+        res["error"] = "sin bancos en el mar"
+        return res
+    ruta_bancos = fuentes.encontrar_archivo("bancos")
+
+    almacen_b = main.almacen.AlmacenBancos(bancos, main.OFFSET_VISUAL_BANCOS)
+    indice = main.espacial.IndiceEspacial(almacen_b.lat, almacen_b.lon)
+    res["mb_almacen_bancos"] = round(almacen_b.nbytes() / 1e6, 3)
+    res["estructuras"] = {
+        "almacen": _medir(lambda: main.almacen.AlmacenBancos(bancos, main.OFFSET_VISUAL_BANCOS), pocas),
+        "indice_espacial": _medir(lambda: main.espacial.IndiceEspacial(almacen_b.lat, almacen_b.lon), pocas),
+        "capa_y_rejilla": _medir(lambda: main._estructuras_mapa(almacen_b, indice), pocas),
+    }
+    capa = main._estructuras_mapa(almacen_b, indice)[0]
+
+    vistas = {"defecto": (None, None, 500), "costa_zoom2": ((-84, -19, -70, -3), 2, 500),
+              "chimbote_zoom8": ((-79.5, -10, -78, -8.5), 8, 5000)}
+    def consulta(caja, zoom, limite):
+        capa.columnas(capa.consultar(caja, zoom)[:limite])
+    res["bancos_api"] = {k: _medir(lambda v=v: consulta(*v), repeticiones) for k, v in vistas.items()}
+    res["archivo_mb"] = round(os.path.getsize(ruta_bancos) / 1e6, 1)
+    return res
+
+def _ejecutar_en_subproceso(n_bancos, args, sin_matriz=False):
+    directorio = tempfile.mkdtemp(prefix=f"ringen-bench-{n_bancos}-")
+    try:
+        t0 = time.perf_counter()
+        generar_dataset(directorio, n_bancos, args.barcos)
+        print(f"📦 {n_bancos} bancos sintéticos generados en {time.perf_counter() - t0:.1f}s")
+        entorno = dict(os.environ, RINGEN_DIR_DATOS=directorio, RINGEN_DB_URL=f"sqlite:///{os.path.join(directorio, 'bench.db')}")
+        raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        entorno["PYTHONPATH"] = os.pathsep.join(filter(None, [raiz, entorno.get("PYTHONPATH")]))
+        proc = subprocess.run(
+            [sys.executable, "-m", f"{PAQUETE}.benchmark", "--caso", str(n_bancos), "--barcos", str(args.barcos), "--repeticiones", str(args.repeticiones)]
+            + (["--sin-matriz"] if sin_matriz else []),
+            env=entorno, capture_output=True, text=True
+        )
+        for linea in proc.stdout.splitlines():
+            if linea.startswith("RESULTADO "):
+                return json.loads(linea[len("RESULTADO "):])
+        return {"bancos": n_bancos, "error": f"el proceso terminó con código {proc.returncode}", "salida": proc.stderr[-2000:]}
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+# --- COMPARACIÓN ENTRE CORRIDAS ---
+def _mediciones(nodo, prefijo=""):
+    # Aplana el JSON a {"10000/ruta/greedy": {"mediana_ms": ...}, ...}
+    if isinstance(nodo, dict):
+        if "mediana_ms" in nodo:
+            yield prefijo, nodo
+        else:
+            for k, v in nodo.items():
+                yield from _mediciones(v, f"{prefijo}/{k}" if prefijo else str(k))
+
+def comparar(actual, base, umbral=UMBRAL_REGRESION, min_diferencia_ms=MIN_DIFERENCIA_MS):
+    previas = dict(_mediciones(base.get("casos", {})))
+    regresiones = []
+    for clave, m in _mediciones(actual.get("casos", {})):
+        p = previas.pop(clave, None)
+        if not p or not p["mediana_ms"]: continue
+        diferencia = m["mediana_ms"] - p["mediana_ms"]
+        if diferencia > min_diferencia_ms and diferencia / p["mediana_ms"] > umbral:
+            regresiones.append({"medicion": clave, "base_ms": p["mediana_ms"], "actual_ms": m["mediana_ms"],
+                                "cambio": round(diferencia / p["mediana_ms"], 3)})
+    # Lo que quedó en `previas` no se midió esta vez (otro modo o tope de memoria): no cuenta como aprobado
+    return regresiones, sorted(previas)
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+# --- CLI ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de carga, ruteo y endpoints con datos sintéticos.")
+    parser.add_argument('--tamanos', type=int, nargs='+', default=TAMANOS, help="Cantidades de bancos a probar")
+    parser.add_argument('--barcos', type=int, default=BARCOS)
+    parser.add_argument('--repeticiones', type=int, default=REPETICIONES)
+    parser.add_argument('--salida', help="Archivo JSON de resultados (por defecto se imprime)")
+    parser.add_argument('--base', help="JSON de una corrida anterior para detectar regresiones")
+    parser.add_argument('--umbral', type=float, default=UMBRAL_REGRESION, help="Cambio relativo de la mediana que cuenta como regresión")
+    parser.add_argument('--memoria-max-gb', type=float, default=MEMORIA_MAX_GB, help="Omite tamaños cuya matriz N x N supere este tamaño")
+    parser.add_argument('--caso', type=int, help=argparse.SUPPRESS)  # uso interno (subproceso)
+    parser.add_argument('--sin-matriz', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.caso:
+        caso = correr_caso_sin_matriz(args.caso, args.repeticiones) if args.sin_matriz else correr_caso(args.caso, args.barcos, args.repeticiones)
+        print("RESULTADO " + json.dumps(caso))
+        return 0
+
+    resultado = {
+        "version": 1, "commit": _commit(), "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(), "plataforma": platform.platform(),
+        "parametros": {"barcos": args.barcos, "repeticiones": args.repeticiones, "semilla": SEMILLA, "memoria_max_gb": args.memoria_max_gb},
+        "casos": {},
+    }
+    for n in args.tamanos:
+        gb = (n + len(PUERTOS)) ** 2 * 4 / 1e9
+        if gb > args.memoria_max_gb:
+            print(f"⏱️ {n} bancos sin matriz: necesitaría {gb:.1f} GB (> {args.memoria_max_gb} GB), no se mide el ruteo.")
+            caso = _ejecutar_en_subproceso(n, args, sin_matriz=True)
+            caso["omitido"] = f"matriz de {gb:.1f} GB > {args.memoria_max_gb} GB: sin matriz, ruteo, escenarios ni dashboard"
+            resultado["casos"][str(n)] = caso
+            continue
+        print(f"⏱️ {n} bancos...")
+        resultado["casos"][str(n)] = _ejecutar_en_subproceso(n, args)
+
+    codigo = 0
+    if args.base:
+        with open(args.base, encoding='utf-8') as f:
+            regresiones, sin_comparar = comparar(resultado, json.load(f), args.umbral)
+        resultado["regresiones"] = regresiones
+        resultado["sin_comparar"] = sin_comparar
+        for r in regresiones:
+            print(f"❌ REGRESIÓN {r['medicion']}: {r['base_ms']} ms -> {r['actual_ms']} ms (+{r['cambio'] * 100:.0f}%)")
+        if sin_comparar: print(f"⚠️ {len(sin_comparar)} mediciones de la base no se midieron en esta corrida (ver sin_comparar).")
+        if not regresiones: print(f"✅ Sin regresiones respecto a {args.base} (umbral {args.umbral * 100:.0f}%).")
+        codigo = 1 if regresiones else 0
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f: f.write(texto)
+        print(f"✅ Resultados en {args.salida}")
+    else:
+        print(texto)
+    return codigo
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import math
+import numpy as np
+
+from .distancias import como_flotante
+
+# --- REJILLA DE BIOMASA (SUMAS PREFIJAS 2D) ---
+# Se arma una vez por dataset con las toneladas de cada banco:
+#   - celdas de TAM_CELDA_GRADOS x TAM_CELDA_GRADOS (fila = latitud, columna = longitud)
+#   - tablas de área sumada (toneladas y nº de bancos) de (F+1) x (C+1): la suma de
+#     cualquier bloque de celdas son 4 lecturas, sin recorrer los bancos
+#   - lista de bancos por celda (formato CSR: orden + inicio) para refinar bordes
+# consultar() responde por las celdas que toca el rectángulo en O(1); con
+# exacto=True descuenta además los bancos de las celdas del borde que quedan fuera.
+TAM_CELDA_GRADOS = 0.1
+
+def _suma_bloque(sat, f0, f1, c0, c1):
+    # Celdas [f0..f1] x [c0..c1] (inclusive)
+    return sat[f1 + 1, c1 + 1] - sat[f0, c1 + 1] - sat[f1 + 1, c0] + sat[f0, c0]
+
+class RejillaBiomasa:
+    def __init__(self, latitudes, longitudes, toneladas, tam_celda=TAM_CELDA_GRADOS):
+        self.lat = como_flotante(latitudes)
+        self.lon = como_flotante(longitudes)
+        self.ton = np.nan_to_num(como_flotante(toneladas))  # igual que pandas .sum()
+        self.tam = float(tam_celda)
+        if len(self.lat):
+            self.lat0 = math.floor(float(self.lat.min()) / self.tam) * self.tam
+            self.lon0 = math.floor(float(self.lon.min()) / self.tam) * self.tam
+            self.filas = int((float(self.lat.max()) - self.lat0) // self.tam) + 1
+            self.columnas = int((float(self.lon.max()) - self.lon0) // self.tam) + 1
+        else:
+            self.lat0 = self.lon0 = 0.0
+            self.filas = self.columnas = 1
+        # Celdas en float64, igual que _bloque
+        celda = self._fila(self.lat.astype(np.float64)) * self.columnas + self._columna(self.lon.astype(np.float64))
+        n_celdas = self.filas * self.columnas
+
+        self.toneladas = np.bincount(celda, weights=self.ton, minlength=n_celdas).reshape(self.filas, self.columnas)
+        self.bancos = np.bincount(celda, minlength=n_celdas).reshape(self.filas, self.columnas)
+        self._sat_ton = np.zeros((self.filas + 1, self.columnas + 1))
+        self._sat_ton[1:, 1:] = self.toneladas.cumsum(0).cumsum(1)
+        self._sat_bancos = np.zeros((self.filas + 1, self.columnas + 1), dtype=np.int64)
+        self._sat_bancos[1:, 1:] = self.bancos.cumsum(0).cumsum(1)
+
+        # Bancos de la celda k: orden[inicio[k]:inicio[k + 1]]
+        self.orden = np.argsort(celda, kind="stable").astype(np.int32)
+        self.inicio = np.concatenate(([0], np.cumsum(self.bancos.ravel())))
+
+    def _fila(self, lat):
+        return np.clip(np.floor((np.asarray(lat) - self.lat0) / self.tam), 0, self.filas - 1).astype(np.int64)
+
+    def _columna(self, lon):
+        return np.clip(np.floor((np.asarray(lon) - self.lon0) / self.tam), 0, self.columnas - 1).astype(np.int64)
+
+    def bancos_en_celda(self, fila, columna):
+        k = fila * self.columnas + columna
+        return self.orden[self.inicio[k]:self.inicio[k + 1]]
+
+    def _bloque(self, lat_min, lat_max, lon_min, lon_max):
+        # Celdas que toca el rectángulo, o None si queda fuera de la rejilla
+        if len(self.lat) == 0 or lat_min > lat_max or lon_min > lon_max: return None
+        if lat_max < self.lat0 or lon_max < self.lon0: return None
+        if lat_min >= self.lat0 + self.filas * self.tam or lon_min >= self.lon0 + self.columnas * self.tam: return None
+        # Escalares con math (np.clip por consulta cuesta más que las 4 lecturas)
+        def indice(v, origen, n):
+            v = (v - origen) / self.tam
+            if v <= 0: return 0
+            return n - 1 if v >= n else math.floor(v)
+        return (indice(lat_min, self.lat0, self.filas), indice(lat_max, self.lat0, self.filas),
+                indice(lon_min, self.lon0, self.columnas), indice(lon_max, self.lon0, self.columnas))
+
+    def consultar(self, lat_min=-np.inf, lat_max=np.inf, lon_min=-np.inf, lon_max=np.inf, exacto=False):
+        bloque = self._bloque(lat_min, lat_max, lon_min, lon_max)
+        if bloque is None: return {"toneladas": 0.0, "bancos": 0}
+        f0, f1, c0, c1 = bloque
+        toneladas = float(_suma_bloque(self._sat_ton, f0, f1, c0, c1))
+        bancos = int(_suma_bloque(self._sat_bancos, f0, f1, c0, c1))
+        if exacto:
+            # Solo las celdas del borde pueden tener bancos fuera del rectángulo
+            # (las celdas de una fila son contiguas en `orden`: un tramo por fila de borde)
+            C = self.columnas
+            tramos = [(f * C + c0, f * C + c1) for f in {f0, f1}]
+            tramos += [(f * C + c, f * C + c) for f in range(f0 + 1, f1) for c in {c0, c1}]
+            idx = np.concatenate([self.orden[self.inicio[a]:self.inicio[b + 1]] for a, b in tramos])
+            lat, lon = self.lat[idx], self.lon[idx]
+            fuera = ~((lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max))
+            toneladas -= float(self.ton[idx][fuera].sum(dtype=np.float64))
+            bancos -= int(fuera.sum())
+        return {"toneladas": max(toneladas, 0.0), "bancos": bancos}
+
+    def calor(self, agrupar=1, lat_min=-np.inf, lat_max=np.inf, lon_min=-np.inf, lon_max=np.inf):
+        # Capa de calor: bloques de agrupar x agrupar celdas no vacíos, sumados con
+        # las tablas de área (cada bloque son 4 lecturas). Devuelve columnas numpy.
+        vacio = {"lat": np.empty(0), "lon": np.empty(0), "toneladas": np.empty(0), "bancos": np.empty(0, dtype=np.int64)}
+        bloque = self._bloque(lat_min, lat_max, lon_min, lon_max)
+        if bloque is None: return vacio
+        f0, f1, c0, c1 = bloque
+        bf = np.append(np.arange(f0, f1 + 1, agrupar), f1 + 1)
+        bc = np.append(np.arange(c0, c1 + 1, agrupar), c1 + 1)
+        def sumas(sat):
+            s = sat[np.ix_(bf, bc)]
+            return s[1:, 1:] - s[:-1, 1:] - s[1:, :-1] + s[:-1, :-1]
+        toneladas, bancos = sumas(self._sat_ton), sumas(self._sat_bancos)
+        ff, cc = np.nonzero(bancos)
+        return {
+            "lat": self.lat0 + (bf[ff] + bf[ff + 1]) / 2 * self.tam,
+            "lon": self.lon0 + (bc[cc] + bc[cc + 1]) / 2 * self.tam,
+            "toneladas": toneladas[ff, cc], "bancos": bancos[ff, cc],
+        }
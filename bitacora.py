@@ -0,0 +1,47 @@
+import os
+import sys
+import json
+import time
+import logging
+
+# --- LOGS ESTRUCTURADOS ---
+# Reemplaza los print del arranque. Cada mensaje puede llevar campos extra
+# (log.info("...", extra={"campos": {"filas": n}})) que salen como claves propias:
+#   RINGEN_LOG_FORMATO=json  -> una línea JSON por evento (por defecto)
+#   RINGEN_LOG_FORMATO=texto -> "hora nivel logger mensaje k=v ..." para consola
+FORMATO = os.getenv("RINGEN_LOG_FORMATO", "json")
+NIVEL = os.getenv("RINGEN_LOG_NIVEL", "INFO")
+RAIZ = "ringensoft"
+
+class FormatoJSON(logging.Formatter):
+    def format(self, record):
+        evento = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "nivel": record.levelname, "logger": record.name, "mensaje": record.getMessage(),
+        }
+        evento.update(getattr(record, "campos", {}) or {})
+        if record.exc_info: evento["excepcion"] = self.formatException(record.exc_info)
+        return json.dumps(evento, ensure_ascii=False, default=str)
+
+class FormatoTexto(logging.Formatter):
+    def format(self, record):
+        campos = " ".join(f"{k}={v}" for k, v in (getattr(record, "campos", {}) or {}).items())
+        linea = f"{time.strftime('%H:%M:%S', time.localtime(record.created))} {record.levelname:<7} {record.name} {record.getMessage()}"
+        if campos: linea += f" {campos}"
+        if record.exc_info: linea += "\n" + self.formatException(record.exc_info)
+        return linea
+
+def configurar(formato=FORMATO, nivel=NIVEL):
+    raiz = logging.getLogger(RAIZ)
+    if getattr(raiz, "_ringensoft_configurado", False): return raiz
+    manejador = logging.StreamHandler(sys.stdout)
+    manejador.setFormatter(FormatoTexto() if formato == "texto" else FormatoJSON())
+    raiz.addHandler(manejador)
+    raiz.setLevel(nivel)
+    raiz.propagate = False
+    raiz._ringensoft_configurado = True
+    return raiz
+
+def obtener(nombre):
+    # Logger hijo de "ringensoft" (ringensoft.main, ringensoft.fuentes, ...)
+    return logging.getLogger(f"{RAIZ}.{nombre.rsplit('.', 1)[-1]}")
@@ -0,0 +1,228 @@
+#####################################################################################
+# [ALGORITMO 3] METAHEURÍSTICA DE BÚSQUEDA LOCAL (2-OPT + OR-OPT)
+#####################################################################################
+# Trabaja sobre una ruta abierta con extremos fijos (puerto de salida y retorno):
+#   - 2-opt con evaluación delta O(1) (solo cambian dos aristas).
+#   - Or-opt: mueve segmentos de 1..3 bancos a otra posición, en cualquier sentido
+#     (con longitud 1 es el movimiento "relocate").
+#   - Listas de vecinos: solo se prueban los k nodos más cercanos de cada nodo.
+#   - Bits "don't look": un nodo sin mejoras no se reevalúa hasta que una
+#     arista suya cambie.
+#   - Presupuesto de tiempo (ms) y/o de movimientos aplicados, cancelable desde
+#     otro hilo (threading.Event).
+#   - Modo "anytime": al_mejorar(ruta, distancia) recibe la mejor ruta hasta el
+#     momento, como mucho cada INTERVALO_AVISO_MS.
+# Al converger se alternan pasadas completas de 2-opt y Or-opt (también con
+# delta) hasta que ninguna mejore: el resultado es óptimo local para ambas.
+import time
+from collections import deque
+
+import numpy as np
+
+VECINOS_POR_NODO = 10
+LARGO_MAX_SEGMENTO = 3
+TIEMPO_LIMITE_MS = 1000
+INTERVALO_AVISO_MS = 50
+EPS = 1e-9
+
+class _Presupuesto:
+    def __init__(self, tiempo_limite_ms, max_iteraciones, cancelar=None):
+        self.fin = time.perf_counter() + tiempo_limite_ms / 1000.0 if tiempo_limite_ms else None
+        self.restantes = max_iteraciones
+        self.cancelar = cancelar
+
+    def agotado(self):
+        if self.cancelar is not None and self.cancelar.is_set(): return True
+        if self.restantes is not None and self.restantes <= 0: return True
+        return self.fin is not None and time.perf_counter() >= self.fin
+
+    def consumir(self):
+        if self.restantes is not None: self.restantes -= 1
+
+class _Ruta:
+    # Ruta local: nodos 0..n-1 (0 y n-1 son los extremos fijos)
+    def __init__(self, d, vecinos):
+        self.d = d
+        self.n = len(d)
+        self.vecinos = vecinos
+        self.r = list(range(self.n))
+        self.pos = list(range(self.n))
+
+    def _reindexar(self, ini, fin):
+        r, pos = self.r, self.pos
+        for k in range(ini, fin + 1): pos[r[k]] = k
+
+    def invertir(self, i, j):
+        self.r[i:j + 1] = self.r[i:j + 1][::-1]
+        self._reindexar(i, j)
+
+    def mover_segmento(self, i, largo, q, invertido):
+        # Saca r[i:i+largo] y lo inserta entre las posiciones q y q+1 (q fuera del segmento)
+        r = self.r
+        seg = r[i:i + largo]
+        if invertido: seg.reverse()
+        if q < i:
+            r[q + 1:i + largo] = seg + r[q + 1:i]
+            self._reindexar(q + 1, i + largo - 1)
+        else:
+            r[i:q + 1] = r[i + largo:q + 1] + seg
+            self._reindexar(i, q)
+
+    # --- 2-OPT (vecino como sucesor o como predecesor) ---
+    def mejorar_2opt(self, a):
+        d, r, pos, n = self.d, self.r, self.pos, self.n
+        i = pos[a]
+        if i < n - 1:
+            b = r[i + 1]
+            d_ab = d[a][b]
+            for c in self.vecinos[a]:
+                d_ac = d[a][c]
+                if d_ac >= d_ab - EPS: break
+                j = pos[c]
+                if j >= n - 1: continue
+                e = r[j + 1]
+                if c == b or e == a: continue
+                delta = d_ac + d[b][e] - d_ab - d[c][e]
+                if delta < -EPS:
+                    if i < j: self.invertir(i + 1, j)
+                    else: self.invertir(j + 1, i)
+                    return (a, b, c, e)
+        if i > 0:
+            b = r[i - 1]
+            d_ab = d[a][b]
+            for c in self.vecinos[a]:
+                d_ac = d[a][c]
+                if d_ac >= d_ab - EPS: break
+                j = pos[c]
+                if j <= 0: continue
+                e = r[j - 1]
+                if c == b or e == a: continue
+                delta = d_ac + d[b][e] - d_ab - d[c][e]
+                if delta < -EPS:
+                    if j > i: self.invertir(i, j - 1)
+                    else: self.invertir(j, i - 1)
+                    return (a, b, c, e)
+        return None
+
+    # --- OR-OPT / RELOCATE ---
+    def mejorar_oropt(self, a):
+        d, r, pos, n = self.d, self.r, self.pos, self.n
+        for largo in range(1, LARGO_MAX_SEGMENTO + 1):
+            for i in {pos[a], pos[a] - largo + 1}:
+                if i < 1 or i + largo - 1 > n - 2: continue
+                primero, ultimo = r[i], r[i + largo - 1]
+                p, s = r[i - 1], r[i + largo]
+                ganancia = d[p][primero] + d[ultimo][s] - d[p][s]
+                if ganancia <= EPS: continue
+                for extremo in (primero, ultimo):
+                    for c in self.vecinos[extremo]:
+                        if d[extremo][c] >= ganancia: break
+                        qc = pos[c]
+                        if i <= qc < i + largo: continue
+                        for q in (qc - 1, qc):
+                            if q < 0 or q >= n - 1 or i - 1 <= q <= i + largo - 1: continue
+                            u, v = r[q], r[q + 1]
+                            d_uv = d[u][v]
+                            directo = d[u][primero] + d[ultimo][v] - d_uv
+                            inverso = d[u][ultimo] + d[primero][v] - d_uv
+                            invertido = inverso < directo
+                            if min(directo, inverso) - ganancia < -EPS:
+                                self.mover_segmento(i, largo, q, invertido)
+                                return (p, s, u, v, primero, ultimo)
+        return None
+
+    # --- PULIDO FINAL: 2-OPT Y OR-OPT COMPLETOS (delta O(1) por movimiento) ---
+    def pasada_2opt_completa(self, presupuesto):
+        d, r, n = self.d, self.r, self.n
+        mejorado = False
+        for i in range(0, n - 3):
+            a, b = r[i], r[i + 1]
+            d_ab = d[a][b]
+            for j in range(i + 2, n - 1):
+                c, e = r[j], r[j + 1]
+                if d[a][c] + d[b][e] - d_ab - d[c][e] < -EPS:
+                    self.invertir(i + 1, j)
+                    presupuesto.consumir()
+                    mejorado = True
+                    a, b = r[i], r[i + 1]
+                    d_ab = d[a][b]
+            if presupuesto.agotado(): break
+        return mejorado
+
+    def pasada_oropt_completa(self, presupuesto):
+        d, r, n = self.d, self.r, self.n
+        mejorado = False
+        for largo in range(1, LARGO_MAX_SEGMENTO + 1):
+            i = 1
+            while i + largo - 1 <= n - 2 and not presupuesto.agotado():
+                primero, ultimo = r[i], r[i + largo - 1]
+                p, s = r[i - 1], r[i + largo]
+                ganancia = d[p][primero] + d[ultimo][s] - d[p][s]
+                movido = False
+                if ganancia > EPS:
+                    for q in range(0, n - 1):
+                        if i - 1 <= q <= i + largo - 1: continue
+                        u, v = r[q], r[q + 1]
+                        d_uv = d[u][v]
+                        directo = d[u][primero] + d[ultimo][v] - d_uv
+                        inverso = d[u][ultimo] + d[primero][v] - d_uv
+                        if min(directo, inverso) - ganancia < -EPS:
+                            self.mover_segmento(i, largo, q, inverso < directo)
+                            presupuesto.consumir()
+                            mejorado = movido = True
+                            break
+                if not movido: i += 1
+        return mejorado
+
+def optimizar_ruta(ruta, matriz, vecinos=VECINOS_POR_NODO, tiempo_limite_ms=TIEMPO_LIMITE_MS, max_iteraciones=None,
+                   cancelar=None, al_mejorar=None, intervalo_aviso_ms=INTERVALO_AVISO_MS):
+    # ruta: índices sobre `matriz` (N x N); ruta[0] y ruta[-1] quedan fijos.
+    # Devuelve (ruta_optima, distancia_km). Si cancelar (threading.Event) se
+    # activa, devuelve la mejor ruta encontrada hasta ese momento.
+    ruta = list(ruta)
+    if len(ruta) <= 3:
+        return ruta, _longitud(ruta, matriz)
+
+    sub = np.asarray(matriz)[np.ix_(ruta, ruta)].astype(np.float64)
+    n = len(ruta)
+    k = min(vecinos, n - 1)
+    orden = np.argsort(sub, axis=1, kind='stable')
+    listas = [[int(c) for c in orden[a] if c != a][:k] for a in range(n)]
+
+    estado = _Ruta(sub.tolist(), listas)
+    presupuesto = _Presupuesto(tiempo_limite_ms, max_iteraciones, cancelar)
+
+    ultimo_aviso = time.perf_counter()
+    def avisar(forzar=False):
+        nonlocal ultimo_aviso
+        ahora = time.perf_counter()
+        if al_mejorar is None or (not forzar and (ahora - ultimo_aviso) * 1000 < intervalo_aviso_ms): return
+        ultimo_aviso = ahora
+        actual = [ruta[l] for l in estado.r]
+        al_mejorar(actual, _longitud(actual, matriz))
+
+    cola = deque(range(n))
+    en_cola = [True] * n
+    while cola and not presupuesto.agotado():
+        a = cola.popleft(); en_cola[a] = False
+        tocados = estado.mejorar_2opt(a) or estado.mejorar_oropt(a)
+        if tocados is None: continue
+        presupuesto.consumir()
+        avisar()
+        for t in tocados:
+            if not en_cola[t]:
+                cola.append(t); en_cola[t] = True
+
+    while not presupuesto.agotado():
+        mejora_2opt = estado.pasada_2opt_completa(presupuesto)
+        mejora_oropt = estado.pasada_oropt_completa(presupuesto)
+        if not (mejora_2opt or mejora_oropt): break
+        avisar()
+
+    ruta_optima = [ruta[l] for l in estado.r]
+    return ruta_optima, _longitud(ruta_optima, matriz)
+
+def _longitud(ruta, matriz):
+    if len(ruta) < 2: return 0.0
+    idx = np.asarray(ruta, dtype=np.intp)
+    return float(np.asarray(matriz)[idx[:-1], idx[1:]].sum(dtype=np.float64))
@@ -0,0 +1,95 @@
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# --- CACHÉ GENÉRICA (LRU + TTL + SINGLEFLIGHT) ---
+# La usan los resultados de ruta (cache_rutas) y los principales de auth.
+# Si llegan varias peticiones idénticas a la vez, solo la primera calcula; el
+# resto espera su resultado. Cada invalidación sube la "generación": un cálculo
+# que empezó antes no guarda su resultado (podría venir de datos viejos).
+class CacheTTL:
+    def __init__(self, max_entradas, ttl_segundos):
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self._datos = OrderedDict()  # clave -> (expira, valor)
+        self._en_vuelo = {}          # clave -> Future
+        self._generacion = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _reservar(self, clave):
+        # -> ("valor", v) si hay acierto, ("esperar", futuro) si otro ya calcula,
+        #    ("calcular", (futuro, generacion)) si le toca a quien llama
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None:
+                if entrada[0] > time.monotonic():
+                    self._datos.move_to_end(clave)
+                    self.aciertos += 1
+                    return "valor", entrada[1]
+                del self._datos[clave]
+            futuro = self._en_vuelo.get(clave)
+            if futuro is not None:
+                self.aciertos += 1
+                return "esperar", futuro
+            futuro = Future()
+            self._en_vuelo[clave] = futuro
+            self.fallos += 1
+            return "calcular", (futuro, self._generacion)
+
+    def _fallar(self, clave, futuro, e):
+        with self._lock: self._en_vuelo.pop(clave, None)
+        futuro.set_exception(e)
+
+    def _guardar(self, clave, futuro, generacion, valor, cachear=None):
+        # cachear(valor) -> False: se entrega a quien esperaba pero no se guarda
+        with self._lock:
+            self._en_vuelo.pop(clave, None)
+            if generacion == self._generacion and (cachear is None or cachear(valor)):
+                self._datos[clave] = (time.monotonic() + self.ttl_segundos, valor)
+                self._datos.move_to_end(clave)
+                while len(self._datos) > self.max_entradas:
+                    self._datos.popitem(last=False)
+        futuro.set_result(valor)
+        return valor
+
+    def obtener_o_calcular(self, clave, calcular, cachear=None):
+        accion, dato = self._reservar(clave)
+        if accion == "valor": return dato
+        if accion == "esperar": return dato.result()
+        futuro, generacion = dato
+        try:
+            valor = calcular()
+        except BaseException as e:
+            self._fallar(clave, futuro, e)
+            raise
+        return self._guardar(clave, futuro, generacion, valor, cachear)
+
+    async def obtener_o_calcular_async(self, clave, calcular, cachear=None):
+        # Igual, pero calcular() es una corrutina y la espera no bloquea el event loop
+        accion, dato = self._reservar(clave)
+        if accion == "valor": return dato
+        if accion == "esperar": return await asyncio.wrap_future(dato)
+        futuro, generacion = dato
+        try:
+            valor = await calcular()
+        except BaseException as e:
+            self._fallar(clave, futuro, e)
+            raise
+        return self._guardar(clave, futuro, generacion, valor, cachear)
+
+    def invalidar(self, predicado=None):
+        # Sin predicado se vacía todo; si no, solo las claves que cumplan predicado(clave)
+        with self._lock:
+            self._generacion += 1
+            if predicado is None:
+                self._datos.clear()
+            else:
+                for clave in [c for c in self._datos if predicado(c)]:
+                    del self._datos[clave]
+
+    def __len__(self):
+        return len(self._datos)
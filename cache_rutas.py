@@ -0,0 +1,9 @@
+from .cache import CacheTTL
+
+# --- CACHÉ DE RUTAS ---
+MAX_ENTRADAS = 512
+TTL_SEGUNDOS = 600
+
+class CacheRutas(CacheTTL):
+    def __init__(self, max_entradas=MAX_ENTRADAS, ttl_segundos=TTL_SEGUNDOS):
+        super().__init__(max_entradas, ttl_segundos)
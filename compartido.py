@@ -0,0 +1,144 @@
+import os
+import json
+import time
+import fcntl
+import shutil
+import numpy as np
+from contextlib import contextmanager
+from . import fuentes, bitacora
+from .almacen import AlmacenBancos
+from .distancias import MatrizDistancias
+
+log = bitacora.obtener(__name__)
+
+# --- SNAPSHOT COMPARTIDO ENTRE WORKERS (MEMORY-MAP) ---
+# Con varios workers (uvicorn --workers / gunicorn) cada proceso armaba su propio
+# Dataset: N copias de los bancos y de la matriz, y la matriz calculada N veces.
+# Con RINGEN_SNAPSHOT_DIR:
+#   - Un solo proceso (el que toma el candado) arma el Dataset y lo escribe en
+#     <dir>/vNNNNNN/: tablas de bancos/puertos (formato columnar de fuentes), los
+#     arrays del almacén de bancos y la matriz (ids, lat, lon, valores) en .npy.
+#   - Todos los workers, él incluido, lo abren con memory-map de solo lectura: las
+#     páginas son las del page cache, compartidas (cero copias). Lo que cada uno
+#     arma en memoria es O(N): índice espacial, capa del mapa, rejilla.
+#   - Cabecera versionada <dir>/ACTUAL.json (se reemplaza de forma atómica): los
+#     workers vigilan su "version" y abren el snapshot nuevo cuando otro lo publica.
+DIR_SNAPSHOT = os.getenv("RINGEN_SNAPSHOT_DIR")
+INTERVALO_CABECERA_S = float(os.getenv("RINGEN_SNAPSHOT_INTERVALO", 2))  # vigilancia de ACTUAL.json
+VERSION_FORMATO = 1
+CABECERA = "ACTUAL.json"
+CANDADO = ".construccion.lock"
+CONSERVAR = 3  # snapshots en disco: el vigente + los que algún worker puede estar abriendo
+ARRAYS_ALMACEN = ("ids", "lat", "lon", "toneladas", "x", "y", "visible")
+
+def normalizar(firma):
+    # Como queda tras pasar por JSON (tuplas -> listas), para comparar con la cabecera
+    return json.loads(json.dumps(firma))
+
+def leer_cabecera(directorio, sub=None):
+    # ACTUAL.json (vigente) o la copia de un snapshot concreto; None si no hay o es de otro formato
+    ruta = os.path.join(directorio, sub, "cabecera.json") if sub else os.path.join(directorio, CABECERA)
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            cab = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return cab if cab.get("formato") == VERSION_FORMATO else None
+
+def firma(cab):
+    # Dataset.firma en modo compartido: (archivos de datos, versión del snapshot)
+    return (cab["firma"], cab["version"])
+
+def firma_vigilada(directorio, archivos, actual):
+    # Lo que compara Publicador.vigilar: cambia si cambian los archivos (cuando se
+    # vigilan) o si otro proceso publicó un snapshot nuevo
+    cab = leer_cabecera(directorio)
+    return (normalizar(archivos) if archivos is not None else actual[0], cab["version"] if cab else None)
+
+@contextmanager
+def _candado(directorio):
+    os.makedirs(directorio, exist_ok=True)
+    with open(os.path.join(directorio, CANDADO), 'a+') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)  # espera a que termine el proceso que está armando
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def _escribir_json(ruta, valor):
+    tmp = f"{ruta}.tmp-{os.getpid()}"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(valor, f, ensure_ascii=False)
+    os.replace(tmp, ruta)
+
+def escribir(ds, directorio):
+    sub = f"v{ds.version:06d}"
+    destino = os.path.join(directorio, sub)
+    tmp = f"{destino}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    # Tablas sin filas van sin columnas (un .npy vacío no se puede abrir con memory-map)
+    for nombre, df in (("bancos", ds.bancos), ("puertos", ds.puertos)):
+        fuentes._guardar(df if len(df) else df.iloc[:0, :0], os.path.join(tmp, nombre))
+    cab = {"formato": VERSION_FORMATO, "version": ds.version, "directorio": sub, "firma": normalizar(ds.firma),
+           "creado": time.time(), "pid": os.getpid(), "almacen": None, "matriz": None}
+    if ds.almacen is not None:
+        for k in ARRAYS_ALMACEN:
+            np.save(os.path.join(tmp, f"almacen.{k}.npy"), getattr(ds.almacen, k), allow_pickle=False)
+        cab["almacen"] = {"columnas": ds.almacen.columnas, "bancos": len(ds.almacen)}
+    if ds.matriz is not None:
+        m = ds.matriz
+        np.save(os.path.join(tmp, "matriz.ids.npy"), np.asarray(m.ids, dtype=np.str_), allow_pickle=False)
+        np.save(os.path.join(tmp, "matriz.lat.npy"), m.lat, allow_pickle=False)
+        np.save(os.path.join(tmp, "matriz.lon.npy"), m.lon, allow_pickle=False)
+        np.save(os.path.join(tmp, "matriz.valores.npy"), np.asarray(m.valores), allow_pickle=False)
+        cab["matriz"] = {"modelo": m.modelo, "nodos": len(m)}
+    _escribir_json(os.path.join(tmp, "cabecera.json"), cab)
+    shutil.rmtree(destino, ignore_errors=True)
+    os.replace(tmp, destino)
+    _escribir_json(os.path.join(directorio, CABECERA), cab)
+    _limpiar(directorio)
+    return cab
+
+def _limpiar(directorio):
+    # Solo con el candado tomado: cualquier .tmp- es de un proceso que murió a medias.
+    # Borrar un snapshot que algún worker tiene abierto es seguro (POSIX: el mmap sigue vivo).
+    nombres = sorted(n for n in os.listdir(directorio) if n.startswith("v"))
+    for n in nombres:
+        if '.tmp-' in n: shutil.rmtree(os.path.join(directorio, n), ignore_errors=True)
+    for n in [n for n in nombres if '.tmp-' not in n][:-CONSERVAR]:
+        shutil.rmtree(os.path.join(directorio, n), ignore_errors=True)
+
+def obtener(directorio, firma_archivos, construir, forzar=False):
+    # Cabecera del snapshot vigente para estos archivos. Si no hay (o forzar), un solo
+    # proceso lo arma con construir(version) -> Dataset; los demás esperan el candado
+    # y se quedan con el que publicó
+    firma_archivos = normalizar(firma_archivos)
+    vista = leer_cabecera(directorio)
+    if vista is not None and vista["firma"] == firma_archivos and not forzar: return vista
+    with _candado(directorio):
+        cab = leer_cabecera(directorio)
+        nuevo = cab is not None and (vista is None or cab["version"] != vista["version"])
+        if cab is not None and cab["firma"] == firma_archivos and (not forzar or nuevo):
+            return cab
+        t0 = time.perf_counter()
+        ds = construir((cab["version"] if cab else 0) + 1)
+        cab = escribir(ds, directorio)
+        log.info("Snapshot compartido publicado", extra={"campos": {
+            "version": cab["version"], "directorio": cab["directorio"], "segundos": round(time.perf_counter() - t0, 3)
+        }})
+        return cab
+
+def abrir(directorio, cab):
+    # (bancos, puertos, almacen, matriz) del snapshot, todo sobre memory-map de solo lectura
+    base = os.path.join(directorio, cab["directorio"])
+    def cargar(nombre):
+        return np.load(os.path.join(base, f"{nombre}.npy"), mmap_mode='r', allow_pickle=False)
+    bancos, puertos = fuentes._abrir(os.path.join(base, "bancos")), fuentes._abrir(os.path.join(base, "puertos"))
+    almacen_b = matriz = None
+    if cab["almacen"] is not None:
+        almacen_b = AlmacenBancos.desde_arrays(cab["almacen"]["columnas"], **{k: cargar(f"almacen.{k}") for k in ARRAYS_ALMACEN})
+    if cab["matriz"] is not None:
+        matriz = MatrizDistancias(cargar("matriz.ids").tolist(), cargar("matriz.lat"), cargar("matriz.lon"),
+                                  valores=cargar("matriz.valores"), modelo=cab["matriz"]["modelo"])
+    return bancos, puertos, almacen_b, matriz
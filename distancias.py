@@ -0,0 +1,68 @@
+import os
+import numpy as np
+
+RADIO_TIERRA_KM = 6371.0
+
+# Filas por bloque al construir la matriz: acota los temporales float64 a BLOQUE x N
+FILAS_POR_BLOQUE = 1024
+# Tope de nodos para calcular la matriz densa: N x N float32 = 4 N² bytes
+# (30 000 nodos ~ 3.6 GB; 100 000 serían 40 GB). 0 = sin tope.
+MAX_NODOS = int(os.getenv("RINGEN_MATRIZ_MAX_NODOS", 30_000))
+
+class MatrizDemasiadoGrande(MemoryError):
+    pass
+
+def como_flotante(v):
+    # Conserva float32/float64 tal cual (arrays compartidos del almacén de bancos); lo demás pasa a float64
+    v = np.asarray(v)
+    return v if v.dtype.kind == 'f' else v.astype(np.float64)
+
+# --- HAVERSINE VECTORIZADO (BROADCAST) ---
+def haversine_vectorizado(lat1, lon1, lat2, lon2):
+    lat1 = np.radians(np.asarray(lat1, dtype=np.float64))
+    lon1 = np.radians(np.asarray(lon1, dtype=np.float64))
+    lat2 = np.radians(np.asarray(lat2, dtype=np.float64))
+    lon2 = np.radians(np.asarray(lon2, dtype=np.float64))
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+# --- MATRIZ DENSA N x N (float32) + MAPA id -> índice ---
+# valores: matriz ya calculada (p. ej. la marítima de navegacion.py, en memory-map);
+# sin ella se calcula en línea recta (haversine)
+class MatrizDistancias:
+    def __init__(self, ids, latitudes, longitudes, valores=None, modelo=None, max_nodos=MAX_NODOS):
+        if valores is None and max_nodos and len(ids) > max_nodos:
+            raise MatrizDemasiadoGrande(
+                f"{len(ids)} nodos > {max_nodos} (RINGEN_MATRIZ_MAX_NODOS): la matriz ocuparía {4 * len(ids) ** 2 / 1e9:.1f} GB")
+        self.ids = [str(i) for i in ids]
+        self.indice = {id_nodo: i for i, id_nodo in enumerate(self.ids)}
+        self.lat = como_flotante(latitudes)
+        self.lon = como_flotante(longitudes)
+        self.modelo = modelo or ("haversine" if valores is None else "maritimo")
+        if valores is not None:
+            self.valores = valores
+            return
+        n = len(self.ids)
+        self.valores = np.empty((n, n), dtype=np.float32)
+        for ini in range(0, n, FILAS_POR_BLOQUE):
+            fin = min(ini + FILAS_POR_BLOQUE, n)
+            self.valores[ini:fin] = haversine_vectorizado(
+                self.lat[ini:fin, None], self.lon[ini:fin, None], self.lat[None, :], self.lon[None, :]
+            )
+        np.fill_diagonal(self.valores, 0.0)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def idx(self, id_nodo):
+        return self.indice.get(str(id_nodo))
+
+    def distancia(self, i, j):
+        return float(self.valores[i, j])
+
+    def longitud_ruta(self, indices):
+        indices = np.asarray(indices, dtype=np.intp)
+        if len(indices) < 2: return 0.0
+        return float(self.valores[indices[:-1], indices[1:]].sum(dtype=np.float64))
@@ -0,0 +1,56 @@
+import numpy as np
+
+#####################################################################################
+# [FASE 3 VECTORIZADA] CONSUMO / TIEMPO / CARGA POR ESCENARIO
+#####################################################################################
+# Mismo modelo de consumo que la respuesta de /optimizar-ruta, pero sobre una
+# matriz tramos x escenarios en lugar de un bucle por tramo:
+#   consumo = sum_tramos(dist * (1 + 0.5 * carga / bodega)) * consumo_base * f_material * f_tripulacion
+#   tiempo  = distancia_total / (velocidad * 1.852)
+# Con una rejilla velocidad x bodega x tripulación solo la bodega cambia la carga
+# de cada tramo: se arma una matriz (tramos x bodegas) y el resto se combina por
+# broadcasting, así 1000 escenarios cuestan un producto matriz-vector.
+FACTOR_CARGA = 0.5
+FACTOR_POR_TRIPULANTE = 0.005
+KM_POR_MILLA = 1.852
+MAX_ESCENARIOS = 100_000
+# Por debajo de esto galones_por_tm deja de tener sentido (bodega de 0.0001 TM -> ~5e5 gal/TM)
+CAPACIDAD_MIN_TM = 1.0
+VELOCIDAD_MIN_NUDOS = 1.0
+
+def factor_tripulacion(tripulacion):
+    return 1.0 + np.asarray(tripulacion, dtype=np.float64) * FACTOR_POR_TRIPULANTE
+
+def consumo(distancias_tramo, carga_tramo, capacidad, consumo_base, factor_material, factor_trip):
+    # distancias_tramo (L,), carga_tramo (L,) o (L, S) = carga a bordo al recorrer cada tramo,
+    # capacidad escalar o (S,). Devuelve galones (escalar o (S,)).
+    factor_carga = 1.0 + FACTOR_CARGA * (np.asarray(carga_tramo, dtype=np.float64) / capacidad)
+    return (np.asarray(distancias_tramo, dtype=np.float64) @ factor_carga) * consumo_base * factor_material * factor_trip
+
+def evaluar(distancias_tramo, disponible, consumo_base, factor_material, velocidades, capacidades, tripulaciones):
+    # disponible (L+1,): toneladas que ofrece cada nodo de la ruta (0 en puertos). La
+    # bodega se llena en orden de visita: carga acumulada = min(suma de lo ofrecido, bodega).
+    # Devuelve columnas (V*C*T,) en orden velocidad > bodega > tripulación.
+    d = np.asarray(distancias_tramo, dtype=np.float64)
+    vel = np.asarray(velocidades, dtype=np.float64)
+    cap = np.asarray(capacidades, dtype=np.float64)
+    trip = np.asarray(tripulaciones, dtype=np.float64)
+    acumulado = np.cumsum(np.nan_to_num(np.asarray(disponible, dtype=np.float64)))
+
+    carga = np.minimum(acumulado[:-1, None], cap[None, :])                     # (L, C)
+    galones_base = consumo(d, carga, cap, consumo_base, factor_material, 1.0)   # (C,)
+    galones = galones_base[None, :, None] * factor_tripulacion(trip)[None, None, :]   # (1, C, T)
+    horas = d.sum() / (vel * KM_POR_MILLA)                                      # (V,)
+    carga_final = np.minimum(acumulado[-1], cap)                                # (C,)
+
+    forma = (len(vel), len(cap), len(trip))
+    galones = np.broadcast_to(galones, forma)
+    return {
+        "velocidad_nudos": np.broadcast_to(vel[:, None, None], forma).ravel(),
+        "capacidad_tm": np.broadcast_to(cap[None, :, None], forma).ravel(),
+        "tripulacion": np.broadcast_to(trip[None, None, :], forma).ravel(),
+        "consumo_galones": galones.ravel(),
+        "tiempo_horas": np.broadcast_to(horas[:, None, None], forma).ravel(),
+        "carga_tm": np.broadcast_to(carga_final[None, :, None], forma).ravel(),
+        "galones_por_tm": (galones / np.maximum(carga_final, 1e-9)[None, :, None]).ravel(),
+    }
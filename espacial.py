@@ -0,0 +1,112 @@
+import math
+import numpy as np
+
+from .distancias import haversine_vectorizado, como_flotante
+
+KM_POR_GRADO = 111.195  # 2·π·R / 360 con R = 6371 km
+
+# --- ÍNDICE ESPACIAL EN REJILLA (lat/lon) ---
+# Cada celda guarda los índices de los puntos que caen en ella. Las consultas
+# recorren anillos de celdas alrededor del punto y se detienen en cuanto el
+# siguiente anillo ya no puede contener nada más cercano (o sale del radio).
+class IndiceEspacial:
+    def __init__(self, latitudes, longitudes, tam_celda=0.25):
+        self.lat = como_flotante(latitudes)
+        self.lon = como_flotante(longitudes)
+        self.tam_celda = tam_celda
+        self.celdas = {}
+        if len(self.lat) == 0:
+            self.limites = (0, 0, 0, 0)
+            self.km_min_por_celda = tam_celda * KM_POR_GRADO
+            return
+
+        # Celdas en float64 (igual que las consultas, que usan math.floor)
+        ci = np.floor(self.lat.astype(np.float64) / tam_celda).astype(np.int64)
+        cj = np.floor(self.lon.astype(np.float64) / tam_celda).astype(np.int64)
+        orden = np.lexsort((cj, ci))
+        ci_o, cj_o = ci[orden], cj[orden]
+        cortes = np.flatnonzero((np.diff(ci_o) != 0) | (np.diff(cj_o) != 0)) + 1
+        inicios = np.concatenate(([0], cortes))
+        fines = np.concatenate((cortes, [len(orden)]))
+        for a, b in zip(inicios, fines):
+            self.celdas[(int(ci_o[a]), int(cj_o[a]))] = orden[a:b]
+
+        self.limites = (int(ci.min()), int(ci.max()), int(cj.min()), int(cj.max()))
+        # Cota inferior (km) de lo que se avanza al cruzar una celda, en el peor paralelo
+        lat_extrema = min(89.0, max(abs(self.lat.min()), abs(self.lat.max())) + tam_celda)
+        self.km_min_por_celda = 0.99 * tam_celda * KM_POR_GRADO * math.cos(math.radians(lat_extrema))
+
+    def __len__(self):
+        return len(self.lat)
+
+    def _anillo(self, ci, cj, r):
+        if r == 0:
+            yield (ci, cj)
+            return
+        for dj in range(-r, r + 1):
+            yield (ci - r, cj + dj)
+            yield (ci + r, cj + dj)
+        for di in range(-r + 1, r):
+            yield (ci + di, cj - r)
+            yield (ci + di, cj + r)
+
+    def k_vecinos(self, lat, lon, k=1, excluir=None, radio_km=float('inf')):
+        # Devuelve (indices, distancias_km) ordenados por distancia. `excluir` es una
+        # máscara booleana del tamaño del índice (p. ej. bancos ya visitados).
+        vacio = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+        if not self.celdas or k <= 0: return vacio
+
+        ci = math.floor(lat / self.tam_celda)
+        cj = math.floor(lon / self.tam_celda)
+        i_min, i_max, j_min, j_max = self.limites
+        r_max = max(abs(ci - i_min), abs(ci - i_max), abs(cj - j_min), abs(cj - j_max))
+
+        mejores_idx = np.empty(0, dtype=np.int64)
+        mejores_d = np.empty(0, dtype=np.float64)
+        for r in range(r_max + 1):
+            # Lo que queda por ver (anillos >= r) está al menos a r-1 celdas completas
+            cota = max(r - 1, 0) * self.km_min_por_celda
+            if cota > radio_km: break
+            if len(mejores_d) >= k and mejores_d[k - 1] <= cota: break
+
+            bloques = [self.celdas[c] for c in self._anillo(ci, cj, r) if c in self.celdas]
+            if not bloques: continue
+            idx = np.concatenate(bloques) if len(bloques) > 1 else bloques[0]
+            if excluir is not None:
+                idx = idx[~excluir[idx]]
+                if len(idx) == 0: continue
+            d = haversine_vectorizado(lat, lon, self.lat[idx], self.lon[idx])
+            dentro = d <= radio_km
+            idx, d = idx[dentro], d[dentro]
+            if len(idx) == 0: continue
+
+            mejores_idx = np.concatenate((mejores_idx, idx))
+            mejores_d = np.concatenate((mejores_d, d))
+            if len(mejores_d) > k:
+                corte = np.argpartition(mejores_d, k - 1)[:k]
+                mejores_idx, mejores_d = mejores_idx[corte], mejores_d[corte]
+            orden = np.argsort(mejores_d, kind='stable')
+            mejores_idx, mejores_d = mejores_idx[orden], mejores_d[orden]
+
+        return mejores_idx, mejores_d
+
+    def en_rectangulo(self, lat_min, lat_max, lon_min, lon_max):
+        # Índices de los puntos dentro del rectángulo (solo se tocan las celdas que lo cubren)
+        if not self.celdas: return np.empty(0, dtype=np.int64)
+        i_min, i_max, j_min, j_max = self.limites
+        ci0 = max(math.floor(lat_min / self.tam_celda), i_min); ci1 = min(math.floor(lat_max / self.tam_celda), i_max)
+        cj0 = max(math.floor(lon_min / self.tam_celda), j_min); cj1 = min(math.floor(lon_max / self.tam_celda), j_max)
+        if ci0 > ci1 or cj0 > cj1: return np.empty(0, dtype=np.int64)
+        if (ci1 - ci0 + 1) * (cj1 - cj0 + 1) > len(self.celdas):
+            bloques = [v for (ci, cj), v in self.celdas.items() if ci0 <= ci <= ci1 and cj0 <= cj <= cj1]
+        else:
+            bloques = [self.celdas[(ci, cj)] for ci in range(ci0, ci1 + 1) for cj in range(cj0, cj1 + 1) if (ci, cj) in self.celdas]
+        if not bloques: return np.empty(0, dtype=np.int64)
+        idx = np.concatenate(bloques)
+        la, lo = self.lat[idx], self.lon[idx]
+        return idx[(la >= lat_min) & (la <= lat_max) & (lo >= lon_min) & (lo <= lon_max)]
+
+    def vecino_mas_cercano(self, lat, lon, excluir=None, radio_km=float('inf')):
+        idx, d = self.k_vecinos(lat, lon, 1, excluir, radio_km)
+        if len(idx) == 0: return None, float('inf')
+        return int(idx[0]), float(d[0])
@@ -0,0 +1,107 @@
+import time
+import threading
+from collections import Counter
+import numpy as np
+from sqlalchemy import select
+from . import models
+
+# --- AGREGADOS DE FLOTA EN MEMORIA ---
+# El dashboard y /kpis se sirven desde aquí, sin ir a la BD. Se recalculan con
+# una sola consulta (arranque, seeder, recarga) y entre medias se mantienen a
+# mano con las altas y los cambios de estado. Con varios workers cada uno tiene
+# su copia: TTL_SEGUNDOS acota cuánto puede quedar desfasada respecto a la BD.
+TTL_SEGUNDOS = 30
+TOP_BARCOS = 5
+ESTADO_FUERA_DE_SERVICIO = "MANTENIMIENTO"
+
+_E = models.Embarcacion
+CONSULTA_FLOTA = select(_E.estado, _E.material_casco, _E.capacidad_bodega, _E.nombre, _E.anio_fabricacion)
+
+class EstadisticasFlota:
+    def __init__(self, ttl_segundos=TTL_SEGUNDOS):
+        self.ttl_segundos = ttl_segundos
+        self._lock = threading.Lock()
+        self._cargado_en = None
+        self._limpiar()
+
+    def _limpiar(self):
+        self.total = 0
+        self.capacidad_total = 0.0
+        self.capacidad_operativa = 0.0  # todo lo que no está en MANTENIMIENTO
+        self.por_estado = Counter()
+        self.por_material = Counter()
+        self.top = []  # [(capacidad, nombre, anio)] de mayor a menor, máx. TOP_BARCOS
+
+    def _sumar(self, estado, material, capacidad, nombre, anio):
+        capacidad = capacidad or 0.0
+        self.total += 1
+        self.capacidad_total += capacidad
+        if estado != ESTADO_FUERA_DE_SERVICIO: self.capacidad_operativa += capacidad
+        self.por_estado[estado] += 1
+        self.por_material[material] += 1
+        if len(self.top) < TOP_BARCOS or capacidad > self.top[-1][0]:
+            self.top.append((capacidad, nombre, anio))
+            self.top.sort(key=lambda t: -t[0])
+            del self.top[TOP_BARCOS:]
+
+    def _cargar(self, filas):
+        with self._lock:
+            self._limpiar()
+            for f in filas: self._sumar(*f)
+            self._cargado_en = time.monotonic()
+
+    def recalcular(self, db):
+        self._cargar(db.execute(CONSULTA_FLOTA).all())
+
+    async def recalcular_async(self, db):
+        self._cargar((await db.execute(CONSULTA_FLOTA)).all())
+
+    @property
+    def vigente(self):
+        with self._lock:
+            return self._cargado_en is not None and time.monotonic() - self._cargado_en < self.ttl_segundos
+
+    def invalidar(self):
+        # La próxima lectura recalcula desde la BD (p. ej. tras el seeder)
+        with self._lock: self._cargado_en = None
+
+    def registrar_alta(self, barco):
+        with self._lock:
+            if self._cargado_en is None: return
+            self._sumar(barco.estado, barco.material_casco, barco.capacidad_bodega, barco.nombre, barco.anio_fabricacion)
+
+    def registrar_cambio_estado(self, estado_anterior, estado_nuevo, capacidad):
+        with self._lock:
+            if self._cargado_en is None or estado_anterior == estado_nuevo: return
+            self.por_estado[estado_anterior] -= 1
+            self.por_estado[estado_nuevo] += 1
+            capacidad = capacidad or 0.0
+            if estado_anterior == ESTADO_FUERA_DE_SERVICIO: self.capacidad_operativa += capacidad
+            if estado_nuevo == ESTADO_FUERA_DE_SERVICIO: self.capacidad_operativa -= capacidad
+
+    def instantanea(self):
+        # Copia consistente de los agregados (quien llama recalcula antes si no están vigentes)
+        with self._lock:
+            return {
+                "total": self.total, "capacidad_total": self.capacidad_total,
+                "capacidad_operativa": self.capacidad_operativa,
+                "por_estado": dict(self.por_estado), "por_material": dict(self.por_material),
+                "top": list(self.top),
+            }
+
+# --- BIOMASA POR ZONA (UNA VEZ POR DATASET) ---
+LIMITE_NORTE_CENTRO = -9
+LIMITE_CENTRO_SUR = -14
+# Franjas de latitud (lat_min, lat_max) inclusive; el orden desempata como antes
+ZONAS = {
+    "Norte (Paita-Chimbote)": (np.nextafter(LIMITE_NORTE_CENTRO, np.inf), np.inf),
+    "Centro (Callao-Pisco)": (LIMITE_CENTRO_SUR, LIMITE_NORTE_CENTRO),
+    "Sur (Ilo-Matarani)": (-np.inf, np.nextafter(LIMITE_CENTRO_SUR, -np.inf)),
+}
+
+def resumen_biomasa(rejilla):
+    # rejilla: biomasa.RejillaBiomasa del dataset (cada zona es una consulta a la rejilla)
+    if len(rejilla.lat) == 0: return {"total": 0.0, "zona_activa": "Sin actividad", "zonas": {}}
+    zonas = {nombre: rejilla.consultar(lat_min, lat_max, exacto=True)["toneladas"] for nombre, (lat_min, lat_max) in ZONAS.items()}
+    zona = max(zonas, key=zonas.get)
+    return {"total": float(rejilla.ton.sum(dtype=np.float64)), "zona_activa": zona, "zonas": zonas}
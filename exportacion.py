@@ -0,0 +1,59 @@
+import json
+import zlib
+import numpy as np
+
+from . import almacen
+
+# --- EXPORTACIÓN EN STREAMING DE BANCOS ---
+# Recorre df_bancos en bloques de FILAS_POR_BLOQUE: cada bloque se filtra, se
+# serializa y se entrega antes de pasar al siguiente, así la memoria pico no
+# depende del tamaño del dataset. Formatos: NDJSON (una fila JSON por línea) y
+# GeoJSON FeatureCollection (Point [lon, lat] + el resto de columnas en properties).
+FILAS_POR_BLOQUE = 5000
+NIVEL_GZIP = 6
+TIPOS = {"ndjson": "application/x-ndjson", "geojson": "application/geo+json"}
+
+def _mascara_bloque(bloque, c_lat, c_lon, c_ton, bbox, toneladas_min, toneladas_max):
+    ok = np.ones(len(bloque), dtype=bool)
+    if bbox is not None:
+        lon_min, lat_min, lon_max, lat_max = bbox
+        lat, lon = bloque[c_lat].to_numpy(), bloque[c_lon].to_numpy()
+        ok &= (lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)
+    if c_ton and (toneladas_min is not None or toneladas_max is not None):
+        ton = bloque[c_ton].to_numpy(dtype=np.float64)
+        if toneladas_min is not None: ok &= ton >= toneladas_min
+        if toneladas_max is not None: ok &= ton <= toneladas_max
+    return ok
+
+def bloques_filtrados(df, bbox=None, toneladas_min=None, toneladas_max=None, columnas=None, filas_por_bloque=FILAS_POR_BLOQUE):
+    # columnas: esquema normalizado del almacén de bancos ({"latitud": "Latitud", ...}), resuelto al cargar
+    columnas = columnas or almacen.columnas_normalizadas(df)
+    c_lat, c_lon, c_ton = columnas['latitud'], columnas['longitud'], columnas['toneladas']
+    for i in range(0, len(df), filas_por_bloque):
+        bloque = df.iloc[i:i + filas_por_bloque]
+        bloque = bloque[_mascara_bloque(bloque, c_lat, c_lon, c_ton, bbox, toneladas_min, toneladas_max)]
+        if len(bloque): yield bloque, c_lat, c_lon
+
+def ndjson(df, **filtros):
+    for bloque, _, _ in bloques_filtrados(df, **filtros):
+        yield bloque.to_json(orient='records', lines=True, date_format='iso', force_ascii=False).rstrip('\n') + '\n'
+
+def geojson(df, **filtros):
+    yield '{"type":"FeatureCollection","features":['
+    primero = True
+    for bloque, c_lat, c_lon in bloques_filtrados(df, **filtros):
+        features = []
+        for props in json.loads(bloque.to_json(orient='records', date_format='iso')):
+            punto = {"type": "Point", "coordinates": [props[c_lon], props[c_lat]]}
+            features.append(json.dumps({"type": "Feature", "geometry": punto, "properties": props}, ensure_ascii=False))
+        yield ('' if primero else ',') + ','.join(features)
+        primero = False
+    yield ']}\n'
+
+def gzip(partes, nivel=NIVEL_GZIP):
+    # Comprime al vuelo (formato gzip: wbits=31) sin juntar el cuerpo en memoria
+    compresor = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+    for parte in partes:
+        datos = compresor.compress(parte.encode('utf-8'))
+        if datos: yield datos
+    yield compresor.flush()
@@ -0,0 +1,213 @@
+#####################################################################################
+# [ALGORITMO 4] RUTEO DE FLOTA (CVRP MULTI-EMBARCACIÓN)
+#####################################################################################
+# Todas las embarcaciones salen y vuelven al mismo puerto y comparten los mismos
+# bancos: la biomasa de cada banco se reparte una sola vez entre la flota.
+#   1. Construcción por ahorros (Clarke-Wright) con capacidad = bodega mayor.
+#   2. Asignación de rutas a barcos (mayor carga -> mayor bodega), recorte de lo
+#      que no entra y relleno de bodegas libres por inserción más barata (aquí un
+#      banco puede quedar repartido entre dos barcos).
+#   3. Intercambios entre rutas (relocate / swap) guiados por listas de vecinos.
+#   4. Búsqueda local 2-opt / Or-opt de cada ruta, en paralelo entre procesos.
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from . import busqueda_local
+
+VECINOS_INTERCAMBIO = 15
+TIEMPO_LIMITE_MS = 2000
+# Por debajo de esta cantidad de paradas no compensa repartir la búsqueda local entre procesos
+MIN_PARADAS_PARALELO = 60
+EPS = 1e-9
+# Procesos por worker de uvicorn (con N workers son N pools): mismo tope que la cola de trabajos
+PROCESOS = int(os.getenv("RINGEN_FLOTA_PROCESOS", max(1, min(4, (os.cpu_count() or 2) - 1))))
+
+_pool_procesos = None
+
+def _pool():
+    global _pool_procesos
+    if _pool_procesos is None:
+        _pool_procesos = ProcessPoolExecutor(max_workers=PROCESOS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool_procesos
+
+def cerrar():
+    # Apagado de la app (main.cerrar_trabajos)
+    global _pool_procesos
+    pool, _pool_procesos = _pool_procesos, None
+    if pool is not None: pool.shutdown(wait=False, cancel_futures=True)
+
+# --- 1. AHORROS (CLARKE-WRIGHT) ---
+def _ahorros(d, demandas, q_max):
+    # d: matriz local (0 = puerto, 1..P = bancos del pool)
+    p = len(demandas)
+    d0 = d[0, 1:]
+    s = d0[:, None] + d0[None, :] - d[1:, 1:]
+    ii, jj = np.triu_indices(p, k=1)
+    valores = s[ii, jj]
+    positivos = valores > EPS
+    ii, jj, valores = ii[positivos], jj[positivos], valores[positivos]
+    orden = np.argsort(-valores, kind='stable')
+
+    rutas = {k: [k + 1] for k in range(p)}
+    ruta_de = list(range(p))
+    carga = {k: float(demandas[k]) for k in range(p)}
+    for a, b in zip(ii[orden].tolist(), jj[orden].tolist()):
+        ra, rb = ruta_de[a], ruta_de[b]
+        if ra == rb or carga[ra] + carga[rb] > q_max: continue
+        A, B = rutas[ra], rutas[rb]
+        na, nb = a + 1, b + 1
+        # Solo se unen extremos: ...a + b...
+        if A[-1] == na and B[0] == nb: nueva = A + B
+        elif A[0] == na and B[-1] == nb: nueva = B + A
+        elif A[-1] == na and B[-1] == nb: nueva = A + B[::-1]
+        elif A[0] == na and B[0] == nb: nueva = A[::-1] + B
+        else: continue
+        rutas[ra] = nueva; carga[ra] += carga[rb]
+        del rutas[rb]; del carga[rb]
+        for nodo in B: ruta_de[nodo - 1] = ra
+    return [(rutas[k], carga[k]) for k in rutas]
+
+def _longitud(d, paradas):
+    if not paradas: return 0.0
+    total = d[0][paradas[0]] + d[paradas[-1]][0]
+    for k in range(len(paradas) - 1): total += d[paradas[k]][paradas[k + 1]]
+    return total
+
+# --- 2. ASIGNACIÓN, RECORTE Y RELLENO ---
+def _asignar(rutas, capacidades, demandas, d):
+    orden_barcos = sorted(range(len(capacidades)), key=lambda v: -capacidades[v])
+    # Las rutas más cargadas (y a igualdad, más cortas) van a las bodegas más grandes
+    rutas = sorted(rutas, key=lambda rc: (-rc[1], _longitud(d, rc[0])))
+    restante = np.asarray(demandas, dtype=np.float64).copy()
+    paradas = [[] for _ in capacidades]
+    recogidas = [[] for _ in capacidades]
+    for v, (ruta, _) in zip(orden_barcos, rutas):
+        libre = capacidades[v]
+        for nodo in ruta:
+            pesca = min(restante[nodo - 1], libre)
+            if pesca <= EPS: continue
+            paradas[v].append(nodo); recogidas[v].append(pesca)
+            restante[nodo - 1] -= pesca; libre -= pesca
+    return paradas, recogidas, restante
+
+def _rellenar(paradas, recogidas, restante, capacidades, d_np):
+    for v in range(len(capacidades)):
+        libre = capacidades[v] - sum(recogidas[v])
+        while libre > EPS:
+            disponibles = np.flatnonzero(restante > EPS) + 1
+            disponibles = disponibles[~np.isin(disponibles, paradas[v])]
+            if len(disponibles) == 0: break
+            tour = np.asarray([0] + paradas[v] + [0])
+            costo = d_np[np.ix_(tour[:-1], disponibles)] + d_np[np.ix_(disponibles, tour[1:])].T - d_np[tour[:-1], tour[1:]][:, None]
+            pos, k = np.unravel_index(np.argmin(costo), costo.shape)
+            nodo = int(disponibles[k])
+            pesca = min(restante[nodo - 1], libre)
+            paradas[v].insert(int(pos), nodo); recogidas[v].insert(int(pos), float(pesca))
+            restante[nodo - 1] -= pesca; libre -= pesca
+
+# --- 3. INTERCAMBIOS ENTRE RUTAS ---
+def _intercambios(paradas, recogidas, capacidades, d, vecinos, fin):
+    cargas = [sum(r) for r in recogidas]
+
+    def vecinos_de(lista, pos):
+        prev = lista[pos - 1] if pos > 0 else 0
+        sig = lista[pos + 1] if pos < len(lista) - 1 else 0
+        return prev, sig
+
+    mejorado = True
+    while mejorado and time.perf_counter() < fin:
+        mejorado = False
+        ubicacion = {}
+        for v, lista in enumerate(paradas):
+            for pos, nodo in enumerate(lista): ubicacion.setdefault(nodo, []).append((v, pos))
+
+        for a in range(len(paradas)):
+            pos_x = 0
+            while pos_x < len(paradas[a]):
+                x = paradas[a][pos_x]; carga_x = recogidas[a][pos_x]
+                p, s = vecinos_de(paradas[a], pos_x)
+                ganancia = d[p][x] + d[x][s] - d[p][s]
+                movido = False
+                for c in vecinos[x]:
+                    if c == 0 or c not in ubicacion: continue
+                    for b, pos_c in ubicacion[c]:
+                        if b == a or x in paradas[b] or pos_c >= len(paradas[b]) or paradas[b][pos_c] != c: continue
+                        # RELOCATE: x pasa a la ruta b, junto a c
+                        if cargas[b] + carga_x <= capacidades[b] + EPS:
+                            for q in (pos_c, pos_c + 1):
+                                u = paradas[b][q - 1] if q > 0 else 0
+                                w = paradas[b][q] if q < len(paradas[b]) else 0
+                                if d[u][x] + d[x][w] - d[u][w] - ganancia < -EPS:
+                                    paradas[a].pop(pos_x); recogidas[a].pop(pos_x)
+                                    paradas[b].insert(q, x); recogidas[b].insert(q, carga_x)
+                                    cargas[a] -= carga_x; cargas[b] += carga_x
+                                    movido = True
+                                    break
+                        if movido: break
+                        # SWAP: x ocupa el lugar de c y viceversa
+                        carga_c = recogidas[b][pos_c]
+                        if c in paradas[a]: continue
+                        if cargas[b] - carga_c + carga_x > capacidades[b] + EPS: continue
+                        if cargas[a] - carga_x + carga_c > capacidades[a] + EPS: continue
+                        u, w = vecinos_de(paradas[b], pos_c)
+                        delta = (d[p][c] + d[c][s] - d[p][x] - d[x][s]) + (d[u][x] + d[x][w] - d[u][c] - d[c][w])
+                        if delta < -EPS:
+                            paradas[a][pos_x], paradas[b][pos_c] = c, x
+                            recogidas[a][pos_x], recogidas[b][pos_c] = carga_c, carga_x
+                            cargas[a] += carga_c - carga_x; cargas[b] += carga_x - carga_c
+                            movido = True
+                            break
+                    if movido: break
+                if movido:
+                    mejorado = True
+                    break
+                pos_x += 1
+            if mejorado or time.perf_counter() >= fin: break
+
+def resolver_flota(deposito, capacidades, pool, demandas, matriz, tiempo_limite_ms=TIEMPO_LIMITE_MS):
+    # deposito: índice del puerto en `matriz`; pool: índices de bancos candidatos;
+    # demandas: toneladas de cada banco del pool; capacidades: bodega de cada barco.
+    # Devuelve, por barco: (ruta_indices, recogidas, distancia_construccion, distancia_final).
+    # distancia_construccion se toma tras los intercambios (que mueven paradas entre barcos):
+    # es la ruta que recibe la búsqueda local, así distancia_final <= distancia_construccion
+    fin = time.perf_counter() + tiempo_limite_ms / 1000.0
+    nodos = np.concatenate(([deposito], np.asarray(pool, dtype=np.int64)))
+    d_np = np.asarray(matriz)[np.ix_(nodos, nodos)].astype(np.float64)
+    d = d_np.tolist()
+
+    paradas = [[] for _ in capacidades]
+    recogidas = [[] for _ in capacidades]
+    if len(pool) and len(capacidades):
+        rutas = _ahorros(d_np, demandas, max(capacidades))
+        paradas, recogidas, restante = _asignar(rutas, capacidades, demandas, d)
+        _rellenar(paradas, recogidas, restante, capacidades, d_np)
+
+    if len(pool) > 1:
+        orden = np.argsort(d_np, axis=1, kind='stable')[:, 1:VECINOS_INTERCAMBIO + 1]
+        _intercambios(paradas, recogidas, capacidades, d, orden.tolist(), fin)
+    distancias_base = [_longitud(d, p) for p in paradas]
+
+    # [FASE 4] BÚSQUEDA LOCAL POR RUTA (procesos en paralelo si hay trabajo suficiente)
+    restante_ms = max(1.0, (fin - time.perf_counter()) * 1000)
+    tareas = []
+    for p in paradas:
+        locales = [0] + p
+        tareas.append((d_np[np.ix_(locales, locales)], [0] + list(range(1, len(locales))) + [0]))
+    if len(paradas) > 1 and sum(len(p) for p in paradas) >= MIN_PARADAS_PARALELO:
+        futuros = [_pool().submit(busqueda_local.optimizar_ruta, ruta, sub, tiempo_limite_ms=restante_ms) for sub, ruta in tareas]
+        optimizadas = [f.result() for f in futuros]
+    else:
+        optimizadas = [busqueda_local.optimizar_ruta(ruta, sub, tiempo_limite_ms=restante_ms) for sub, ruta in tareas]
+
+    resultado = []
+    for v, (ruta_local, dist_final) in enumerate(optimizadas):
+        carga_por_nodo = dict(zip(paradas[v], recogidas[v]))
+        locales = [0] + paradas[v]
+        ruta = [int(nodos[locales[l]]) for l in ruta_local]
+        recog = [carga_por_nodo.get(locales[l], 0.0) if 0 < k < len(ruta_local) - 1 else 0.0 for k, l in enumerate(ruta_local)]
+        resultado.append((ruta, recog, distancias_base[v], dist_final))
+    return resultado
@@ -0,0 +1,157 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import functools
+import numpy as np
+import pandas as pd
+from . import bitacora
+
+log = bitacora.obtener(__name__)
+
+# --- FUENTES DE DATOS (EXCEL/CSV) CON CACHÉ COLUMNAR ---
+# La primera lectura de cada archivo se guarda junto a él, en <dir>/.cache/, como
+# una columna .npy por campo. Los arranques siguientes abren esas columnas con
+# memory-map en lugar de volver a parsear el Excel. La clave de caché es el
+# tamaño + mtime del archivo fuente y las opciones de lectura: si cambia
+# cualquiera, se vuelve a generar.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DIR_CACHE = '.cache'
+VERSION_FORMATO = 1
+# Carpeta de datasets alternativa (p. ej. los sintéticos de benchmark.py): se busca primero
+DIR_DATOS = os.getenv("RINGEN_DIR_DATOS")
+
+# Archivos que usa load_data: nombre parcial -> opciones de lectura
+FUENTES = {
+    "bancos": {},
+    "descargas": {"sep": ';', "encoding": 'latin-1', "on_bad_lines": 'skip'},
+    "datos_embarcaciones": {"sheet_name": 0},
+}
+
+@functools.lru_cache(maxsize=None)
+def encontrar_archivo(nombre_parcial):
+    rutas = ([DIR_DATOS] if DIR_DATOS else []) + [os.path.join(BASE_DIR, 'dataset'), BASE_DIR, os.path.join(BASE_DIR, '..'), os.path.join(BASE_DIR, '..', 'dataset')]
+    for d in rutas:
+        if os.path.exists(d):
+            for f in sorted(os.listdir(d)):
+                if nombre_parcial.lower() in f.lower() and not f.startswith('~$') and os.path.isfile(os.path.join(d, f)):
+                    return os.path.join(d, f)
+    return None
+
+def _parsear(ruta, opciones):
+    if ruta.lower().endswith('.csv'):
+        return pd.read_csv(ruta, **opciones)
+    return pd.read_excel(ruta, **opciones)
+
+def _clave(ruta, opciones):
+    st = os.stat(ruta)
+    firma = json.dumps([VERSION_FORMATO, st.st_size, st.st_mtime_ns, sorted(opciones.items())], default=str)
+    return hashlib.sha1(firma.encode()).hexdigest()[:16]
+
+def _dir_cache(ruta, clave):
+    base = os.path.basename(ruta)
+    return os.path.join(os.path.dirname(ruta), DIR_CACHE, f"{base}-{clave}")
+
+def _guardar(df, destino):
+    tmp = f"{destino}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    columnas = []
+    for k, col in enumerate(df.columns):
+        serie = df[col]
+        archivo = f"{k}.npy"
+        if isinstance(serie.dtype, np.dtype) and serie.dtype.kind in 'biufcmM':
+            np.save(os.path.join(tmp, archivo), serie.to_numpy(), allow_pickle=False)
+            columnas.append({"nombre": str(col), "archivo": archivo, "tipo": "numerico"})
+        else:
+            # Texto u objetos: unicode de ancho fijo (mapeable) + máscara de nulos
+            nulos = serie.isna().to_numpy()
+            texto = np.asarray(['' if n else str(v) for v, n in zip(serie.tolist(), nulos)], dtype=np.str_)
+            np.save(os.path.join(tmp, archivo), texto, allow_pickle=False)
+            np.save(os.path.join(tmp, f"{k}.nulos.npy"), nulos, allow_pickle=False)
+            columnas.append({"nombre": str(col), "archivo": archivo, "tipo": "texto"})
+    with open(os.path.join(tmp, 'columnas.json'), 'w', encoding='utf-8') as f:
+        json.dump({"version": VERSION_FORMATO, "filas": len(df), "columnas": columnas}, f, ensure_ascii=False)
+    os.replace(tmp, destino)
+
+def _abrir(origen):
+    with open(os.path.join(origen, 'columnas.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+    datos = {}
+    for k, c in enumerate(meta['columnas']):
+        valores = np.load(os.path.join(origen, c['archivo']), mmap_mode='r', allow_pickle=False)
+        if c['tipo'] == 'texto':
+            nulos = np.load(os.path.join(origen, f"{k}.nulos.npy"), allow_pickle=False)
+            valores = pd.Series(valores.astype(object)).mask(nulos)
+        datos[c['nombre']] = valores
+    return pd.DataFrame(datos, copy=False)
+
+def _limpiar_versiones_viejas(ruta, vigente):
+    d = os.path.join(os.path.dirname(ruta), DIR_CACHE)
+    prefijo = os.path.basename(ruta) + '-'
+    for nombre in os.listdir(d):
+        completo = os.path.join(d, nombre)
+        if nombre.startswith(prefijo) and completo != vigente and '.tmp-' not in nombre:
+            shutil.rmtree(completo, ignore_errors=True)
+
+def leer_tabla(ruta, forzar=False, **opciones):
+    destino = _dir_cache(ruta, _clave(ruta, opciones))
+    if not forzar and os.path.exists(os.path.join(destino, 'columnas.json')):
+        try:
+            return _abrir(destino)
+        except (OSError, ValueError, KeyError) as e:
+            log.warning(f"Caché {destino} ilegible, se regenera", extra={"campos": {"error": str(e)}})
+            forzar = True  # si no, el directorio dañado sigue ahí y no se reescribe
+
+    df = _parsear(ruta, opciones)
+    try:
+        if forzar: shutil.rmtree(destino, ignore_errors=True)
+        if not os.path.exists(destino): _guardar(df, destino)
+        _limpiar_versiones_viejas(ruta, destino)
+    except OSError as e:
+        log.warning(f"No se pudo escribir la caché {destino}", extra={"campos": {"error": str(e)}})
+    return df
+
+def leer_fuente(nombre_parcial, forzar=False):
+    # Devuelve el DataFrame de la fuente registrada en FUENTES (o None si no hay archivo)
+    ruta = encontrar_archivo(nombre_parcial)
+    if not ruta: return None
+    return leer_tabla(ruta, forzar=forzar, **FUENTES[nombre_parcial])
+
+def firma(*nombres):
+    # (ruta, mtime, tamaño) de cada fuente: cambia si llega un archivo nuevo o se
+    # reemplaza uno. Vuelve a buscar en disco (sin la caché de encontrar_archivo).
+    encontrar_archivo.cache_clear()
+    res = []
+    for nombre in nombres:
+        ruta = encontrar_archivo(nombre)
+        if ruta is None:
+            res.append(None)
+            continue
+        st = os.stat(ruta)
+        res.append((ruta, st.st_mtime_ns, st.st_size))
+    return tuple(res)
+
+# --- CLI: reconstruir la caché antes del despliegue ---
+#   python -m <paquete>.fuentes [--forzar] [fuente ...]
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera la caché columnar de los datasets (Excel/CSV).")
+    parser.add_argument('fuentes', nargs='*', default=list(FUENTES), help=f"Fuentes a procesar (por defecto: {', '.join(FUENTES)})")
+    parser.add_argument('--forzar', action='store_true', help="Regenera aunque la caché esté vigente")
+    args = parser.parse_args(argv)
+
+    codigo = 0
+    for nombre in args.fuentes:
+        if nombre not in FUENTES:
+            print(f"❌ Fuente desconocida: {nombre}"); codigo = 1; continue
+        ruta = encontrar_archivo(nombre)
+        if not ruta:
+            print(f"⚠️ {nombre}: archivo no encontrado."); continue
+        df = leer_tabla(ruta, forzar=args.forzar, **FUENTES[nombre])
+        print(f"✅ {nombre}: {len(df)} filas -> {_dir_cache(ruta, _clave(ruta, FUENTES[nombre]))}")
+    return codigo
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+import os
+import json
+import threading
+import numpy as np
+
+# --- CLASIFICADOR MAR / TIERRA (VECTORIZADO) ---
+# El litoral vive en dataset/litoral_peru.geojson (polígono de mar, [lon, lat]).
+# Al primer uso se rasteriza a un mapa de bits mar/tierra y cada consulta es
+# solo indexación de arrays: millones de puntos en milisegundos.
+ARCHIVO_LITORAL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dataset', 'litoral_peru.geojson')
+
+LAT_NORTE, LAT_SUR = -3.0, -19.0      # Filtro general (mismo rango que antes)
+LON_OESTE, LON_ESTE = -90.0, -68.0
+RESOLUCION = 0.01                     # grados por celda (~1.1 km)
+
+# Margen pequeño solo para limpiar ruido extremo: el punto debe seguir en el mar
+# aunque se corra este tanto hacia el este (hacia la costa)
+MARGEN_TIERRA = 0.1
+
+def _leer_poligono(ruta):
+    with open(ruta, encoding='utf-8') as f:
+        geo = json.load(f)
+    anillos = []
+    for feat in geo.get('features', [geo]):
+        geom = feat.get('geometry', feat)
+        poligonos = geom['coordinates'] if geom['type'] == 'MultiPolygon' else [geom['coordinates']]
+        for poligono in poligonos:
+            for anillo in poligono:
+                anillos.append(np.asarray(anillo, dtype=np.float64))
+    return anillos
+
+class MascaraMar:
+    def __init__(self, anillos, resolucion=RESOLUCION):
+        self.resolucion = resolucion
+        self.filas = int(round((LAT_NORTE - LAT_SUR) / resolucion))
+        self.columnas = int(round((LON_ESTE - LON_OESTE) / resolucion))
+        self.mar = np.zeros((self.filas, self.columnas), dtype=bool)
+
+        # Aristas de todos los anillos (regla par-impar: los huecos se restan solos)
+        x0 = np.concatenate([a[:-1, 0] for a in anillos]); y0 = np.concatenate([a[:-1, 1] for a in anillos])
+        x1 = np.concatenate([a[1:, 0] for a in anillos]); y1 = np.concatenate([a[1:, 1] for a in anillos])
+        centros_lon = LON_OESTE + (np.arange(self.columnas) + 0.5) * resolucion
+
+        # Barrido por filas: cruces de cada paralelo con las aristas, se rellena entre pares
+        for fila in range(self.filas):
+            lat = LAT_NORTE - (fila + 0.5) * resolucion
+            cruza = (y0 > lat) != (y1 > lat)
+            if not cruza.any(): continue
+            xs = x0[cruza] + (lat - y0[cruza]) * (x1[cruza] - x0[cruza]) / (y1[cruza] - y0[cruza])
+            xs.sort()
+            for a, b in zip(xs[0::2], xs[1::2]):
+                self.mar[fila, (centros_lon >= a) & (centros_lon < b)] = True
+
+    def es_mar(self, lat, lon):
+        lat, lon = np.broadcast_arrays(np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64))
+        fila = np.floor((LAT_NORTE - lat) / self.resolucion).astype(np.int64)
+        col = np.floor((lon - LON_OESTE) / self.resolucion).astype(np.int64)
+        dentro = (fila >= 0) & (fila < self.filas) & (col >= 0) & (col < self.columnas)
+        res = np.zeros(lat.shape, dtype=bool)
+        res[dentro] = self.mar[fila[dentro], col[dentro]]
+        return res
+
+_mascara = None
+_lock = threading.Lock()
+
+def mascara_mar():
+    global _mascara
+    if _mascara is None:
+        with _lock:
+            if _mascara is None:
+                _mascara = MascaraMar(_leer_poligono(ARCHIVO_LITORAL))
+    return _mascara
+
+def es_en_mar(lat, lon):
+    # Acepta escalares o arrays; devuelve bool o array de bool
+    lat, lon = np.broadcast_arrays(np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64))
+    res = (lat <= LAT_NORTE) & (lat >= LAT_SUR) & ~np.isnan(lat) & ~np.isnan(lon)
+    mascara = mascara_mar()
+    res &= mascara.es_mar(lat, lon) & mascara.es_mar(lat, lon + MARGEN_TIERRA)
+    return bool(res) if res.ndim == 0 else res
@@ -1,42 +1,36 @@
-from fastapi import FastAPI, HTTPException, Depends, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from fastapi import FastAPI, HTTPException, Depends, status, Request, Response, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, or_, event, inspect
 from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
-import pandas as pd
 import numpy as np
-import math
-import os
+import time
+import json
+import asyncio
+import threading
+import hashlib
 import itertools 
+from collections import namedtuple
 from jose import jwt, JWTError
 
 # Imports Locales
-from . import models, schemas, database, auth
+from . import models, schemas, database, auth, distancias, espacial, busqueda_local, flota, cache_rutas, litoral, arranque, mapa, estadisticas, metricas, bitacora, exportacion, serializacion, trabajos, biomasa, publicacion, escenarios, almacen, navegacion, compartido
+from .mapa import map_gps_to_css
+# pandas (y fuentes, que lo usa) se importan dentro de load_data: el proceso
+# abre el puerto sin esperar esa importación
 
 app = FastAPI(title="Ringensoft API Real", version="5.0.0 - Production Ready")
+bitacora.configurar()
+log = bitacora.obtener(__name__)
 
 # --- CONFIGURACIÓN VISUAL ---
 # Mueve los peces a la izquierda sin tocar los puertos.
 # Si siguen en tierra, sube a 2.0 o 2.5
 OFFSET_VISUAL_BANCOS = 4.5
 
-# --- SEGURIDAD ---
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
-
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
-    try:
-        payload = auth.decodificar_token(token)
-        if payload is None:
-            raise HTTPException(status_code=401, detail="Token inválido")
-        username: str = payload.get("sub")
-        user = db.query(models.Usuario).filter(models.Usuario.username == username).first()
-        if user is None:
-            raise HTTPException(status_code=401, detail="Usuario no encontrado")
-        return user
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Sesión expirada o inválida")
-
 # --- CORS ---
 app.add_middleware(
     CORSMiddleware,
@@ -46,99 +40,174 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Crear tablas
-models.Base.metadata.create_all(bind=database.engine)
+# --- MÉTRICAS HTTP ---
+# Latencia por ruta (plantilla, no URL concreta: /embarcaciones/{id_embarcacion}/estado)
+@app.middleware("http")
+async def medir_peticiones(request: Request, call_next):
+    t0 = time.perf_counter()
+    codigo = 500
+    try:
+        respuesta = await call_next(request)
+        codigo = respuesta.status_code
+        return respuesta
+    finally:
+        ruta = getattr(request.scope.get("route"), "path", "sin_ruta")
+        metricas.PETICIONES_HTTP.observar(time.perf_counter() - t0, metodo=request.method, ruta=ruta, codigo=codigo)
 
 # --- VARIABLES GLOBALES ---
-df_bancos = pd.DataFrame()
-df_puertos = pd.DataFrame()
-matriz_distancias = {} 
-
-# --- UTILITARIOS GEOESPACIALES ---
-def map_gps_to_css(lat, lon):
-    # Calibración OFICIAL para "Peru_location_map.svg"
-    map_norte = 0.73      
-    map_sur = -19.36      
-    map_oeste = -83.25    
-    map_este = -66.75     
-
-    y = (lat - map_norte) / (map_sur - map_norte) * 100
-    x = (lon - map_oeste) / (map_este - map_oeste) * 100
-    
-    return x, y
-
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371 
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    return R * c
-
-def es_en_mar(lat, lon):
-    # 1. Filtro general
-    if lat > -3.0 or lat < -19.0: return False
-    
-    # 2. DEFINICIÓN DEL LITORAL POR TRAMOS (Tu lógica mejorada)
-    if lat > -6.0:
-        # TRAMO 1: NORTE (Tumbes a Bayóvar)
-        lon_costa = -81.0 + (lat + 6) * 0.2 
-        
-    elif lat > -14.0:
-        # TRAMO 2: CENTRO (Bayóvar a Paracas)
-        pendiente = (-76.0 - (-81.0)) / (-14.0 - (-6.0)) 
-        lon_costa = -81.0 + (lat + 6) * pendiente
-        
-    else:
-        # TRAMO 3: SUR (Paracas a Tacna)
-        pendiente = (-70.5 - (-76.0)) / (-18.3 - (-14.0)) 
-        lon_costa = -76.0 + (lat + 14) * pendiente
+# datos.actual: publicacion.Dataset publicado (bancos, puertos, matriz de distancias,
+# índice espacial, capa del mapa, rejilla de biomasa, versión). None hasta que la
+# carga en segundo plano termina (ver load_data y /ready); cada endpoint lo lee
+# una sola vez y usa esa referencia aunque llegue una recarga a mitad.
+datos = publicacion.Publicador()
+FUENTES_DATASET = ("bancos", "descargas")  # archivos que vigila la recarga
+cache_resultados_ruta = cache_rutas.CacheRutas()
+estadisticas_flota = estadisticas.EstadisticasFlota()
+gestor_trabajos = trabajos.GestorTrabajos()  # /optimizar-ruta/jobs (procesos aparte)
+# En modo compartido "snapshot" (armar o abrir + escribir el snapshot) también retiene /ready
+_FASE_SNAPSHOT = ["snapshot"] if compartido.DIR_SNAPSHOT else []
+estado_arranque = arranque.EstadoArranque(
+    fases=["db"] + _FASE_SNAPSHOT + ["bancos", "puertos", "matriz", "flota"],
+    requeridas=["db"] + _FASE_SNAPSHOT + ["bancos", "puertos", "matriz"]
+)
 
-    # Margen pequeño solo para limpiar ruido extremo
-    margen_tierra = 0.1 
-    lon_limite = lon_costa - margen_tierra
-    
-    return lon < lon_limite
-
-def encontrar_archivo(nombre_parcial):
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    rutas = [os.path.join(base_dir, 'dataset'), base_dir, os.path.join(base_dir, '..'), os.path.join(base_dir, '..', 'dataset')]
-    for d in rutas:
-        if os.path.exists(d):
-            for f in os.listdir(d):
-                if nombre_parcial.lower() in f.lower() and not f.startswith('~$'):
-                    return os.path.join(d, f)
-    return None
-
-# --- CARGA DE DATOS ---
+# Tamaños y cachés: se leen al momento de exportar /metrics
+metricas.Medidor("ringensoft_dataset_filas", "Filas de cada dataset publicado", ("dataset",), funcion=lambda: {
+    (k,): v for k, v in datos.actual.resumen().items() if k in ("bancos", "puertos", "nodos_matriz")
+} if datos.actual else {})
+metricas.Medidor("ringensoft_matriz_bytes", "Memoria de la matriz de distancias", funcion=lambda: datos.actual.matriz.valores.nbytes if datos.actual and datos.actual.matriz else 0)
+metricas.Medidor("ringensoft_version_dataset", "Cargas de datos publicadas desde el arranque", funcion=lambda: datos.actual.version if datos.actual else 0)
+metricas.Medidor("ringensoft_datasets_vivos", "Datasets todavía en memoria (el publicado + los que usan peticiones en curso)", funcion=lambda: len(datos.vivos()))
+metricas.Medidor("ringensoft_cache_entradas", "Entradas en memoria por caché", ("cache",), funcion=lambda: {
+    ("rutas",): len(cache_resultados_ruta), ("principales",): len(auth.principales),
+})
+metricas.Medidor("ringensoft_trabajos", "Trabajos de ruteo en memoria por estado", ("estado",), funcion=lambda: {
+    (e,): n for e, n in gestor_trabajos.por_estado().items()
+})
+metricas.Contador("ringensoft_cache_consultas_total", "Consultas a las cachés por resultado", ("cache", "resultado"), funcion=lambda: {
+    ("rutas", "acierto"): cache_resultados_ruta.aciertos, ("rutas", "fallo"): cache_resultados_ruta.fallos,
+    ("principales", "acierto"): auth.principales.aciertos, ("principales", "fallo"): auth.principales.fallos,
+})
+
+async def get_db():
+    # database.get_db_async, pero con 503 mientras la carga no haya creado las tablas
+    if not estado_arranque.fase_terminada("db"):
+        raise HTTPException(status_code=503, detail="Base de datos iniciándose, reintente en unos segundos", headers={"Retry-After": "5"})
+    async for db in database.get_db_async():
+        yield db
+
+def datos_listos():
+    # Las fases marcan LISTO antes de que el Dataset se publique: también hace falta datos.actual
+    return estado_arranque.listo and datos.actual is not None
+
+def requiere_datos():
+    # Endpoints que leen datos.actual (bancos, puertos, matriz): 503 hasta que se publique el dataset
+    if not datos_listos():
+        raise HTTPException(status_code=503, detail="Cargando datos, reintente en unos segundos", headers={"Retry-After": "5"})
+
+# Radio máximo (km) para saltar al siguiente banco en la fase greedy
+RADIO_MAX_SALTO_KM = 600
+
+# --- SEGURIDAD ---
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+
+# Devuelve un auth.Principal (copia plana del usuario) cacheado por token: las
+# peticiones repetidas con el mismo token no decodifican ni consultan la BD
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    async def cargar(payload):
+        username: str = payload.get("sub")
+        user = (await db.execute(select(models.Usuario).where(models.Usuario.username == username))).scalars().first()
+        return auth.principal_de(user) if user is not None else None
+    with metricas.AUTH.medir(operacion="principal"):
+        try:
+            principal = await auth.obtener_principal(token, cargar)
+        except Exception as e:
+            principal = None
+    if principal is None:
+        raise HTTPException(status_code=401, detail="Sesión expirada o inválida")
+    return principal
+
+# Cualquier cambio o baja de un usuario (desde la API, un script o la consola) saca
+# sus tokens del caché de principales; si cambió el username, también los del anterior
+@event.listens_for(models.Usuario, "after_update")
+@event.listens_for(models.Usuario, "after_delete")
+def _usuario_modificado(mapper, connection, usuario):
+    anteriores = inspect(usuario).attrs.username.history.deleted or ()
+    auth.invalidar_usuario(usuario.username, *anteriores)
+
+def auth_saturado(request: Request, exc: auth.AuthSaturado):
+    return JSONResponse(status_code=503, content={"detail": "Demasiados inicios de sesión simultáneos, reintente"}, headers={"Retry-After": "1"})
+
+app.add_exception_handler(auth.AuthSaturado, auth_saturado)
+
+# --- CARGA DE DATOS (EN SEGUNDO PLANO) ---
 @app.on_event("startup")
-def load_data():
-    global df_bancos, df_puertos, matriz_distancias
-    print("\n🔄 INICIANDO SISTEMA RINGENSOFT (CORE)...")
+def iniciar_carga():
+    threading.Thread(target=load_data, name="ringensoft-carga", daemon=True).start()
+
+@app.on_event("shutdown")
+def cerrar_trabajos():
+    gestor_trabajos.cerrar()
+    flota.cerrar()
+
+# Estructuras de ruteo sobre bancos + puertos. Las usa _construir_dataset y también cada
+# proceso de la cola de trabajos (_iniciar_proceso_rutas), que las arma una vez
+def _estructuras_ruteo(almacen_b, puertos):
+    # Índices 0..B-1 = bancos (mismo orden que el almacén), B..B+P-1 = puertos
+    ids = almacen_b.ids.astype(str).tolist()
+    lats, lons = [almacen_b.lat], [almacen_b.lon]
+    if not puertos.empty:
+        ids += puertos['id'].astype(str).tolist()
+        lats.append(puertos['latitud'].to_numpy(dtype=np.float32))
+        lons.append(puertos['longitud'].to_numpy(dtype=np.float32))
+    lat, lon = np.concatenate(lats), np.concatenate(lons)
+    # Distancias marítimas si están precalculadas para estos nodos (navegacion.py), si no haversine.
+    # Por encima de distancias.MAX_NODOS no se arma: el mapa y los reportes siguen, el ruteo responde 503
+    try:
+        matriz = distancias.MatrizDistancias(ids, lat, lon, valores=navegacion.cargar(ids, lat, lon))
+    except distancias.MatrizDemasiadoGrande as e:
+        log.warning(f"Sin matriz de distancias: {e}", extra={"campos": {"nodos": len(ids), "max_nodos": distancias.MAX_NODOS}})
+        matriz = None
+    indice = espacial.IndiceEspacial(almacen_b.lat, almacen_b.lon)  # comparte los arrays del almacén
+    return matriz, indice
+
+# Bancos del archivo con coordenadas válidas y en el mar (DataFrame vacío si no hay archivo)
+def _leer_bancos():
+    import pandas as pd
+    from . import fuentes
+    if not fuentes.encontrar_archivo("bancos"): return pd.DataFrame()
+    df = fuentes.leer_fuente("bancos")
+    df.columns = [c.strip() for c in df.columns]
+    cols = {c.lower(): c for c in df.columns}
+    c_lat, c_lon = cols.get('latitud'), cols.get('longitud')
+    if not (c_lat and c_lon): return pd.DataFrame()
+    df[c_lat] = pd.to_numeric(df[c_lat], errors='coerce')
+    df[c_lon] = pd.to_numeric(df[c_lon], errors='coerce')
+    df = df.dropna(subset=[c_lat, c_lon])
+    # Clasificador mar/tierra vectorizado (mapa de bits del litoral)
+    mask = litoral.es_en_mar(df[c_lat].to_numpy(), df[c_lon].to_numpy())
+    bancos = df[mask].copy()
+    log.info("Bancos validados en el mar", extra={"campos": {"bancos": len(bancos), "leidos": len(df)}})
+    return bancos
+
+# Bancos, puertos y estructuras derivadas -> publicacion.Dataset (inmutable).
+# fase: estado_arranque.fase en el arranque (un error no corta la carga) o
+# arranque.medir_fase en las recargas (un error conserva el dataset anterior)
+def _construir_dataset(version, fase):
+    import pandas as pd
+    from . import fuentes
+    firma = fuentes.firma(*FUENTES_DATASET)
+    bancos, puertos = pd.DataFrame(), pd.DataFrame()
+    almacen_b, matriz, indice, capa, zonas, rejilla = None, None, None, None, None, None
 
     # 1. CARGA DE BANCOS
-    f_bancos = encontrar_archivo("bancos")
-    if f_bancos:
-        try:
-            df = pd.read_csv(f_bancos) if f_bancos.endswith('.csv') else pd.read_excel(f_bancos)
-            df.columns = [c.strip() for c in df.columns]
-            cols = {c.lower(): c for c in df.columns}
-            c_lat, c_lon = cols.get('latitud'), cols.get('longitud')
-            if c_lat and c_lon:
-                df[c_lat] = pd.to_numeric(df[c_lat], errors='coerce')
-                df[c_lon] = pd.to_numeric(df[c_lon], errors='coerce')
-                df = df.dropna(subset=[c_lat, c_lon])
-                # Aplicamos tu filtro por tramos
-                mask = df.apply(lambda r: es_en_mar(r[c_lat], r[c_lon]), axis=1)
-                df_bancos = df[mask].copy()
-                print(f"✅ DATASET: {len(df_bancos)} Bancos validados en MAR.")
-        except Exception as e: print(f"❌ Error bancos: {e}")
+    with fase("bancos"):
+        bancos = _leer_bancos()
 
     # 2. CARGA DE PUERTOS
-    f_desc = encontrar_archivo("descargas")
-    if f_desc:
-        try:
-            df_d = pd.read_csv(f_desc, sep=';', encoding='latin-1', on_bad_lines='skip')
+    with fase("puertos"):
+        if fuentes.encontrar_archivo("descargas"):
+            df_d = fuentes.leer_fuente("descargas")
             ptos_reales = {
                 'CHIMBOTE': (-9.08, -78.59), 'CALLAO': (-12.05, -77.15), 'PISCO': (-13.70, -76.20),
                 'PAITA': (-5.09, -81.11), 'ILO': (-17.64, -71.34), 'MATARANI': (-17.00, -72.10),
@@ -158,85 +227,179 @@ def load_data():
             if not lista:
                 for k, v in ptos_reales.items():
                     lista.append({'id': k, 'nombre': k, 'latitud': v[0], 'longitud': v[1]})
-            df_puertos = pd.DataFrame(lista)
-            print(f"✅ DATASET: {len(df_puertos)} Puertos activos.")
-        except: pass
-
-    # 3. SEEDER FLOTA
-    db = database.SessionLocal()
-    try:
-        count_system = db.query(models.Embarcacion).filter(models.Embarcacion.id_embarcacion.like("SYSTEM%")).count()
-        if count_system == 0:
-            f_flota = encontrar_archivo("datos_embarcaciones")
-            if f_flota:
-                print("⚡ DB: Poblando flota inicial...")
-                df_excel = pd.read_excel(f_flota, sheet_name=0)
-                df_excel.columns = [c.strip() for c in df_excel.columns]
-                df_excel = df_excel.fillna(0)
-                cols = {c.lower(): c for c in df_excel.columns}
-                batch = []
-                for idx, r in df_excel.iterrows():
-                    sys_id = f"SYSTEM-{idx:04d}"
-                    tipo_casco = str(r.get(cols.get('tipo de casco'), 'Nave')).upper()
-                    nombre_generado = f"Ringen-{idx+1:03d} {tipo_casco[:3]}" 
-                    nuevo = models.Embarcacion(
-                        id_embarcacion=sys_id, nombre=nombre_generado,
-                        capacidad_bodega=float(r.get(cols.get('capacidad de carga (tm)'), 0)),
-                        velocidad_promedio=float(r.get(cols.get('velocidad promedio (nudos)'), 12)),
-                        consumo_combustible=float(r.get(cols.get('consumo combustible (l/km)'), 1.5)),
-                        material_casco=tipo_casco, tripulacion_maxima=int(r.get(cols.get('tripulación máxima'), 10)),
-                        anio_fabricacion=int(r.get(cols.get('año de fabricación'), 2010)), owner_id=None
-                    )
-                    batch.append(nuevo)
-                    if len(batch) >= 100:
-                        db.bulk_save_objects(batch); db.commit(); batch = []
-                if batch: db.bulk_save_objects(batch); db.commit()
-    finally:
-        db.close()
+            puertos = pd.DataFrame(lista)
+            log.info("Puertos activos", extra={"campos": {"puertos": len(puertos)}})
 
     #####################################################################################
     # [ALGORITMO 1] PRE-PROCESAMIENTO DE COSTOS (SIMULACIÓN FLOYD-WARSHALL)
     #####################################################################################
-    if not df_bancos.empty:
-        print("🧮 ALGORITMO: Calculando matriz de costos (Pre-procesamiento)...")
-        cols_b = {c.lower(): c for c in df_bancos.columns}
-        c_id = cols_b.get('id banco', 'id')
-        c_lat, c_lon = cols_b.get('latitud', 'latitud'), cols_b.get('longitud', 'longitud')
-        muestra = df_bancos.head(300).to_dict('records')
-        
-        if not df_puertos.empty:
-            for _, p in df_puertos.iterrows():
-                muestra.append({c_id: p['id'], c_lat: p['latitud'], c_lon: p['longitud']})
-
-        for i in range(len(muestra)):
-            id_o = str(muestra[i].get(c_id))
-            lat_o = muestra[i].get(c_lat); lon_o = muestra[i].get(c_lon)
-            for j in range(i + 1, len(muestra)):
-                id_d = str(muestra[j].get(c_id))
-                lat_d = muestra[j].get(c_lat); lon_d = muestra[j].get(c_lon)
-                d = haversine(lat_o, lon_o, lat_d, lon_d)
-                matriz_distancias[(id_o, id_d)] = d
-                matriz_distancias[(id_d, id_o)] = d
+    with fase("matriz"):
+        if not bancos.empty:
+            almacen_b = almacen.AlmacenBancos(bancos, OFFSET_VISUAL_BANCOS)
+            matriz, indice = _estructuras_ruteo(almacen_b, puertos)
+            if matriz is not None:
+                log.info("Matriz de distancias lista", extra={"campos": {
+                    "nodos": len(matriz), "modelo": matriz.modelo, "mb": round(matriz.valores.nbytes / 1e6, 1), "mb_almacen": round(almacen_b.nbytes() / 1e6, 3)
+                }})
+            capa, rejilla, zonas = _estructuras_mapa(almacen_b, indice)
+
+    return publicacion.Dataset(version, bancos, puertos, almacen_b, matriz, indice, capa, rejilla, zonas, firma)
+
+def _estructuras_mapa(almacen_b, indice):
+    capa = mapa.CapaBancos(almacen_b, indice)
+    rejilla = biomasa.RejillaBiomasa(almacen_b.lat, almacen_b.lon, almacen_b.toneladas)
+    return capa, rejilla, estadisticas.resumen_biomasa(rejilla)
+
+# Modo compartido (RINGEN_SNAPSHOT_DIR, ver compartido.py): el Dataset sale del snapshot en
+# memory-map; este proceso solo arma lo que es O(N) (índice espacial, capa, rejilla)
+def _dataset_compartido(directorio, cabecera):
+    bancos, puertos, almacen_b, matriz = compartido.abrir(directorio, cabecera)
+    indice, capa, rejilla, zonas = None, None, None, None
+    if almacen_b is not None:
+        indice = espacial.IndiceEspacial(almacen_b.lat, almacen_b.lon)
+        capa, rejilla, zonas = _estructuras_mapa(almacen_b, indice)
+    return publicacion.Dataset(cabecera["version"], bancos, puertos, almacen_b, matriz, indice, capa, rejilla, zonas,
+                               firma=compartido.firma(cabecera), origen=cabecera["directorio"])
+
+def _cargar_dataset(version, fase, forzar=False):
+    # Sin snapshot compartido cada proceso arma el suyo; con él, lo arma un solo proceso
+    # (con `version` = la siguiente del snapshot) y todos lo abren
+    if not compartido.DIR_SNAPSHOT: return _construir_dataset(version, fase)
+    from . import fuentes
+    cabecera = compartido.obtener(compartido.DIR_SNAPSHOT, fuentes.firma(*FUENTES_DATASET), lambda v: _construir_dataset(v, fase), forzar)
+    return _dataset_compartido(compartido.DIR_SNAPSHOT, cabecera)
+
+def _publicar_dataset(ds):
+    datos.publicar(ds)
+    cache_resultados_ruta.invalidar()
+    if ds.origen is not None:
+        gestor_trabajos.publicar_snapshot(_adjuntar_proceso_rutas, compartido.DIR_SNAPSHOT, ds.origen)
+    else:
+        gestor_trabajos.publicar_snapshot(_iniciar_proceso_rutas, ds.bancos, ds.puertos)
+
+def _construir_recarga(version, forzar=False):
+    return _cargar_dataset(version, arranque.medir_fase, forzar)
+
+def _firma_vigilada():
+    from . import fuentes
+    if not compartido.DIR_SNAPSHOT: return fuentes.firma(*FUENTES_DATASET)
+    # Modo compartido: también cuenta la versión que publicó otro worker
+    archivos = fuentes.firma(*FUENTES_DATASET) if publicacion.INTERVALO_VIGILANCIA_S > 0 else None
+    return compartido.firma_vigilada(compartido.DIR_SNAPSHOT, archivos, datos.actual.firma)
+
+def load_data():
+    from . import fuentes, semilla
+    log.info("Iniciando carga de datos")
+
+    # 0. TABLAS
+    with estado_arranque.fase("db"):
+        models.Base.metadata.create_all(bind=database.engine)
+
+    # Publicación: /ready y requiere_datos esperan a que datos.actual exista (datos_listos),
+    # no solo a las fases: en modo compartido "matriz" queda LISTO antes de escribir y abrir el snapshot
+    ds = None
+    if compartido.DIR_SNAPSHOT:
+        with estado_arranque.fase("snapshot"):
+            ds = _cargar_dataset(None, estado_arranque.fase)
+            # Si lo armó otro worker, las fases de datos no corrieron en este proceso
+            for f in ("bancos", "puertos", "matriz"):
+                if not estado_arranque.fase_terminada(f): estado_arranque.marcar(f, detalle=f"snapshot {ds.origen}")
+    if ds is None:  # sin snapshot compartido (o no se pudo abrir): se arma en este proceso
+        ds = _construir_dataset(datos.siguiente_version(), estado_arranque.fase)
+    _publicar_dataset(ds)
+
+    # 3. SEEDER FLOTA (no bloquea /ready)
+    with estado_arranque.fase("flota"):
+        db = database.SessionLocal()
+        try:
+            count_system = db.query(models.Embarcacion).filter(models.Embarcacion.id_embarcacion.like("SYSTEM%")).count()
+            if count_system == 0:
+                if fuentes.encontrar_archivo("datos_embarcaciones"):
+                    df_excel = fuentes.leer_fuente("datos_embarcaciones")
+                    n = semilla.importar_flota(database.engine, df_excel)
+                    log.info("Flota inicial cargada", extra={"campos": {"embarcaciones": n}})
+            estadisticas_flota.recalcular(db)
+        finally:
+            db.close()
+
+    estado_arranque.finalizar()
+    # Desde aquí los archivos nuevos se recargan en segundo plano (si RINGEN_RECARGA_INTERVALO > 0);
+    # en modo compartido además se vigila la cabecera del snapshot
+    intervalo = publicacion.INTERVALO_VIGILANCIA_S
+    if ds.origen is not None: intervalo = intervalo or compartido.INTERVALO_CABECERA_S
+    datos.vigilar(_firma_vigilada, _construir_recarga, _publicar_dataset, intervalo)
+
+# --- SALUD / DISPONIBILIDAD ---
+@app.get("/health")
+def health():
+    # Liveness: el proceso responde aunque la carga siga en curso
+    return {"estado": "OK", **estado_arranque.resumen()}
+
+@app.get("/ready")
+def ready():
+    resumen = estado_arranque.resumen()
+    resumen["listo"] = resumen["listo"] and datos.actual is not None
+    if not resumen["listo"]:
+        return JSONResponse(status_code=503, content=resumen, headers={"Retry-After": "5"})
+    return resumen
+
+# --- RECARGA DE DATOS EN CALIENTE ---
+# Arma el siguiente Dataset en segundo plano y lo publica de una vez; las
+# peticiones en curso terminan con el que tenían. 409 si ya hay una recarga.
+@app.post("/datos/recargar", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(requiere_datos)])
+def recargar_datos(current_user: auth.Principal = Depends(get_current_user)):
+    if not datos.recargar(lambda v: _construir_recarga(v, forzar=True), _publicar_dataset):
+        raise HTTPException(status_code=409, detail="Ya hay una recarga en curso")
+    log.info("Recarga de datos solicitada", extra={"campos": {"usuario": current_user.username}})
+    return {"recargando": True, "version_actual": datos.actual.version}
+
+@app.get("/datos/version", dependencies=[Depends(requiere_datos)])
+def version_datos():
+    return {**datos.actual.resumen(), "vivos": datos.vivos(), "recargando": datos.recargando, "ultima_recarga": datos.ultima_recarga}
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(metricas.exportar(), media_type=metricas.TIPO_CONTENIDO)
 
 # --- ENDPOINTS AUTH ---
+# bcrypt va al pool propio de auth (ver auth.py)
+async def _usuario_por_username(db, username):
+    return (await db.execute(select(models.Usuario).where(models.Usuario.username == username))).scalars().first()
+
 @app.post("/auth/registro", status_code=status.HTTP_201_CREATED)
-def registrar_usuario(usuario: schemas.UsuarioRegistro, db: Session = Depends(database.get_db)):
-    if db.query(models.Usuario).filter(models.Usuario.username == usuario.username).first():
-        raise HTTPException(status_code=400, detail="Usuario ya existe")
-    nuevo = models.Usuario(username=usuario.username, password_hash=auth.encriptar_password(usuario.password), nombre_completo=usuario.nombre_completo)
-    db.add(nuevo); db.commit()
+async def registrar_usuario(usuario: schemas.UsuarioRegistro, db: AsyncSession = Depends(get_db)):
+    with metricas.AUTH.medir(operacion="registro"):
+        if await _usuario_por_username(db, usuario.username):
+            raise HTTPException(status_code=400, detail="Usuario ya existe")
+        password_hash = await auth.encriptar_password_async(usuario.password)
+        nuevo = models.Usuario(username=usuario.username, password_hash=password_hash, nombre_completo=usuario.nombre_completo)
+        db.add(nuevo); await db.commit()
     return {"mensaje": "Usuario creado"}
 
 @app.post("/auth/login", response_model=schemas.Token)
-def login(usuario: schemas.UsuarioLogin, db: Session = Depends(database.get_db)):
-    user = db.query(models.Usuario).filter(models.Usuario.username == usuario.username).first()
-    if not user or not auth.verificar_password(usuario.password, user.password_hash):
-        raise HTTPException(status_code=401, detail="Credenciales incorrectas")
+async def login(usuario: schemas.UsuarioLogin, db: AsyncSession = Depends(get_db)):
+    with metricas.AUTH.medir(operacion="login"):
+        user = await _usuario_por_username(db, usuario.username)
+        if not user or not await auth.verificar_password_async(usuario.password, user.password_hash):
+            raise HTTPException(status_code=401, detail="Credenciales incorrectas")
     return {"access_token": auth.crear_access_token({"sub": user.username}), "token_type": "bearer", "nombre_usuario": user.nombre_completo, "rol": user.rol}
 
 # --- ENDPOINTS DATOS ---
-@app.get("/puertos", response_model=List[schemas.PuertoResponse])
-def get_puertos_api():
+@app.get("/puertos", response_model=List[schemas.PuertoResponse], dependencies=[Depends(requiere_datos)])
+def get_puertos_api(request: Request, formato: Optional[str] = None):
+    df_puertos = datos.actual.puertos
+    if serializacion.pide_columnar(request, formato):
+        if df_puertos.empty:  # sin archivo de descargas el DataFrame no tiene ni columnas
+            vacio = np.empty(0)
+            return serializacion.respuesta_columnar({"id": np.empty(0, dtype=str), "nombre": np.empty(0, dtype=str), "latitud": vacio,
+                                                     "longitud": vacio, "x": vacio, "y": vacio}, headers={"Vary": "Accept"})
+        lat, lon = df_puertos['latitud'].to_numpy(dtype=np.float64), df_puertos['longitud'].to_numpy(dtype=np.float64)
+        x, y = map_gps_to_css(lat, lon)
+        ok = (x >= -10) & (x <= 110) & (y >= -10) & (y <= 110)
+        return serializacion.respuesta_columnar({
+            "id": df_puertos['id'].astype(str).to_numpy()[ok], "nombre": df_puertos['nombre'].to_numpy()[ok],
+            "latitud": lat[ok], "longitud": lon[ok], "x": x[ok], "y": y[ok]
+        }, headers={"Vary": "Accept"})
     res = []
     if not df_puertos.empty:
         for _, r in df_puertos.iterrows():
@@ -246,28 +409,107 @@ def get_puertos_api():
                 res.append({"id": str(r['id']), "nombre": r['nombre'], "latitud": r['latitud'], "longitud": r['longitud'], "x": x, "y": y})
     return res
 
-@app.get("/bancos", response_model=List[schemas.BancoResponse])
-def get_bancos_api():
-    if df_bancos.empty: return []
-    muestra = df_bancos.sample(n=min(500, len(df_bancos)))
-    cols = {c.lower(): c for c in df_bancos.columns}
-    res = []
-    for _, r in muestra.iterrows():
-        lat = r[cols.get('latitud')]; lon = r[cols.get('longitud')]
-        x, y = map_gps_to_css(lat, lon)
-        
-        # --- AQUÍ ESTÁ EL TRUCO VISUAL ---
-        # Movemos SOLO los bancos a la izquierda
-        x = x - OFFSET_VISUAL_BANCOS 
-        
-        if 0 <= x <= 100 and 0 <= y <= 100:
-            res.append({"id": int(r[cols.get('id banco', 'id')]), "latitud": lat, "longitud": lon, "toneladas": float(r[cols.get('toneladas estimadas', 'toneladas')]), "x": x, "y": y})
-    return res
+def _parsear_bbox(bbox):
+    if not bbox: return None
+    try:
+        caja = tuple(float(v) for v in bbox.split(','))
+        if len(caja) != 4 or caja[0] > caja[2] or caja[1] > caja[3]: raise ValueError
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox debe ser lon_min,lat_min,lon_max,lat_max")
+    return caja
+
+# Vista del mapa: /bancos?bbox=lon_min,lat_min,lon_max,lat_max&zoom=z&limite=500&offset=0
+# Sin parámetros devuelve los 500 bancos "más importantes" (orden estable, ya no aleatorio).
+# El cuerpo sigue siendo la lista de siempre; el total y la siguiente página van en cabeceras.
+@app.get("/bancos", response_model=List[schemas.BancoResponse], dependencies=[Depends(requiere_datos)])
+def get_bancos_api(
+    request: Request, response: Response,
+    bbox: Optional[str] = None,
+    zoom: Optional[int] = Query(None, ge=0, le=mapa.ZOOM_MAX),
+    limite: int = Query(500, ge=1, le=5000),
+    offset: int = Query(0, ge=0),
+    formato: Optional[str] = None
+):
+    caja = _parsear_bbox(bbox)
+    columnar = serializacion.pide_columnar(request, formato)
+    ds = datos.actual
+    capa_bancos = ds.capa
+
+    # La respuesta solo depende de la versión del dataset y de los parámetros
+    etag = 'W/"' + hashlib.sha1(f"{ds.version}|{caja}|{zoom}|{limite}|{offset}|{columnar}".encode()).hexdigest()[:20] + '"'
+    cabeceras = {"ETag": etag, "Cache-Control": "public, max-age=60", "Vary": "Accept"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=cabeceras)
+
+    idx = capa_bancos.consultar(caja, zoom) if capa_bancos is not None else np.empty(0, dtype=np.int64)
+    pagina = idx[offset:offset + limite]
+    cabeceras["X-Total-Count"] = str(len(idx))
+    if offset + limite < len(idx): cabeceras["X-Siguiente-Offset"] = str(offset + limite)
+    if capa_bancos is None:
+        response.headers.update(cabeceras)
+        return []
+    if columnar:
+        return serializacion.respuesta_columnar(capa_bancos.columnas(pagina), headers=cabeceras)
+    response.headers.update(cabeceras)
+    return capa_bancos.filas(pagina)
+
+# Exportación completa (todas las columnas de los bancos validados) en streaming:
+# /bancos/exportar?formato=ndjson|geojson&bbox=...&toneladas_min=...&toneladas_max=...
+# Con "Accept-Encoding: gzip" el cuerpo sale comprimido al vuelo.
+@app.get("/bancos/exportar", dependencies=[Depends(requiere_datos)])
+def exportar_bancos(
+    request: Request,
+    formato: str = Query("ndjson", pattern="^(ndjson|geojson)$"),
+    bbox: Optional[str] = None,
+    toneladas_min: Optional[float] = None,
+    toneladas_max: Optional[float] = None
+):
+    caja = _parsear_bbox(bbox)
+    ds = datos.actual  # referencia fija: una recarga a mitad de la descarga no mezcla datasets
+    partes = (exportacion.geojson if formato == "geojson" else exportacion.ndjson)(
+        ds.bancos, bbox=caja, toneladas_min=toneladas_min, toneladas_max=toneladas_max,
+        columnas=ds.almacen.columnas if ds.almacen is not None else None
+    )
+    cabeceras = {"Content-Disposition": f'attachment; filename="bancos.{formato}"', "Vary": "Accept-Encoding"}
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        cabeceras["Content-Encoding"] = "gzip"
+        partes = exportacion.gzip(partes)
+    return StreamingResponse(partes, media_type=exportacion.TIPOS[formato], headers=cabeceras)
+
+# Capa de calor: /bancos/calor?bbox=...&agrupar=k (k x k celdas de biomasa.TAM_CELDA_GRADOS por punto)
+@app.get("/bancos/calor", dependencies=[Depends(requiere_datos)])
+def get_calor_bancos(request: Request, bbox: Optional[str] = None, agrupar: int = Query(1, ge=1, le=100), formato: Optional[str] = None):
+    rejilla = datos.actual.rejilla
+    if rejilla is None: return []
+    caja = _parsear_bbox(bbox) or (-np.inf, -np.inf, np.inf, np.inf)
+    capa = rejilla.calor(agrupar, lat_min=caja[1], lat_max=caja[3], lon_min=caja[0], lon_max=caja[2])
+    x, y = map_gps_to_css(capa["lat"], capa["lon"])
+    maximo = capa["toneladas"].max() if len(capa["toneladas"]) else 0
+    columnas = {
+        "lat": np.round(capa["lat"], 4), "lon": np.round(capa["lon"], 4),
+        "x": np.round(x - OFFSET_VISUAL_BANCOS, 2), "y": np.round(y, 2),
+        "toneladas": np.round(capa["toneladas"], 2), "bancos": capa["bancos"],
+        "intensidad": np.round(capa["toneladas"] / maximo, 4) if maximo > 0 else np.zeros(len(capa["toneladas"])),
+    }
+    if serializacion.pide_columnar(request, formato): return serializacion.respuesta_columnar(columnas)
+    listas = {k: v.tolist() for k, v in columnas.items()}
+    return [dict(zip(listas, fila)) for fila in zip(*listas.values())]
 
 # --- GESTIÓN FLOTA ---
 @app.get("/embarcaciones", response_model=List[schemas.EmbarcacionResponse])
-def get_flota_api(current_user: models.Usuario = Depends(get_current_user), db: Session = Depends(database.get_db)):
-    mis_barcos = db.query(models.Embarcacion).filter(models.Embarcacion.owner_id == current_user.id_usuario).all()
+async def get_flota_api(request: Request, formato: Optional[str] = None, current_user: auth.Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    if serializacion.pide_columnar(request, formato):
+        E = models.Embarcacion
+        filas = (await db.execute(select(
+            E.id_embarcacion, E.nombre, E.capacidad_bodega, E.velocidad_promedio, E.consumo_combustible,
+            E.material_casco, E.tripulacion_maxima, E.anio_fabricacion, E.estado
+        ).where(E.owner_id == current_user.id_usuario))).all()
+        nombres = ["id_embarcacion", "nombre", "capacidad_bodega", "velocidad_promedio", "consumo", "material", "tripulacion", "anio_fabricacion", "estado"]
+        columnas = dict(zip(nombres, zip(*filas))) if filas else {n: [] for n in nombres}
+        n = len(filas)
+        columnas.update(progreso=[0] * n, destino=["-"] * n, eta=["-"] * n)
+        return serializacion.respuesta_columnar(columnas, headers={"Vary": "Accept"})
+    mis_barcos = (await db.execute(select(models.Embarcacion).where(models.Embarcacion.owner_id == current_user.id_usuario))).scalars().all()
     res = []
     for b in mis_barcos:
         res.append({
@@ -280,53 +522,28 @@ def get_flota_api(current_user: models.Usuario = Depends(get_current_user), db:
     return res
 
 @app.post("/embarcaciones", response_model=schemas.EmbarcacionResponse)
-def crear_embarcacion(barco: schemas.EmbarcacionCreate, current_user: models.Usuario = Depends(get_current_user), db: Session = Depends(database.get_db)):
-    count = db.query(models.Embarcacion).filter(models.Embarcacion.owner_id == current_user.id_usuario).count()
+async def crear_embarcacion(barco: schemas.EmbarcacionCreate, current_user: auth.Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    count = (await db.execute(select(func.count()).select_from(models.Embarcacion).where(models.Embarcacion.owner_id == current_user.id_usuario))).scalar()
     nuevo_id = f"U{current_user.id_usuario}-{count + 1:03d}"
     nuevo = models.Embarcacion(id_embarcacion=nuevo_id, nombre=barco.nombre, capacidad_bodega=barco.capacidad_bodega, velocidad_promedio=barco.velocidad_promedio, consumo_combustible=barco.consumo, material_casco=barco.material, tripulacion_maxima=barco.tripulacion, anio_fabricacion=barco.anio_fabricacion, owner_id=current_user.id_usuario, estado="EN_PUERTO")
-    db.add(nuevo); db.commit(); db.refresh(nuevo)
+    db.add(nuevo); await db.commit(); await db.refresh(nuevo)
+    estadisticas_flota.registrar_alta(nuevo)
     return { "id_embarcacion": nuevo.id_embarcacion, "nombre": nuevo.nombre, "capacidad_bodega": nuevo.capacidad_bodega, "velocidad_promedio": nuevo.velocidad_promedio, "consumo": nuevo.consumo_combustible, "material": nuevo.material_casco, "tripulacion": nuevo.tripulacion_maxima, "anio_fabricacion": nuevo.anio_fabricacion, "estado": "EN_PUERTO", "progreso": 0, "destino": "-", "eta": "-" }
 
 @app.patch("/embarcaciones/{id_embarcacion}/estado", response_model=schemas.EmbarcacionResponse)
-def actualizar_estado_barco(id_embarcacion: str, estado_data: schemas.EstadoUpdate, db: Session = Depends(database.get_db), current_user: models.Usuario = Depends(get_current_user)):
-    barco = db.query(models.Embarcacion).filter(models.Embarcacion.id_embarcacion == id_embarcacion, models.Embarcacion.owner_id == current_user.id_usuario).first()
+async def actualizar_estado_barco(id_embarcacion: str, estado_data: schemas.EstadoUpdate, db: AsyncSession = Depends(get_db), current_user: auth.Principal = Depends(get_current_user)):
+    barco = (await db.execute(select(models.Embarcacion).where(models.Embarcacion.id_embarcacion == id_embarcacion, models.Embarcacion.owner_id == current_user.id_usuario))).scalars().first()
     if not barco: raise HTTPException(status_code=404, detail="Barco no encontrado")
     estados_validos = ["EN_PUERTO", "MANTENIMIENTO", "EN_RUTA", "EN_ALTAMAR"]
     if estado_data.estado not in estados_validos: raise HTTPException(status_code=400, detail="Estado no válido")
-    barco.estado = estado_data.estado; db.commit(); db.refresh(barco)
+    estado_anterior = barco.estado
+    barco.estado = estado_data.estado; await db.commit(); await db.refresh(barco)
+    estadisticas_flota.registrar_cambio_estado(estado_anterior, barco.estado, barco.capacidad_bodega)
+    cache_resultados_ruta.invalidar(lambda clave: clave[0] == id_embarcacion)
     return { "id_embarcacion": barco.id_embarcacion, "nombre": barco.nombre, "capacidad_bodega": barco.capacidad_bodega, "velocidad_promedio": barco.velocidad_promedio, "consumo": barco.consumo_combustible, "material": barco.material_casco, "tripulacion": barco.tripulacion_maxima, "anio_fabricacion": barco.anio_fabricacion, "estado": barco.estado, "progreso": 0, "destino": "-", "eta": "-" }
 
-#####################################################################################
-# [ALGORITMO 3] METAHEURÍSTICA DE BÚSQUEDA LOCAL (2-OPT)
-#####################################################################################
-def optimizar_2opt(ruta, funcion_distancia):
-    mejor_ruta = ruta
-    mejor_distancia = sum(funcion_distancia(ruta[i], ruta[i+1]) for i in range(len(ruta)-1))
-    mejorado = True
-    while mejorado:
-        mejorado = False
-        for i in range(1, len(ruta) - 2):
-            for j in range(i + 1, len(ruta) - 1):
-                if j - i == 1: continue 
-                nueva_ruta = ruta[:]
-                nueva_ruta[i:j] = ruta[j-1:i-1:-1]
-                nueva_distancia = sum(funcion_distancia(nueva_ruta[k], nueva_ruta[k+1]) for k in range(len(nueva_ruta)-1))
-                if nueva_distancia < mejor_distancia:
-                    mejor_ruta = nueva_ruta
-                    mejor_distancia = nueva_distancia
-                    mejorado = True
-        ruta = mejor_ruta
-    return mejor_ruta, mejor_distancia
-
-@app.post("/optimizar-ruta/", response_model=schemas.RutaResponse)
-def calcular_ruta(req: schemas.RutaRequest, db: Session = Depends(database.get_db)):
-    # ... (CARGA DE DATOS IGUAL QUE ANTES) ...
-    barco = db.query(models.Embarcacion).filter(models.Embarcacion.id_embarcacion == req.id_embarcacion).first()
-    if not barco: raise HTTPException(status_code=404, detail="Barco no encontrado")
-
-    cap_max = req.capacidad_actual if req.capacidad_actual else barco.capacidad_bodega
-    vel = req.velocidad_personalizada if req.velocidad_personalizada else barco.velocidad_promedio
-    consumo_base = barco.consumo_combustible
+# --- RUTEO: UTILITARIOS COMPARTIDOS ---
+def _parametros_barco(barco, capacidad=None, velocidad=None):
     material = barco.material_casco.upper() if barco.material_casco else "ACERO"
     tripulacion = barco.tripulacion_maxima or 10
 
@@ -334,96 +551,92 @@ def calcular_ruta(req: schemas.RutaRequest, db: Session = Depends(database.get_d
     if "FIBRA" in material: factor_material = 0.90 
     elif "MADERA" in material: factor_material = 0.95
     elif "ALUMINIO" in material: factor_material = 0.92
-    factor_tripulacion = 1.0 + (tripulacion * 0.005) 
+    factor_tripulacion = float(escenarios.factor_tripulacion(tripulacion))
 
-    pto_salida = df_puertos[df_puertos['id'] == req.puerto_salida_id].iloc[0]
-    nodo_inicio = {"id": req.puerto_salida_id, "tipo": "PUERTO", "lat": pto_salida['latitud'], "lon": pto_salida['longitud'], "toneladas": 0}
-    nodo_final = nodo_inicio.copy()
-    
-    cols_b = {c.lower(): c for c in df_bancos.columns}
-    candidatos = []
-    for _, row in df_bancos.head(200).iterrows(): 
-        candidatos.append({
-            "id": str(row[cols_b.get('id banco')]), "tipo": "BANCO",
-            "lat": row[cols_b.get('latitud')], "lon": row[cols_b.get('longitud')],
-            "toneladas": float(row[cols_b.get('toneladas estimadas')])
-        })
+    return {
+        "cap_max": capacidad if capacidad else barco.capacidad_bodega,
+        "vel": velocidad if velocidad else barco.velocidad_promedio,
+        "consumo_base": barco.consumo_combustible,
+        "factor_material": factor_material, "factor_tripulacion": factor_tripulacion
+    }
 
-    # [FASE 1] GREEDY
-    ruta_actual = [nodo_inicio]
-    carga_actual = 0
-    visitados = set()
-    
-    while carga_actual < cap_max:
-        actual = ruta_actual[-1]
-        mejor_cand = None
-        min_dist = float('inf')
-        for cand in candidatos:
-            if cand['id'] in visitados: continue
-            d = matriz_distancias.get((str(actual['id']), cand['id']))
-            if d is None: d = haversine(actual['lat'], actual['lon'], cand['lat'], cand['lon'])
-            if d < min_dist:
-                min_dist = d
-                mejor_cand = cand
-        if mejor_cand is None or min_dist > 600: break
-        pesca = min(mejor_cand['toneladas'], cap_max - carga_actual)
-        if pesca <= 0: break 
-        cand_copy = mejor_cand.copy(); cand_copy['carga_recogida'] = pesca
-        ruta_actual.append(cand_copy); visitados.add(mejor_cand['id']); carga_actual += pesca
-        if carga_actual >= cap_max: break
+# Todos reciben el Dataset (ds) que tomó la petición al empezar.
+# Internamente una ruta es Ruta(indices, recogidas): índices de la matriz (el puerto
+# al inicio y al final, bancos 0..B-1 en medio) y las toneladas recogidas en cada
+# parada. Los dicts por nodo solo se arman al responder (_secuencia).
+Ruta = namedtuple("Ruta", ["indices", "recogidas"])
+SIN_MATRIZ = -1  # índice del puerto cuando el dataset no tiene bancos (ni matriz)
 
-    ruta_actual.append(nodo_final)
+def _ruta(indices, recogidas):
+    return Ruta(np.asarray(indices, dtype=np.int64), np.asarray(recogidas, dtype=np.float64))
 
-    def get_dist_func(n1, n2):
-        d = matriz_distancias.get((str(n1['id']), str(n2['id'])))
-        return d if d else haversine(n1['lat'], n1['lon'], n2['lat'], n2['lon'])
+def _exigir_matriz(ds):
+    # Hay bancos pero la matriz superó distancias.MAX_NODOS (ver _estructuras_ruteo)
+    if ds.matriz is None and ds.almacen is not None:
+        raise HTTPException(status_code=503, detail="Ruteo no disponible: demasiados bancos para la matriz de distancias (RINGEN_MATRIZ_MAX_NODOS)")
 
-    # --- NUEVO: CALCULAR DISTANCIA BASE (ANTES DE OPTIMIZAR) ---
-    distancia_greedy = sum(get_dist_func(ruta_actual[i], ruta_actual[i+1]) for i in range(len(ruta_actual)-1))
+def _nodo_puerto(ds, puerto_id):
+    df_puertos = ds.puertos
+    pto = df_puertos[df_puertos['id'] == puerto_id] if not df_puertos.empty else df_puertos
+    if pto.empty: raise HTTPException(status_code=404, detail="Puerto no encontrado")
+    pto = pto.iloc[0]
+    _exigir_matriz(ds)
+    idx = ds.matriz.idx(puerto_id) if ds.matriz is not None else None
+    return {"id": puerto_id, "idx": SIN_MATRIZ if idx is None else idx, "tipo": "PUERTO", "lat": pto['latitud'], "lon": pto['longitud'], "toneladas": 0}
 
-    # [FASE 2] 2-OPT (OPTIMIZACIÓN)
-    if len(ruta_actual) > 3:
-        ruta_optima, dist_total_final = optimizar_2opt(ruta_actual, get_dist_func)
-        if ruta_optima[0]['id'] != nodo_inicio['id']: ruta_optima = ruta_actual; dist_total_final = distancia_greedy
-    else:
-        ruta_optima = ruta_actual
-        dist_total_final = distancia_greedy
+def _distancias_tramo(ds, indices):
+    # Distancia de cada tramo indices[i] -> indices[i+1] (una sola lectura de la matriz)
+    indices = np.asarray(indices, dtype=np.int64)
+    if len(indices) < 2: return np.zeros(0)
+    if ds.matriz is None: return np.zeros(len(indices) - 1)  # sin bancos solo hay puerto -> puerto
+    metricas.CONSULTAS_DISTANCIA.inc(len(indices) - 1, origen="matriz_tramos")
+    return ds.matriz.valores[indices[:-1], indices[1:]].astype(np.float64)
+
+def _secuencia(ds, nodo_puerto, ruta, cargas):
+    # Materializa la ruta para la respuesta: extremos = puerto, en medio = bancos del almacén
+    x_p, y_p = map_gps_to_css(nodo_puerto['lat'], nodo_puerto['lon'])
+    puerto = ("PUERTO", f"{nodo_puerto['id']}", nodo_puerto['lat'], nodo_puerto['lon'], x_p, y_p)
+    filas = [puerto]
+    bancos_idx = ruta.indices[1:-1]
+    if len(bancos_idx):
+        alm = ds.almacen
+        lat, lon = alm.coordenadas(bancos_idx)
+        filas += [("BANCO", str(i), la, lo, x, y) for i, la, lo, x, y in zip(
+            alm.ids[bancos_idx].tolist(), lat.tolist(), lon.tolist(),
+            np.round(alm.x[bancos_idx].astype(np.float64), 4).tolist(), np.round(alm.y[bancos_idx].astype(np.float64), 4).tolist()
+        )]
+    filas.append(puerto)
+    return [
+        {"id_nodo": id_nodo, "tipo": tipo, "latitud": la, "longitud": lo, "carga_acumulada": round(c, 2), "x": x, "y": y}
+        for (tipo, id_nodo, la, lo, x, y), c in zip(filas, cargas.tolist())
+    ]
+
+# [FASE 3] CONSUMO Y FORMATEO
+def _armar_respuesta(ds, id_embarcacion, params, nodo_puerto, ruta_optima, distancia_greedy, dist_total_final, etiqueta_base="Greedy"):
+    cap_max = params['cap_max']
 
     # --- CÁLCULO DE MEJORA ---
     ahorro_km = max(0, distancia_greedy - dist_total_final)
     porcentaje_mejora = (ahorro_km / distancia_greedy * 100) if distancia_greedy > 0 else 0
 
-    # [FASE 3] CONSUMO Y FORMATEO
-    secuencia_ruta = []
-    carga_acum = 0
-    consumo_total = 0
-    
-    for i, nodo in enumerate(ruta_optima):
-        recogida = nodo.get('carga_recogida', 0)
-        carga_acum += recogida
-        x, y = map_gps_to_css(nodo['lat'], nodo['lon'])
-        if nodo['tipo'] == 'BANCO': x = x - OFFSET_VISUAL_BANCOS 
-        
-        secuencia_ruta.append({
-            "id_nodo": f"{nodo['id']}", "tipo": nodo['tipo'],
-            "latitud": nodo['lat'], "longitud": nodo['lon'],
-            "carga_acumulada": round(carga_acum, 2), "x": x, "y": y
-        })
-        
-        if i < len(ruta_optima) - 1:
-            dist = get_dist_func(nodo, ruta_optima[i+1])
-            factor_carga = 1.0 + (0.5 * (carga_acum / cap_max))
-            consumo_tramo = dist * consumo_base * factor_material * factor_tripulacion * factor_carga
-            consumo_total += consumo_tramo
-
-    tiempo_hrs = dist_total_final / (vel * 1.852)
+    cargas = np.cumsum(ruta_optima.recogidas, dtype=np.float64)
+    carga_acum = float(cargas[-1]) if len(cargas) else 0.0
+    secuencia_ruta = _secuencia(ds, nodo_puerto, ruta_optima, cargas)
+
+    # Consumo de todos los tramos de una vez (mismo modelo que escenarios.evaluar)
+    consumo_total = float(escenarios.consumo(
+        _distancias_tramo(ds, ruta_optima.indices), cargas[:-1], cap_max,
+        params['consumo_base'], params['factor_material'], params['factor_tripulacion']
+    ))
+
+    tiempo_hrs = dist_total_final / (params['vel'] * 1.852)
     
     # --- RESUMEN ENRIQUECIDO PARA EL PROFESOR ---
     resumen = (
-        f"📊 ANÁLISIS DE EFICIENCIA ALGORÍTMICA\n"
+        f"📊 ANÁLISIS DE EFICIENCIA ALGORÍTMICA\n"
         f"----------------------------------------\n"
-        f"• Distancia Base (Greedy): {round(distancia_greedy, 2)} km\n"
-        f"• Distancia Optimizada (2-Opt): {round(dist_total_final, 2)} km\n"
+        f"• Distancia Base ({etiqueta_base}): {round(distancia_greedy, 2)} km\n"
+        f"• Distancia Optimizada (2-Opt/Or-Opt): {round(dist_total_final, 2)} km\n"
         f"✅ MEJORA OBTENIDA: -{round(porcentaje_mejora, 2)}% ({round(ahorro_km, 2)} km ahorrados)\n\n"
         f"📋 DETALLES OPERATIVOS\n"
         f"• Consumo Est.: {round(consumo_total, 1)} Galones\n"
@@ -431,7 +644,7 @@ def calcular_ruta(req: schemas.RutaRequest, db: Session = Depends(database.get_d
     )
 
     return {
-        "id_embarcacion": req.id_embarcacion,
+        "id_embarcacion": id_embarcacion,
         "distancia_total_km": round(dist_total_final, 2),
         "carga_total_tm": round(carga_acum, 2),
         "tiempo_estimado_horas": round(tiempo_hrs, 2),
@@ -439,12 +652,350 @@ def calcular_ruta(req: schemas.RutaRequest, db: Session = Depends(database.get_d
         "mensaje": "Optimización completada con éxito.",
         "resumen_texto": resumen
     }
+
+@app.post("/optimizar-ruta/", response_model=schemas.RutaResponse, dependencies=[Depends(requiere_datos)])
+async def calcular_ruta(req: schemas.RutaRequest, db: AsyncSession = Depends(get_db)):
+    ds = datos.actual
+    barco = await db.get(models.Embarcacion, req.id_embarcacion)
+    if not barco: raise HTTPException(status_code=404, detail="Barco no encontrado")
+
+    # El resultado solo depende de estos datos: se cachea con esa clave
+    clave = (
+        barco.id_embarcacion, barco.capacidad_bodega, barco.velocidad_promedio, barco.consumo_combustible,
+        barco.material_casco, barco.tripulacion_maxima,
+        req.capacidad_actual, req.velocidad_personalizada, req.puerto_salida_id,
+        req.tiempo_limite_ms, req.max_iteraciones, ds.version
+    )
+    # El cálculo (CPU) va al threadpool para no frenar el event loop
+    return await run_in_threadpool(cache_resultados_ruta.obtener_o_calcular, clave, lambda: _calcular_ruta(ds, req, barco))
+
+def _calcular_ruta(ds, req, barco):
+    params = _parametros_barco(barco, req.capacidad_actual, req.velocidad_personalizada)
+    nodo_inicio = _nodo_puerto(ds, req.puerto_salida_id)
+    return _optimizar(ds, req.id_embarcacion, params, nodo_inicio, req.tiempo_limite_ms, req.max_iteraciones)
+
+def _optimizar(ds, id_embarcacion, params, nodo_inicio, tiempo_limite_ms=None, max_iteraciones=None, cancelar=None):
+    with metricas.FASES.medir(proceso="ruta", fase="greedy"):
+        ruta_actual, distancia_greedy = _fase_greedy(ds, nodo_inicio, params['cap_max'])
+    with metricas.FASES.medir(proceso="ruta", fase="busqueda_local"):
+        ruta_optima, dist_total_final = _fase_busqueda_local(ds, ruta_actual, distancia_greedy, tiempo_limite_ms, max_iteraciones, cancelar=cancelar)
+    with metricas.FASES.medir(proceso="ruta", fase="consumo"):
+        return _armar_respuesta(ds, id_embarcacion, params, nodo_inicio, ruta_optima, distancia_greedy, dist_total_final)
+
+# [FASE 1] GREEDY (vecino más cercano, radio máx. 600 km)
+# Los tramos se cobran con ds.matriz. Si es haversine, el índice espacial da el mismo
+# vecino sin recorrer una fila entera; si es la marítima (navegacion.py), doblar un
+# cabo cambia el orden y el vecino se elige por la fila de la matriz.
+def _vecino_por_matriz(ds, desde, visitados, radio_km):
+    # Bancos = columnas 0..B-1 de la matriz (mismo orden que el índice y el almacén)
+    fila = np.asarray(ds.matriz.valores[desde, :len(visitados)], dtype=np.float64)
+    fila = np.where(visitados | (fila > radio_km), np.inf, fila)
+    idx = int(np.argmin(fila))
+    return (idx, float(fila[idx])) if np.isfinite(fila[idx]) else (None, float('inf'))
+
+def _fase_greedy(ds, nodo_inicio, cap_max):
+    toneladas_b = ds.toneladas
+    indice_bancos = ds.indice
+    indices, recogidas = [nodo_inicio['idx']], [0.0]
+    lat, lon = nodo_inicio['lat'], nodo_inicio['lon']
+    carga_actual = 0
+    visitados = np.zeros(len(indice_bancos) if indice_bancos is not None else 0, dtype=bool)
+    por_matriz = ds.matriz is not None and ds.matriz.modelo != "haversine"
+    actual, consultas = nodo_inicio['idx'], 0
+    
+    while indice_bancos is not None and carga_actual < cap_max:
+        if por_matriz: idx, _ = _vecino_por_matriz(ds, actual, visitados, RADIO_MAX_SALTO_KM)
+        else: idx, _ = indice_bancos.vecino_mas_cercano(lat, lon, excluir=visitados, radio_km=RADIO_MAX_SALTO_KM)
+        consultas += 1
+        if idx is None: break
+        pesca = min(float(toneladas_b[idx]), cap_max - carga_actual)
+        if pesca <= 0: break 
+        indices.append(idx); recogidas.append(pesca)
+        visitados[idx] = True; carga_actual += pesca
+        lat, lon = float(indice_bancos.lat[idx]), float(indice_bancos.lon[idx])
+        actual = idx
+        if carga_actual >= cap_max: break
+    if consultas: metricas.CONSULTAS_DISTANCIA.inc(consultas, origen="matriz_greedy" if por_matriz else "indice_haversine")
+
+    indices.append(nodo_inicio['idx']); recogidas.append(0.0)
+    ruta_actual = _ruta(indices, recogidas)
+
+    # --- DISTANCIA BASE (ANTES DE OPTIMIZAR) ---
+    distancia_greedy = float(_distancias_tramo(ds, ruta_actual.indices).sum())
+    return ruta_actual, distancia_greedy
+
+# [FASE 2] BÚSQUEDA LOCAL 2-OPT / OR-OPT (OPTIMIZACIÓN)
+def _fase_busqueda_local(ds, ruta_actual, distancia_greedy, tiempo_limite_ms=None, max_iteraciones=None, cancelar=None, al_mejorar=None):
+    # al_mejorar(ruta, distancia): rutas intermedias (modo anytime, ver /optimizar-ruta/stream)
+    if len(ruta_actual.indices) > 3:
+        recogida_de = dict(zip(ruta_actual.indices.tolist(), ruta_actual.recogidas.tolist()))
+        def como_ruta(indices): return _ruta(indices, [recogida_de[i] for i in indices])
+        # optimizar_ruta copia la submatriz n x n de la ruta y trabaja solo sobre esa copia
+        metricas.CONSULTAS_DISTANCIA.inc(len(ruta_actual.indices) ** 2, origen="matriz_busqueda_local")
+        indices_optimos, dist_total_final = busqueda_local.optimizar_ruta(
+            ruta_actual.indices.tolist(), ds.matriz.valores,
+            tiempo_limite_ms=tiempo_limite_ms or busqueda_local.TIEMPO_LIMITE_MS,
+            max_iteraciones=max_iteraciones, cancelar=cancelar,
+            al_mejorar=(lambda idx, d: al_mejorar(como_ruta(idx), d)) if al_mejorar else None
+        )
+        ruta_optima = como_ruta(indices_optimos)
+        if ruta_optima.indices[0] != ruta_actual.indices[0]: ruta_optima = ruta_actual; dist_total_final = distancia_greedy
+    else:
+        ruta_optima = ruta_actual
+        dist_total_final = distancia_greedy
+    return ruta_optima, dist_total_final
+
+# --- ESCENARIOS "QUÉ PASA SI" ---
+# Una ruta (dada o calculada una vez) y una rejilla velocidad x bodega x tripulación:
+# consumo, tiempo y carga de todas las combinaciones con escenarios.evaluar
+# (matriz tramos x escenarios, sin bucle por escenario). Con otra bodega la ruta
+# es la misma: se carga en orden de visita hasta llenar lo que ofrece cada banco.
+def _indices_ruta(ds, ids):
+    _exigir_matriz(ds)
+    indices = []
+    for id_nodo in ids:
+        idx = ds.matriz.idx(id_nodo) if ds.matriz is not None else None
+        if idx is None: raise HTTPException(status_code=404, detail=f"Nodo no encontrado: {id_nodo}")
+        indices.append(idx)
+    return np.asarray(indices, dtype=np.int64)
+
+def _tabla_escenarios(ds, id_embarcacion, params, indices, velocidades, capacidades, tripulaciones):
+    distancias_tramo = _distancias_tramo(ds, indices)
+    # Lo que ofrece cada nodo: toneladas del banco (índices 0..B-1), 0 en puertos
+    banco = indices < len(ds.almacen)
+    disponible = np.zeros(len(indices))
+    disponible[banco] = ds.toneladas[indices[banco]]
+    with metricas.FASES.medir(proceso="escenarios", fase="evaluacion"):
+        columnas = escenarios.evaluar(
+            distancias_tramo, disponible,
+            params['consumo_base'], params['factor_material'], velocidades, capacidades, tripulaciones
+        )
+    return {
+        "id_embarcacion": id_embarcacion, "ruta": [ds.matriz.ids[i] for i in indices.tolist()],
+        "distancia_total_km": round(float(distancias_tramo.sum()), 2), "n_escenarios": len(columnas["consumo_galones"]),
+        "escenarios": {k: np.round(v, 2).tolist() for k, v in columnas.items()},
+    }
+
+@app.post("/optimizar-ruta/escenarios", response_model=schemas.EscenariosResponse, dependencies=[Depends(requiere_datos)])
+async def evaluar_escenarios(req: schemas.EscenariosRequest, db: AsyncSession = Depends(get_db)):
+    ds = datos.actual
+    barco = await db.get(models.Embarcacion, req.id_embarcacion)
+    if not barco: raise HTTPException(status_code=404, detail="Barco no encontrado")
+    params = _parametros_barco(barco)
+    velocidades = req.velocidades or [params['vel']]
+    capacidades = req.capacidades or [params['cap_max']]
+    tripulaciones = req.tripulaciones or [barco.tripulacion_maxima or 10]
+    # Los valores del pedido ya los valida el esquema; esto cubre los que vienen del barco
+    if min(velocidades) < escenarios.VELOCIDAD_MIN_NUDOS or min(capacidades) < escenarios.CAPACIDAD_MIN_TM or min(tripulaciones) < 0:
+        raise HTTPException(status_code=400, detail=f"Velocidades >= {escenarios.VELOCIDAD_MIN_NUDOS:g} nudos, capacidades >= {escenarios.CAPACIDAD_MIN_TM:g} TM y tripulaciones >= 0")
+    if len(velocidades) * len(capacidades) * len(tripulaciones) > escenarios.MAX_ESCENARIOS:
+        raise HTTPException(status_code=400, detail=f"Máximo {escenarios.MAX_ESCENARIOS} escenarios por consulta")
+
+    if req.ruta:
+        indices = _indices_ruta(ds, req.ruta)
+    elif req.puerto_salida_id:
+        nodo_inicio = _nodo_puerto(ds, req.puerto_salida_id)
+        if ds.matriz is None: raise HTTPException(status_code=404, detail="No hay bancos cargados")
+        def planificar():
+            ruta_actual, distancia_greedy = _fase_greedy(ds, nodo_inicio, params['cap_max'])
+            return _fase_busqueda_local(ds, ruta_actual, distancia_greedy, req.tiempo_limite_ms)[0].indices
+        indices = await run_in_threadpool(planificar)
+    else:
+        raise HTTPException(status_code=400, detail="Indique ruta o puerto_salida_id")
+    return await run_in_threadpool(_tabla_escenarios, ds, req.id_embarcacion, params, indices, velocidades, capacidades, tripulaciones)
+
+# --- RUTEO "ANYTIME" (SERVER-SENT EVENTS) ---
+# Mismo cálculo que /optimizar-ruta/, pero la respuesta es un stream text/event-stream:
+#   event: greedy  -> ruta inicial (milisegundos)
+#   event: mejora  -> cada ruta mejor que encuentra la búsqueda local
+#   event: final   -> última ruta + motivo ("convergencia" o "limite" = tiempo_limite_ms)
+# Si el cliente se desconecta se cancela la búsqueda (no se gasta CPU en vano).
+def _evento_sse(evento, datos):
+    return f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+@app.post("/optimizar-ruta/stream", dependencies=[Depends(requiere_datos)])
+async def calcular_ruta_stream(req: schemas.RutaRequest, db: AsyncSession = Depends(get_db)):
+    ds = datos.actual
+    barco = await db.get(models.Embarcacion, req.id_embarcacion)
+    if not barco: raise HTTPException(status_code=404, detail="Barco no encontrado")
+    params = _parametros_barco(barco, req.capacidad_actual, req.velocidad_personalizada)
+    nodo_inicio = _nodo_puerto(ds, req.puerto_salida_id)
+
+    loop = asyncio.get_running_loop()
+    cola = asyncio.Queue()
+    cancelar = threading.Event()
+    def publicar(evento, datos=None):
+        loop.call_soon_threadsafe(cola.put_nowait, (evento, datos))
+
+    def trabajar():
+        try:
+            ruta_actual, distancia_greedy = _fase_greedy(ds, nodo_inicio, params['cap_max'])
+            def con_mejora(ruta, distancia, **extra):
+                mejora = (distancia_greedy - distancia) / distancia_greedy * 100 if distancia_greedy > 0 else 0
+                return {"distancia_total_km": round(distancia, 2), "mejora_porcentaje": round(max(0, mejora), 2), **extra,
+                        "ruta": _armar_respuesta(ds, req.id_embarcacion, params, nodo_inicio, ruta, distancia_greedy, distancia)}
+            publicar("greedy", con_mejora(ruta_actual, distancia_greedy))
+            limite_ms = req.tiempo_limite_ms or busqueda_local.TIEMPO_LIMITE_MS
+            t0 = time.perf_counter()
+            ruta_optima, dist_final = _fase_busqueda_local(
+                ds, ruta_actual, distancia_greedy, limite_ms, req.max_iteraciones, cancelar=cancelar,
+                al_mejorar=lambda ruta, d: publicar("mejora", con_mejora(ruta, d))
+            )
+            if cancelar.is_set(): return
+            motivo = "limite" if (time.perf_counter() - t0) * 1000 >= limite_ms else "convergencia"
+            publicar("final", con_mejora(ruta_optima, dist_final, motivo=motivo))
+        except Exception as e:
+            log.exception("Error en ruteo anytime")
+            publicar("error", {"detail": str(e)})
+        finally:
+            publicar(None)
+
+    loop.run_in_executor(None, trabajar)
+
+    async def eventos():
+        try:
+            while True:
+                evento, datos = await cola.get()
+                if evento is None: break
+                yield _evento_sse(evento, datos)
+        finally:
+            # Fin normal o desconexión del cliente (Starlette cancela el generador)
+            cancelar.set()
+
+    return StreamingResponse(eventos(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# --- RUTEO EN COLA DE TRABAJOS (PROCESOS) ---
+# POST devuelve el id al instante (202); el cálculo corre en gestor_trabajos, fuera
+# del GIL de este proceso. GET consulta estado/resultado, DELETE cancela.
+# Los resultados terminados se guardan en models.HistorialRuta: GET los sigue
+# encontrando aunque ya no estén en memoria o el servicio se haya reiniciado.
+def _iniciar_proceso_rutas(bancos, puertos):
+    # Corre una vez en cada proceso del pool: arma su propia copia del dataset
+    # (solo lo que usa el ruteo) y la publica en el `datos` de ese proceso
+    almacen_b, matriz, indice = None, None, None
+    if not bancos.empty:
+        almacen_b = almacen.AlmacenBancos(bancos, OFFSET_VISUAL_BANCOS)
+        matriz, indice = _estructuras_ruteo(almacen_b, puertos)
+    datos.publicar(publicacion.Dataset(datos.siguiente_version(), bancos, puertos, almacen_b, matriz, indice))
+
+def _adjuntar_proceso_rutas(directorio, sub):
+    # Modo compartido: abre el mismo snapshot (memory-map) en vez de recibir los DataFrames
+    datos.publicar(_dataset_compartido(directorio, compartido.leer_cabecera(directorio, sub)))
+
+def _trabajo_ruta(cancelar, id_embarcacion, params, puerto_salida_id, tiempo_limite_ms, max_iteraciones):
+    ds = datos.actual
+    return _optimizar(ds, id_embarcacion, params, _nodo_puerto(ds, puerto_salida_id), tiempo_limite_ms, max_iteraciones, cancelar=cancelar)
+
+async def _guardar_trabajo(trabajo):
+    if trabajo.estado != trabajos.TERMINADO: return
+    try:
+        async with database.SessionAsync() as db:
+            db.add(models.HistorialRuta(
+                id_embarcacion=trabajo.datos["id_embarcacion"], id_usuario=trabajo.id_usuario, id_trabajo=trabajo.id,
+                distancia_total_km=trabajo.resultado["distancia_total_km"], resultado=trabajo.resultado
+            ))
+            await db.commit()
+    except Exception:
+        log.exception("No se pudo guardar el trabajo en el historial", extra={"campos": {"id_trabajo": trabajo.id}})
+
+async def _trabajo_de_usuario(id_trabajo, current_user, db):
+    trabajo = gestor_trabajos.obtener(id_trabajo)
+    if trabajo is not None and trabajo.id_usuario == current_user.id_usuario: return trabajo.a_dict()
+    h = (await db.execute(select(models.HistorialRuta).where(
+        models.HistorialRuta.id_trabajo == id_trabajo, models.HistorialRuta.id_usuario == current_user.id_usuario
+    ))).scalars().first()
+    if h is None: raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return {"id_trabajo": h.id_trabajo, "estado": trabajos.TERMINADO, "id_embarcacion": h.id_embarcacion, "terminado": h.fecha_calculo, "resultado": h.resultado}
+
+@app.post("/optimizar-ruta/jobs", response_model=schemas.TrabajoResponse, status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(requiere_datos)])
+async def crear_trabajo_ruta(req: schemas.RutaRequest, response: Response, current_user: auth.Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    barco = await db.get(models.Embarcacion, req.id_embarcacion)
+    if not barco: raise HTTPException(status_code=404, detail="Barco no encontrado")
+    params = _parametros_barco(barco, req.capacidad_actual, req.velocidad_personalizada)
+    _nodo_puerto(datos.actual, req.puerto_salida_id)  # 404 antes de encolar
+    try:
+        # El proceso arma el nodo del puerto con su propio dataset (índices de su matriz)
+        trabajo = gestor_trabajos.enviar(
+            current_user.id_usuario, _trabajo_ruta, req.id_embarcacion, params, req.puerto_salida_id, req.tiempo_limite_ms, req.max_iteraciones,
+            datos={"id_embarcacion": req.id_embarcacion}, al_terminar=_guardar_trabajo
+        )
+    except trabajos.LimiteUsuario:
+        raise HTTPException(status_code=429, detail=f"Máximo {gestor_trabajos.por_usuario} trabajos activos por usuario", headers={"Retry-After": "1"})
+    except trabajos.ColaLlena:
+        raise HTTPException(status_code=503, detail="Cola de trabajos llena, reintente", headers={"Retry-After": "1"})
+    response.headers["Location"] = f"/optimizar-ruta/jobs/{trabajo.id}"
+    return trabajo.a_dict()
+
+@app.get("/optimizar-ruta/jobs/{id_trabajo}", response_model=schemas.TrabajoResponse)
+async def obtener_trabajo_ruta(id_trabajo: str, current_user: auth.Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    return await _trabajo_de_usuario(id_trabajo, current_user, db)
+
+@app.delete("/optimizar-ruta/jobs/{id_trabajo}", response_model=schemas.TrabajoResponse)
+async def cancelar_trabajo_ruta(id_trabajo: str, current_user: auth.Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    trabajo = gestor_trabajos.obtener(id_trabajo)
+    if trabajo is not None and trabajo.id_usuario == current_user.id_usuario: gestor_trabajos.cancelar(id_trabajo)
+    return await _trabajo_de_usuario(id_trabajo, current_user, db)
+
+# --- RUTEO DE FLOTA (LOTE) ---
+@app.post("/optimizar-ruta/flota", response_model=List[schemas.RutaResponse], dependencies=[Depends(requiere_datos)])
+async def calcular_rutas_flota(req: schemas.RutaFlotaRequest, current_user: auth.Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    q = select(models.Embarcacion)
+    if req.ids_embarcacion:
+        barcos = list((await db.execute(q.where(models.Embarcacion.id_embarcacion.in_(req.ids_embarcacion)))).scalars().all())
+        faltantes = set(req.ids_embarcacion) - {b.id_embarcacion for b in barcos}
+        if faltantes: raise HTTPException(status_code=404, detail=f"Barcos no encontrados: {', '.join(sorted(faltantes))}")
+        orden = {id_b: k for k, id_b in enumerate(req.ids_embarcacion)}
+        barcos.sort(key=lambda b: orden[b.id_embarcacion])
+    else:
+        barcos = (await db.execute(q.where(models.Embarcacion.owner_id == current_user.id_usuario))).scalars().all()
+    if not barcos: raise HTTPException(status_code=404, detail="No hay barcos para planificar")
+
+    ds = datos.actual
+    nodo_puerto = _nodo_puerto(ds, req.puerto_salida_id)
+    return await run_in_threadpool(_calcular_flota, ds, req, barcos, nodo_puerto)
+
+def _calcular_flota(ds, req, barcos, nodo_puerto):
+    parametros = [_parametros_barco(b) for b in barcos]
+    capacidades = [float(p['cap_max']) for p in parametros]
+
+    # Pool compartido: bancos más cercanos al puerto (radio máx.) hasta cubrir la bodega total
+    pool = np.empty(0, dtype=np.int64)
+    toneladas_b = ds.toneladas
+    indice_bancos = ds.indice
+    if indice_bancos is not None and nodo_puerto['idx'] != SIN_MATRIZ:
+        k = max(32, 4 * len(barcos))
+        while True:
+            pool, _ = indice_bancos.k_vecinos(nodo_puerto['lat'], nodo_puerto['lon'], k, radio_km=RADIO_MAX_SALTO_KM)
+            acumulado = np.cumsum(toneladas_b[pool], dtype=np.float64)
+            if len(pool) < k or acumulado[-1] >= sum(capacidades): break
+            k *= 2
+        corte = int(np.searchsorted(acumulado, sum(capacidades))) + 1 if len(pool) else 0
+        pool = pool[:corte]
+
+    with metricas.FASES.medir(proceso="flota", fase="asignacion"):
+        resultado = flota.resolver_flota(
+            nodo_puerto['idx'], capacidades, pool, toneladas_b[pool].astype(np.float64) if len(pool) else [],
+            ds.matriz.valores if ds.matriz is not None else np.zeros((1, 1)),
+            tiempo_limite_ms=req.tiempo_limite_ms or flota.TIEMPO_LIMITE_MS
+        )
+
+    with metricas.FASES.medir(proceso="flota", fase="consumo"):
+        return _respuestas_flota(ds, barcos, parametros, resultado, nodo_puerto)
+
+def _respuestas_flota(ds, barcos, parametros, resultado, nodo_puerto):
+    respuestas = []
+    for barco, params, (ruta, recogidas, dist_base, dist_final) in zip(barcos, parametros, resultado):
+        respuestas.append(_armar_respuesta(ds, barco.id_embarcacion, params, nodo_puerto, _ruta(ruta, recogidas), dist_base, dist_final, etiqueta_base="Ahorros + intercambios"))
+    return respuestas
+
 # --- DASHBOARD FINAL ---
+# Ambos se sirven desde estadisticas_flota / Dataset.zonas (memoria): la sesión
+# de BD solo se usa si los agregados aún no existen o expiró su TTL.
 @app.get("/reportes/dashboard", response_model=schemas.ReporteGeneral)
-def get_reportes_dashboard(db: Session = Depends(database.get_db)):
-    estados = db.query(models.Embarcacion.estado, func.count(models.Embarcacion.estado))\
-                .group_by(models.Embarcacion.estado).all()
-    dict_estados = {e[0]: e[1] for e in estados}
+async def get_reportes_dashboard(db: AsyncSession = Depends(get_db)):
+    if not estadisticas_flota.vigente: await estadisticas_flota.recalcular_async(db)
+    stats = estadisticas_flota.instantanea()
+    dict_estados = stats["por_estado"]
     
     chart_flota = [
         schemas.ChartData(label="En Ruta", value=dict_estados.get("EN_RUTA", 0), color="#10b981"),
@@ -453,46 +1004,31 @@ def get_reportes_dashboard(db: Session = Depends(database.get_db)):
         schemas.ChartData(label="Mantenimiento", value=dict_estados.get("MANTENIMIENTO", 0), color="#ef4444")
     ]
     
-    top_db = db.query(models.Embarcacion).order_by(models.Embarcacion.capacidad_bodega.desc()).limit(5).all()
     top_barcos = []
-    for i, b in enumerate(top_db):
-        factor_edad = 1.0 if b.anio_fabricacion > 2015 else 0.9
+    for i, (capacidad, nombre, anio) in enumerate(stats["top"]):
+        factor_edad = 1.0 if anio > 2015 else 0.9
         top_barcos.append(schemas.TopBarco(
             ranking=i+1, 
-            nombre=b.nombre, 
-            captura_total=b.capacidad_bodega * 4.5,
+            nombre=nombre, 
+            captura_total=capacidad * 4.5,
             eficiencia=round(95.0 * factor_edad, 1)
         ))
     
-    total_naves = db.query(models.Embarcacion).count() or 1
-    materiales = db.query(models.Embarcacion.material_casco, func.count(models.Embarcacion.material_casco))\
-                   .group_by(models.Embarcacion.material_casco).all()
-    
+    total_naves = stats["total"] or 1
     dist_materiales = []
-    for m in materiales:
+    for material, cantidad in stats["por_material"].items():
         dist_materiales.append(schemas.MaterialData(
-            material=m[0] if m[0] else "Desconocido",
-            cantidad=m[1],
-            porcentaje=round((m[1] / total_naves) * 100, 1)
+            material=material if material else "Desconocido",
+            cantidad=cantidad,
+            porcentaje=round((cantidad / total_naves) * 100, 1)
         ))
 
-    zona_activa = "Sin actividad"
-    total_biomasa = 0
-    if not df_bancos.empty:
-        col_ton = {c.lower(): c for c in df_bancos.columns}.get('toneladas estimadas')
-        col_lat = {c.lower(): c for c in df_bancos.columns}.get('latitud')
-        if col_ton and col_lat:
-            total_biomasa = df_bancos[col_ton].sum()
-            norte = df_bancos[df_bancos[col_lat] > -9][col_ton].sum()
-            centro = df_bancos[(df_bancos[col_lat] <= -9) & (df_bancos[col_lat] >= -14)][col_ton].sum()
-            sur = df_bancos[df_bancos[col_lat] < -14][col_ton].sum()
-            if norte >= centro and norte >= sur: zona_activa = "Norte (Paita-Chimbote)"
-            elif centro >= norte and centro >= sur: zona_activa = "Centro (Callao-Pisco)"
-            else: zona_activa = "Sur (Ilo-Matarani)"
-
-    cap_operativa = db.query(func.sum(models.Embarcacion.capacidad_bodega))\
-                      .filter(models.Embarcacion.estado != "MANTENIMIENTO")\
-                      .scalar() or 0
+    # Si la carga sigue en curso el dashboard responde igual, sin la parte de biomasa
+    biomasa_zonas = datos.actual.zonas if datos.actual else None
+    zona_activa = biomasa_zonas["zona_activa"] if biomasa_zonas else "Sin actividad"
+    total_biomasa = biomasa_zonas["total"] if biomasa_zonas else 0
+
+    cap_operativa = stats["capacidad_operativa"]
     
     ahorro_co2 = round(cap_operativa * 12.5, 2)
     dias = ["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"]
@@ -504,14 +1040,30 @@ def get_reportes_dashboard(db: Session = Depends(database.get_db)):
         "zonas_mas_activas": zona_activa, "ahorro_carbono": ahorro_co2, "flota_capacidad_total": cap_operativa
     }
 
+# Biomasa de cualquier rectángulo: /reportes/biomasa?bbox=lon_min,lat_min,lon_max,lat_max
+# Por defecto suma las celdas que toca el bbox (O(1)); exacto=true recorta los bancos del borde
+@app.get("/reportes/biomasa", dependencies=[Depends(requiere_datos)])
+def get_reporte_biomasa(bbox: Optional[str] = None, exacto: bool = False):
+    caja = _parsear_bbox(bbox)
+    ds = datos.actual
+    if ds.rejilla is None: return {"bbox": caja, "toneladas": 0.0, "bancos": 0, "exacto": exacto}
+    lon_min, lat_min, lon_max, lat_max = caja or (-np.inf, -np.inf, np.inf, np.inf)
+    r = ds.rejilla.consultar(lat_min, lat_max, lon_min, lon_max, exacto=exacto)
+    return {
+        "bbox": caja, "toneladas": round(r["toneladas"], 2), "bancos": r["bancos"], "exacto": exacto, "version": ds.version,
+        "tam_celda_grados": ds.rejilla.tam, "zonas": {k: round(v, 2) for k, v in ds.zonas["zonas"].items()},
+    }
+
 @app.get("/kpis", response_model=schemas.KpiResponse)
-def get_kpis_api(db: Session = Depends(database.get_db)):
-    total_barcos = db.query(models.Embarcacion).count()
-    activos = db.query(models.Embarcacion).filter(models.Embarcacion.estado != "MANTENIMIENTO").count()
-    capacidad_total = db.query(func.sum(models.Embarcacion.capacidad_bodega)).scalar() or 0
+async def get_kpis_api(db: AsyncSession = Depends(get_db)):
+    if not estadisticas_flota.vigente: await estadisticas_flota.recalcular_async(db)
+    stats = estadisticas_flota.instantanea()
+    total_barcos = stats["total"]
+    activos = total_barcos - stats["por_estado"].get(estadisticas.ESTADO_FUERA_DE_SERVICIO, 0)
+    capacidad_total = stats["capacidad_total"]
     return {
         "flota_activa": f"{activos} / {total_barcos}",
         "operatividad": f"{round((activos/total_barcos)*100, 1) if total_barcos > 0 else 0}%",
         "pesca_dia": f"{capacidad_total:,.0f} TM",
         "ahorro": "12.5%", "alertas": 0
-    }
\ No newline at end of file
+    }
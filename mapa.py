@@ -0,0 +1,77 @@
+import numpy as np
+
+# --- PROYECCIÓN AL MAPA (CSS %) ---
+def map_gps_to_css(lat, lon):
+    # Calibración OFICIAL para "Peru_location_map.svg" (acepta escalares o arrays)
+    map_norte = 0.73
+    map_sur = -19.36
+    map_oeste = -83.25
+    map_este = -66.75
+
+    y = (lat - map_norte) / (map_sur - map_norte) * 100
+    x = (lon - map_oeste) / (map_este - map_oeste) * 100
+
+    return x, y
+
+# --- CAPA DE BANCOS PARA EL MAPA ---
+# Todo lo que /bancos necesita se calcula una vez por carga de datos:
+#   - x/y CSS ya desplazados (OFFSET visual) y la máscara de "visible en el mapa"
+#     vienen del almacén de bancos (almacen.AlmacenBancos, arrays compartidos).
+#   - Nivel de detalle (LOD): en el zoom z la costa se parte en celdas de
+#     TAM_CELDA_ZOOM_0 / 2^z grados y en cada celda se ve solo el banco con más
+#     toneladas. nivel_min[i] es el primer zoom en el que aparece el banco i; como
+#     el máximo de una celda también es el máximo de su subcelda, lo visible en z
+#     sigue visible en z+1 (adelgazamiento determinista y anidado).
+#   - Un orden fijo (nivel, -toneladas, id) para que la paginación sea estable.
+ZOOM_MAX = 10
+TAM_CELDA_ZOOM_0 = 4.0
+
+class CapaBancos:
+    def __init__(self, almacen, indice):
+        self.almacen = almacen
+        self.ids, self.toneladas = almacen.ids, almacen.toneladas
+        self.x, self.y, self.visible = almacen.x, almacen.y, almacen.visible
+        self.indice = indice
+
+        n = len(self.ids)
+        self.nivel_min = np.full(n, ZOOM_MAX, dtype=np.int8)
+        # Orden "mejor primero" dentro de cada celda: más toneladas, luego menor id
+        prioridad = np.lexsort((self.ids, -self.toneladas))
+        lat, lon = almacen.lat.astype(np.float64), almacen.lon.astype(np.float64)
+        for z in range(ZOOM_MAX - 1, -1, -1):
+            tam = TAM_CELDA_ZOOM_0 / (2 ** z)
+            celda = np.floor(lat / tam).astype(np.int64) * 1_000_003 + np.floor(lon / tam).astype(np.int64)
+            _, primeros = np.unique(celda[prioridad], return_index=True)
+            self.nivel_min[prioridad[primeros]] = z
+        self.rango = np.empty(n, dtype=np.int32)
+        self.rango[np.lexsort((self.ids, -self.toneladas, self.nivel_min))] = np.arange(n)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def consultar(self, bbox=None, zoom=None):
+        # bbox = (lon_min, lat_min, lon_max, lat_max). Devuelve índices en orden estable.
+        if bbox is None:
+            idx = np.arange(len(self.ids))
+        else:
+            lon_min, lat_min, lon_max, lat_max = bbox
+            idx = self.indice.en_rectangulo(lat_min, lat_max, lon_min, lon_max)
+        idx = idx[self.visible[idx]]
+        if zoom is not None:
+            idx = idx[self.nivel_min[idx] <= zoom]
+        return idx[np.argsort(self.rango[idx], kind='stable')]
+
+    def columnas(self, idx):
+        # Mismos campos que filas(), como struct-of-arrays (modo ?formato=columnar).
+        # float32 -> float64 redondeado: el JSON no arrastra el ruido de la conversión
+        lat, lon = self.almacen.coordenadas(idx)
+        return {"id": self.ids[idx], "latitud": lat, "longitud": lon,
+                "toneladas": np.round(self.toneladas[idx].astype(np.float64), 2),
+                "x": np.round(self.x[idx].astype(np.float64), 4), "y": np.round(self.y[idx].astype(np.float64), 4)}
+
+    def filas(self, idx):
+        c = self.columnas(idx)
+        return [
+            {"id": i, "latitud": la, "longitud": lo, "toneladas": t, "x": x, "y": y}
+            for i, la, lo, t, x, y in zip(*(c[k].tolist() for k in ("id", "latitud", "longitud", "toneladas", "x", "y")))
+        ]
@@ -0,0 +1,138 @@
+import time
+import bisect
+import functools
+import threading
+from contextlib import contextmanager
+
+# --- MÉTRICAS (FORMATO TEXTO DE PROMETHEUS) ---
+# Registro mínimo sin dependencias: contadores, medidores (gauges) e histogramas
+# con etiquetas. GET /metrics devuelve exportar(). Los medidores pueden leer su
+# valor de una función en el momento de exportar (tamaños de datasets, cachés).
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+
+_registro = []
+
+def _escapar(v):
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _etiquetas(nombres, valores, extra=()):
+    pares = list(zip(nombres, valores)) + list(extra)
+    if not pares: return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in pares) + "}"
+
+def _numero(v):
+    if v == float("inf"): return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=(), funcion=None):
+        # funcion() -> número, o {tupla_de_etiquetas: número}: el valor se lee al exportar
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.funcion = funcion
+        self._lock = threading.Lock()
+        self._valores = {}
+        _registro.append(self)
+
+    def _clave(self, etiquetas):
+        return tuple(str(etiquetas.get(e, "")) for e in self.etiquetas)
+
+    def _valores_actuales(self):
+        if self.funcion is None:
+            with self._lock: return dict(self._valores)
+        try:
+            v = self.funcion()
+        except Exception:
+            return {}
+        return v if isinstance(v, dict) else {(): v}
+
+    def _muestras(self):
+        return [f"{self.nombre}{_etiquetas(self.etiquetas, k)} {_numero(v)}" for k, v in sorted(self._valores_actuales().items()) if v is not None]
+
+    def exportar(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        return lineas + self._muestras()
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def inc(self, n=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock: self._valores[clave] = self._valores.get(clave, 0) + n
+
+    def valor(self, **etiquetas):
+        return self._valores_actuales().get(self._clave(etiquetas), 0)
+
+class Medidor(_Metrica):
+    tipo = "gauge"
+
+    def set(self, valor, **etiquetas):
+        with self._lock: self._valores[self._clave(etiquetas)] = valor
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_SEGUNDOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(buckets)
+
+    def observar(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        i = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            estado = self._valores.get(clave)
+            if estado is None:
+                estado = self._valores[clave] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            estado[0][i] += 1; estado[1] += valor; estado[2] += 1
+
+    @contextmanager
+    def medir(self, **etiquetas):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - t0, **etiquetas)
+
+    def cronometrar(self, **etiquetas):
+        # Decorador: @HISTOGRAMA.cronometrar(fase="greedy")
+        def decorador(fn):
+            @functools.wraps(fn)
+            def envoltura(*args, **kwargs):
+                with self.medir(**etiquetas):
+                    return fn(*args, **kwargs)
+            return envoltura
+        return decorador
+
+    def resumen(self):
+        # {etiquetas: {"n", "suma", "buckets"}} (para endpoints JSON o pruebas)
+        with self._lock:
+            return {k: {"n": v[2], "suma": v[1], "buckets": list(v[0])} for k, v in self._valores.items()}
+
+    def _muestras(self):
+        lineas = []
+        with self._lock: valores = {k: (list(v[0]), v[1], v[2]) for k, v in self._valores.items()}
+        for clave, (conteos, suma, n) in sorted(valores.items()):
+            acumulado = 0
+            for limite, c in zip(self.buckets + (float("inf"),), conteos):
+                acumulado += c
+                lineas.append(f"{self.nombre}_bucket{_etiquetas(self.etiquetas, clave, [('le', _numero(limite))])} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {_numero(suma)}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {n}")
+        return lineas
+
+def exportar():
+    lineas = []
+    for m in _registro: lineas.extend(m.exportar())
+    return "\n".join(lineas) + "\n"
+
+# --- MÉTRICAS DEL SERVICIO ---
+PETICIONES_HTTP = Histograma("ringensoft_http_peticion_segundos", "Latencia de las peticiones HTTP por ruta", ("metodo", "ruta", "codigo"))
+FASES = Histograma("ringensoft_fase_segundos", "Duración de las fases internas (ruteo, flota)", ("proceso", "fase"))
+CARGA_FASES = Medidor("ringensoft_carga_fase_segundos", "Duración de la última ejecución de cada fase de load_data", ("fase",))
+CONSULTAS_DISTANCIA = Contador("ringensoft_distancia_consultas_total", "Distancias consultadas: matriz_tramos (tramos de la respuesta), matriz_busqueda_local (submatriz de la búsqueda local), indice_haversine / matriz_greedy (vecino más cercano del greedy)", ("origen",))
+AUTH = Histograma("ringensoft_auth_segundos", "Latencia del flujo de autenticación", ("operacion",))
+AUTH_RECHAZOS = Contador("ringensoft_auth_rechazos_total", "Operaciones bcrypt rechazadas por saturación", ("operacion",))
@@ -69,5 +69,9 @@ class HistorialRuta(Base):
     id_embarcacion = Column(String(50), ForeignKey("embarcaciones.id_embarcacion"))
     fecha_calculo = Column(DateTime(timezone=True), server_default=func.now())
     distancia_total_km = Column(Float)
+    # Trabajos de /optimizar-ruta/jobs: id público, dueño y RutaResponse completa
+    id_trabajo = Column(String(32), unique=True, index=True, nullable=True)
+    id_usuario = Column(Integer, ForeignKey("usuarios.id_usuario"), nullable=True)
+    resultado = Column(JSON, nullable=True)
     
     embarcacion = relationship("Embarcacion")
\ No newline at end of file
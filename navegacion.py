@@ -0,0 +1,200 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import numpy as np
+from . import litoral, fuentes, arranque, bitacora
+from .distancias import haversine_vectorizado
+
+log = bitacora.obtener(__name__)
+
+# --- DISTANCIAS MARÍTIMAS (SIN CRUZAR TIERRA) ---
+# Haversine en línea recta subestima los tramos que doblan un cabo (y los dibuja
+# sobre tierra). Modelo marítimo sobre el polígono de mar de litoral.py:
+#   1. Grafo de visibilidad: un waypoint en el mar junto a cada vértice del litoral
+#      (los caminos más cortos dentro de un polígono solo doblan en sus vértices).
+#      Dos puntos se "ven" si el segmento entre ellos no cruza ningún borde.
+#   2. Caminos mínimos entre waypoints con Floyd-Warshall (V = vértices del litoral,
+#      unas decenas) y, para cada nodo, el mejor camino a todos los waypoints que
+#      ve (producto min-plus): equivale a un Dijkstra desde cada puerto/banco.
+#   3. Tramo i -> j: haversine si se ven; si no, por el mejor par de waypoints.
+#      Los puertos en tierra se anclan al punto de mar más cercano (+ esa distancia).
+# Todo esto es fuera de línea: el resultado es la misma matriz N x N float32 del
+# ruteo, guardada como .npy en la caché de fuentes (<dir de bancos>/.cache/). Al
+# cargar datos se abre con memory-map si su clave (nodos + litoral) coincide; si
+# no hay precálculo se sigue usando haversine.
+#   python -m <paquete>.navegacion [--forzar]   (después de cambiar los datos)
+VERSION_FORMATO = 1
+SEPARACION_COSTA = 0.02   # grados: waypoint corrido hacia el mar desde cada vértice
+RADIO_ANCLAJE = 1.0       # grados: búsqueda del mar más cercano para nodos en tierra
+FILAS_POR_BLOQUE = 32     # acota el temporal min-plus a BLOQUE x N x V
+PREFIJO_ARCHIVO = "navegacion-"
+
+def _orientacion(ax, ay, bx, by, cx, cy):
+    return (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+
+class Costa:
+    def __init__(self, anillos):
+        self.anillos = anillos
+        self.x0 = np.concatenate([a[:-1, 0] for a in anillos]); self.y0 = np.concatenate([a[:-1, 1] for a in anillos])
+        self.x1 = np.concatenate([a[1:, 0] for a in anillos]); self.y1 = np.concatenate([a[1:, 1] for a in anillos])
+
+    def libre(self, lat1, lon1, lat2, lon2):
+        # True si el segmento (recta en lon/lat) no cruza ningún borde del polígono
+        lat1, lon1, lat2, lon2 = np.broadcast_arrays(lat1, lon1, lat2, lon2)
+        libre = np.ones(lat1.shape, dtype=bool)
+        for ex0, ey0, ex1, ey1 in zip(self.x0, self.y0, self.x1, self.y1):
+            cruza = _orientacion(lon1, lat1, lon2, lat2, ex0, ey0) * _orientacion(lon1, lat1, lon2, lat2, ex1, ey1) < 0
+            if not cruza.any(): continue
+            cruza &= _orientacion(ex0, ey0, ex1, ey1, lon1, lat1) * _orientacion(ex0, ey0, ex1, ey1, lon2, lat2) < 0
+            libre &= ~cruza
+        return libre
+
+    def waypoints(self, mascara, separacion=SEPARACION_COSTA):
+        # Un punto de mar junto a cada vértice, sobre la bisectriz de sus dos bordes
+        puntos = []
+        for anillo in self.anillos:
+            v = anillo[:-1] if np.array_equal(anillo[0], anillo[-1]) else anillo
+            for k in range(len(v)):
+                previo, actual, siguiente = v[k - 1], v[k], v[(k + 1) % len(v)]
+                a = (previo - actual) / max(np.linalg.norm(previo - actual), 1e-12)
+                b = (siguiente - actual) / max(np.linalg.norm(siguiente - actual), 1e-12)
+                d = a + b
+                if np.linalg.norm(d) < 1e-9: d = np.array([-a[1], a[0]])  # vértice recto: normal al borde
+                d = d / np.linalg.norm(d)
+                for p in (actual + separacion * d, actual - separacion * d):
+                    if mascara.es_mar(p[1], p[0]):
+                        puntos.append(p)
+                        break
+        puntos = np.asarray(puntos, dtype=np.float64).reshape(-1, 2)
+        return puntos[:, 1], puntos[:, 0]
+
+def _anclar(lat, lon, mascara, radio=RADIO_ANCLAJE):
+    # Nodos en tierra (p. ej. puertos) -> centro de la celda de mar más cercana
+    alat, alon, km = lat.copy(), lon.copy(), np.zeros(len(lat))
+    r = mascara.resolucion
+    for i in np.flatnonzero(~mascara.es_mar(lat, lon)):
+        f0 = max(int((litoral.LAT_NORTE - lat[i] - radio) / r), 0); f1 = min(int((litoral.LAT_NORTE - lat[i] + radio) / r) + 1, mascara.filas)
+        c0 = max(int((lon[i] - radio - litoral.LON_OESTE) / r), 0); c1 = min(int((lon[i] + radio - litoral.LON_OESTE) / r) + 1, mascara.columnas)
+        ff, cc = np.nonzero(mascara.mar[f0:f1, c0:c1])
+        if len(ff) == 0: continue
+        la = litoral.LAT_NORTE - (f0 + ff + 0.5) * r
+        lo = litoral.LON_OESTE + (c0 + cc + 0.5) * r
+        d = haversine_vectorizado(lat[i], lon[i], la, lo)
+        k = int(np.argmin(d))
+        alat[i], alon[i], km[i] = la[k], lo[k], d[k]
+    return alat, alon, km
+
+def calcular(latitudes, longitudes, costa=None, mascara=None):
+    # latitudes/longitudes de los N nodos de la matriz (bancos + puertos).
+    # Devuelve (matriz N x N float32, info)
+    mascara = mascara or litoral.mascara_mar()
+    costa = costa or Costa(litoral._leer_poligono(litoral.ARCHIVO_LITORAL))
+    lat = np.asarray(latitudes, dtype=np.float64); lon = np.asarray(longitudes, dtype=np.float64)
+    alat, alon, anclaje = _anclar(lat, lon, mascara)
+    wlat, wlon = costa.waypoints(mascara)
+
+    # Waypoint -> waypoint: Floyd-Warshall vectorizado (V x V)
+    d_ww = np.where(costa.libre(wlat[:, None], wlon[:, None], wlat[None, :], wlon[None, :]),
+                    haversine_vectorizado(wlat[:, None], wlon[:, None], wlat[None, :], wlon[None, :]), np.inf)
+    np.fill_diagonal(d_ww, 0.0)
+    for k in range(len(wlat)):
+        np.minimum(d_ww, d_ww[:, k, None] + d_ww[None, k, :], out=d_ww)
+
+    # Nodo -> waypoints que ve (a) y nodo -> cualquier waypoint por el grafo (b)
+    a = np.where(costa.libre(alat[:, None], alon[:, None], wlat[None, :], wlon[None, :]),
+                 haversine_vectorizado(alat[:, None], alon[:, None], wlat[None, :], wlon[None, :]), np.inf)
+    b = np.empty_like(a)
+    for ini in range(0, len(lat), FILAS_POR_BLOQUE):
+        b[ini:ini + FILAS_POR_BLOQUE] = np.min(a[ini:ini + FILAS_POR_BLOQUE, :, None] + d_ww[None, :, :], axis=1)
+
+    n = len(lat)
+    valores = np.empty((n, n), dtype=np.float32)
+    desviados = sin_camino = 0
+    for ini in range(0, n, FILAS_POR_BLOQUE):
+        fin = min(ini + FILAS_POR_BLOQUE, n)
+        recto = haversine_vectorizado(alat[ini:fin, None], alon[ini:fin, None], alat[None, :], alon[None, :])
+        libre = costa.libre(alat[ini:fin, None], alon[ini:fin, None], alat[None, :], alon[None, :])
+        d = recto
+        if not libre.all():
+            via = np.min(b[ini:fin, None, :] + a[None, :, :], axis=2)
+            d = np.where(libre, recto, via)
+        d = d + anclaje[ini:fin, None] + anclaje[None, :]
+        falta = ~np.isfinite(d)
+        if falta.any():
+            # Sin camino por el mar (nodo fuera del polígono): se deja la línea recta
+            d[falta] = haversine_vectorizado(lat[ini:fin, None], lon[ini:fin, None], lat[None, :], lon[None, :])[falta]
+        desviados += int((~libre).sum()); sin_camino += int(falta.sum())
+        valores[ini:fin] = d
+    np.fill_diagonal(valores, 0.0)
+    return valores, {"nodos": n, "waypoints": len(wlat), "tramos_desviados": desviados, "tramos_sin_camino": sin_camino,
+                     "nodos_anclados": int((anclaje > 0).sum())}
+
+# --- MATRIZ PRECALCULADA EN DISCO ---
+def clave(ids, latitudes, longitudes):
+    h = hashlib.sha1()
+    h.update(json.dumps([VERSION_FORMATO, SEPARACION_COSTA, RADIO_ANCLAJE, litoral.RESOLUCION, list(map(str, ids))]).encode())
+    h.update(np.ascontiguousarray(latitudes, dtype=np.float32).tobytes())
+    h.update(np.ascontiguousarray(longitudes, dtype=np.float32).tobytes())
+    with open(litoral.ARCHIVO_LITORAL, 'rb') as f: h.update(f.read())
+    return h.hexdigest()[:16]
+
+def _dir_cache():
+    ruta = fuentes.encontrar_archivo("bancos")
+    return os.path.join(os.path.dirname(ruta) if ruta else fuentes.BASE_DIR, fuentes.DIR_CACHE)
+
+def archivo(ids, latitudes, longitudes):
+    return os.path.join(_dir_cache(), f"{PREFIJO_ARCHIVO}{clave(ids, latitudes, longitudes)}.npy")
+
+def cargar(ids, latitudes, longitudes):
+    # Matriz marítima precalculada para estos nodos (memory-map, solo lectura) o None
+    ruta = archivo(ids, latitudes, longitudes)
+    if not os.path.exists(ruta): return None
+    try:
+        valores = np.load(ruta, mmap_mode='r', allow_pickle=False)
+    except (OSError, ValueError) as e:
+        log.warning(f"Matriz marítima {ruta} ilegible, se usa haversine", extra={"campos": {"error": str(e)}})
+        return None
+    if valores.shape != (len(ids), len(ids)) or valores.dtype != np.float32:
+        log.warning(f"Matriz marítima {ruta} no coincide con los nodos, se usa haversine")
+        return None
+    return valores
+
+def guardar(ids, latitudes, longitudes, valores):
+    ruta = archivo(ids, latitudes, longitudes)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    tmp = f"{ruta}.tmp-{os.getpid()}"
+    with open(tmp, 'wb') as f:
+        np.save(f, np.ascontiguousarray(valores, dtype=np.float32), allow_pickle=False)
+    os.replace(tmp, ruta)
+    # Solo se conserva la de los datos vigentes
+    for nombre in os.listdir(os.path.dirname(ruta)):
+        completo = os.path.join(os.path.dirname(ruta), nombre)
+        if nombre.startswith(PREFIJO_ARCHIVO) and completo != ruta and '.tmp-' not in nombre:
+            os.remove(completo)
+    return ruta
+
+# --- CLI: precálculo antes del despliegue ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precalcula la matriz de distancias marítimas (sin cruzar tierra) de los datos actuales.")
+    parser.add_argument('--forzar', action='store_true', help="Recalcula aunque ya exista para estos datos")
+    args = parser.parse_args(argv)
+
+    from . import main as aplicacion
+    ds = aplicacion._construir_dataset(0, arranque.medir_fase)
+    if ds.matriz is None:
+        print("⚠️ No hay bancos cargados: nada que precalcular."); return 1
+    m = ds.matriz
+    if m.modelo == "maritimo" and not args.forzar:
+        print(f"✅ Matriz marítima vigente: {archivo(m.ids, m.lat, m.lon)}"); return 0
+    t0 = time.perf_counter()
+    valores, info = calcular(m.lat, m.lon)
+    ruta = guardar(m.ids, m.lat, m.lon, valores)
+    print(f"✅ {info['nodos']} nodos, {info['waypoints']} waypoints, {info['tramos_desviados']} tramos desviados "
+          f"({time.perf_counter() - t0:.1f} s) -> {ruta}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import os
+import time
+import weakref
+import threading
+from . import bitacora
+
+log = bitacora.obtener(__name__)
+
+# --- DATASETS INMUTABLES (BANCOS + PUERTOS + ESTRUCTURAS) ---
+# Todo lo que sale de load_data vive en un Dataset que no se modifica después de
+# publicarse. Cada petición toma `datos.actual` una vez al empezar y trabaja con
+# esa referencia hasta el final: una recarga publica otro Dataset (cambio atómico
+# de una referencia) sin tocar lo que esté en curso. El anterior se libera solo
+# cuando la última petición que lo usaba termina (conteo de referencias).
+# Recarga: POST /datos/recargar o vigilando los archivos cada INTERVALO_VIGILANCIA_S
+# (RINGEN_RECARGA_INTERVALO, 0 = sin vigilancia).
+INTERVALO_VIGILANCIA_S = float(os.getenv("RINGEN_RECARGA_INTERVALO", 0))
+
+class Dataset:
+    __slots__ = ("version", "bancos", "puertos", "almacen", "matriz", "indice", "capa", "rejilla", "zonas", "firma", "origen", "creado", "__weakref__")
+
+    def __init__(self, version, bancos, puertos, almacen=None, matriz=None, indice=None, capa=None, rejilla=None, zonas=None, firma=None, origen=None):
+        # almacen: almacen.AlmacenBancos (arrays por banco); bancos: DataFrame completo (exportación)
+        # origen: snapshot compartido del que se abrió (compartido.py) o None si se armó en este proceso
+        valores = dict(version=version, bancos=bancos, puertos=puertos, almacen=almacen, matriz=matriz, indice=indice,
+                       capa=capa, rejilla=rejilla, zonas=zonas, firma=firma, origen=origen, creado=time.time())
+        for k, v in valores.items(): object.__setattr__(self, k, v)
+
+    @property
+    def toneladas(self):
+        return self.almacen.toneladas if self.almacen is not None else None
+
+    def __setattr__(self, nombre, valor):
+        raise AttributeError("Dataset es inmutable: se publica uno nuevo")
+
+    def resumen(self):
+        return {
+            "version": self.version, "creado": self.creado, "origen": self.origen,
+            "bancos": len(self.bancos), "puertos": len(self.puertos),
+            "nodos_matriz": 0 if self.matriz is None else len(self.matriz),
+            "modelo_distancias": None if self.matriz is None else self.matriz.modelo,
+            "mb_almacen": 0.0 if self.almacen is None else round(self.almacen.nbytes() / 1e6, 3),
+        }
+
+class Publicador:
+    def __init__(self):
+        self._actual = None
+        self._version = 0
+        self._lock = threading.Lock()
+        self._recargando = threading.Lock()
+        self._vivos = weakref.WeakValueDictionary()
+        self._vigilante = None
+        self.ultima_recarga = None  # {"estado", "inicio", "segundos", "version", "detalle"}
+
+    @property
+    def actual(self):
+        return self._actual
+
+    def siguiente_version(self):
+        with self._lock:
+            self._version += 1
+            return self._version
+
+    def publicar(self, ds):
+        with self._lock:
+            self._version = max(self._version, ds.version)  # versiones de un snapshot compartido
+            self._actual = ds
+            self._vivos[ds.version] = ds
+
+    def vivos(self):
+        # Versiones que alguna petición (o el propio publicador) todavía referencia
+        return sorted(self._vivos.keys())
+
+    @property
+    def recargando(self):
+        return self._recargando.locked()
+
+    def recargar(self, construir, publicar=None):
+        # construir(version) -> Dataset, en un hilo aparte. Una recarga a la vez:
+        # devuelve False si ya hay una en curso. Si falla se conserva el actual.
+        if not self._recargando.acquire(blocking=False): return False
+        def correr():
+            t0 = time.perf_counter()
+            self.ultima_recarga = {"estado": "EN_CURSO", "inicio": time.time(), "segundos": None, "version": None, "detalle": None}
+            try:
+                ds = construir(self.siguiente_version())
+                (publicar or self.publicar)(ds)
+                self.ultima_recarga.update(estado="LISTO", version=ds.version)
+                log.info("Dataset recargado", extra={"campos": {"version": ds.version, "bancos": len(ds.bancos), "vivos": self.vivos()}})
+            except Exception as e:
+                self.ultima_recarga.update(estado="ERROR", detalle=str(e))
+                log.error(f"Error recargando datos: {e}", exc_info=True)
+            finally:
+                self.ultima_recarga["segundos"] = round(time.perf_counter() - t0, 3)
+                self._recargando.release()
+        threading.Thread(target=correr, name="ringensoft-recarga", daemon=True).start()
+        return True
+
+    def vigilar(self, firma, construir, publicar=None, intervalo=INTERVALO_VIGILANCIA_S):
+        # firma() -> valor que cambia cuando cambian los archivos (ver fuentes.firma)
+        if intervalo <= 0 or self._vigilante is not None: return
+        def bucle():
+            intentada = None  # si una recarga falla no se reintenta hasta que el archivo vuelva a cambiar
+            while True:
+                time.sleep(intervalo)
+                try:
+                    actual, nueva = self._actual, firma()
+                    if actual is not None and nueva not in (actual.firma, intentada) and not self.recargando:
+                        log.info("Archivos de datos modificados: recargando")
+                        intentada = nueva
+                        self.recargar(construir, publicar)
+                except Exception as e:
+                    log.warning(f"Vigilancia de archivos: {e}")
+        self._vigilante = threading.Thread(target=bucle, name="ringensoft-vigilancia", daemon=True)
+        self._vigilante.start()
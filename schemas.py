@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Annotated
+from datetime import datetime
 
 # --- ESQUEMAS DE AUTENTICACIÓN ---
 class UsuarioLogin(BaseModel):
@@ -77,6 +78,15 @@ class RutaRequest(BaseModel):
     velocidad_personalizada: Optional[float] = None
     # SOLO QUEDA PUERTO SALIDA (El retorno es automático)
     puerto_salida_id: str
+    # Presupuesto de la búsqueda local (ms de reloj y/o movimientos aplicados)
+    tiempo_limite_ms: Optional[int] = Field(None, gt=0, le=60000)
+    max_iteraciones: Optional[int] = Field(None, gt=0)
+
+class RutaFlotaRequest(BaseModel):
+    # Sin ids: se planifica toda la flota del usuario autenticado
+    ids_embarcacion: Optional[List[str]] = None
+    puerto_salida_id: str
+    tiempo_limite_ms: Optional[int] = Field(None, gt=0, le=60000)
 
 class NodoRuta(BaseModel):
     id_nodo: str
@@ -96,6 +106,39 @@ class RutaResponse(BaseModel):
     mensaje: str
     resumen_texto: str 
 
+# --- ESCENARIOS "QUÉ PASA SI" ---
+class EscenariosRequest(BaseModel):
+    id_embarcacion: str
+    # Ruta fija (ids de nodos: puerto, bancos..., puerto) o, si no viene, la que
+    # calcula /optimizar-ruta desde puerto_salida_id con los datos del barco
+    ruta: Optional[List[str]] = Field(None, min_length=2)
+    puerto_salida_id: Optional[str] = None
+    tiempo_limite_ms: Optional[int] = Field(None, gt=0, le=60000)
+    # Rejilla de parámetros (sin lista = valor del barco); se evalúan todas las combinaciones.
+    # Mínimos = escenarios.VELOCIDAD_MIN_NUDOS / CAPACIDAD_MIN_TM
+    velocidades: Optional[List[Annotated[float, Field(ge=1)]]] = Field(None, min_length=1)
+    capacidades: Optional[List[Annotated[float, Field(ge=1)]]] = Field(None, min_length=1)
+    tripulaciones: Optional[List[Annotated[int, Field(ge=0)]]] = Field(None, min_length=1)
+
+class EscenariosResponse(BaseModel):
+    id_embarcacion: str
+    ruta: List[str]
+    distancia_total_km: float
+    n_escenarios: int
+    # Tabla por columnas: velocidad_nudos, capacidad_tm, tripulacion, consumo_galones,
+    # tiempo_horas, carga_tm, galones_por_tm (una fila por escenario)
+    escenarios: Dict[str, List[float]]
+
+# --- TRABAJOS DE RUTEO (COLA EN PROCESOS) ---
+class TrabajoResponse(BaseModel):
+    id_trabajo: str
+    estado: str
+    id_embarcacion: Optional[str] = None
+    creado: Optional[datetime] = None
+    terminado: Optional[datetime] = None
+    resultado: Optional[RutaResponse] = None
+    error: Optional[str] = None
+
 class ChartData(BaseModel):
     label: str
     value: float
@@ -0,0 +1,109 @@
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert, delete
+from sqlalchemy.dialects.mysql import insert as insert_mysql
+from sqlalchemy.dialects.sqlite import insert as insert_sqlite
+from sqlalchemy.dialects.postgresql import insert as insert_postgresql
+from . import models, database, fuentes
+
+# --- IMPORTADOR DE FLOTA (SEEDER) ---
+# Convierte la planilla de embarcaciones en filas de la tabla embarcaciones con
+# operaciones de columna (nada de iterrows) y las inserta con executemany en
+# lotes grandes dentro de una sola transacción. Lo usa load_data para la flota
+# inicial y también se puede correr a mano:
+#   python -m <paquete>.semilla [archivo.xlsx|csv] [--upsert] [--prefijo SYSTEM]
+TAM_LOTE = 5000
+PREFIJO_SISTEMA = "SYSTEM"
+
+# columna de la planilla (en minúsculas) -> (campo en la tabla, valor si falta la columna)
+COLUMNAS_NUMERICAS = {
+    'capacidad de carga (tm)': ('capacidad_bodega', 0.0),
+    'velocidad promedio (nudos)': ('velocidad_promedio', 12.0),
+    'consumo combustible (l/km)': ('consumo_combustible', 1.5),
+    'tripulación máxima': ('tripulacion_maxima', 10),
+    'año de fabricación': ('anio_fabricacion', 2010),
+}
+CAMPOS_ENTEROS = ('tripulacion_maxima', 'anio_fabricacion')
+
+def preparar_flota(df, prefijo=PREFIJO_SISTEMA):
+    # DataFrame de la planilla -> lista de dicts listos para insert() (misma regla
+    # de ids y nombres que el seeder original: <prefijo>-0000, "Ringen-001 ACE")
+    df = df.copy()
+    df.columns = [str(c).strip() for c in df.columns]
+    df = df.fillna(0)
+    cols = {c.lower(): c for c in df.columns}
+    n = len(df)
+    posiciones = np.arange(n)
+
+    salida = pd.DataFrame(index=df.index)
+    salida['id_embarcacion'] = [f"{prefijo}-{i:04d}" for i in posiciones]
+    if 'tipo de casco' in cols:
+        tipo = df[cols['tipo de casco']].astype(str).str.upper()
+    else:
+        tipo = pd.Series("NAVE", index=df.index)
+    salida['nombre'] = [f"Ringen-{i + 1:03d} {t[:3]}" for i, t in zip(posiciones, tipo.tolist())]
+    salida['material_casco'] = tipo
+    for columna, (campo, defecto) in COLUMNAS_NUMERICAS.items():
+        if columna in cols:
+            salida[campo] = pd.to_numeric(df[cols[columna]], errors='coerce').fillna(0)
+        else:
+            salida[campo] = defecto
+        salida[campo] = salida[campo].astype(np.int64 if campo in CAMPOS_ENTEROS else np.float64)
+    salida['owner_id'] = None
+    return salida.to_dict('records')
+
+def _sentencia_upsert(dialecto, tabla, campos):
+    # INSERT ... ON DUPLICATE KEY / ON CONFLICT: actualiza solo las columnas de la
+    # planilla (estado y dueño del barco se conservan)
+    actualizar = [c for c in campos if c not in ('id_embarcacion', 'owner_id')]
+    if dialecto == 'mysql':
+        stmt = insert_mysql(tabla)
+        return stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in actualizar})
+    if dialecto in ('sqlite', 'postgresql'):
+        stmt = (insert_sqlite if dialecto == 'sqlite' else insert_postgresql)(tabla)
+        return stmt.on_conflict_do_update(index_elements=['id_embarcacion'], set_={c: stmt.excluded[c] for c in actualizar})
+    return None
+
+def insertar_flota(engine, filas, upsert=False, tam_lote=TAM_LOTE):
+    if not filas: return 0
+    tabla = models.Embarcacion.__table__
+    stmt = _sentencia_upsert(engine.dialect.name, tabla, list(filas[0])) if upsert else insert(tabla)
+    with engine.begin() as conn:
+        for i in range(0, len(filas), tam_lote):
+            lote = filas[i:i + tam_lote]
+            if stmt is None:
+                # Motor sin upsert nativo: borrar y volver a insertar el lote
+                conn.execute(delete(tabla).where(tabla.c.id_embarcacion.in_([f['id_embarcacion'] for f in lote])))
+                conn.execute(insert(tabla), lote)
+            else:
+                conn.execute(stmt, lote)
+    return len(filas)
+
+def importar_flota(engine, df, prefijo=PREFIJO_SISTEMA, upsert=False, tam_lote=TAM_LOTE):
+    return insertar_flota(engine, preparar_flota(df, prefijo), upsert=upsert, tam_lote=tam_lote)
+
+# --- CLI ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa una planilla de embarcaciones a la base de datos.")
+    parser.add_argument('archivo', nargs='?', help="Excel/CSV de embarcaciones (por defecto el dataset datos_embarcaciones)")
+    parser.add_argument('--prefijo', default=PREFIJO_SISTEMA, help="Prefijo de los ids generados (<prefijo>-0000)")
+    parser.add_argument('--upsert', action='store_true', help="Actualiza los barcos que ya existan en lugar de fallar")
+    parser.add_argument('--tam-lote', type=int, default=TAM_LOTE, help="Filas por executemany")
+    args = parser.parse_args(argv)
+
+    ruta = args.archivo or fuentes.encontrar_archivo("datos_embarcaciones")
+    if not ruta:
+        print("❌ No se encontró la planilla de embarcaciones."); return 1
+    t0 = time.perf_counter()
+    df = fuentes.leer_tabla(ruta, **({} if ruta.lower().endswith('.csv') else fuentes.FUENTES["datos_embarcaciones"]))
+    t1 = time.perf_counter()
+    database.Base.metadata.create_all(bind=database.engine)
+    n = importar_flota(database.engine, df, prefijo=args.prefijo, upsert=args.upsert, tam_lote=args.tam_lote)
+    print(f"✅ {n} embarcaciones importadas de {ruta} (lectura {t1 - t0:.2f}s, inserción {time.perf_counter() - t1:.2f}s).")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
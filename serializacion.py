@@ -0,0 +1,33 @@
+import json
+import numpy as np
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # opcional: sin orjson se usa json estándar
+    orjson = None
+
+# --- MODO COLUMNAR PARA LISTADOS GRANDES ---
+# /bancos, /puertos y /embarcaciones aceptan ?formato=columnar (o el Accept de
+# abajo) y responden {"campo": [v0, v1, ...], ...} armado directo desde las
+# columnas numpy/pandas: sin un dict ni un modelo pydantic por fila. El formato
+# por filas sigue siendo el de siempre.
+TIPO_COLUMNAR = "application/vnd.ringensoft.columnar+json"
+
+def pide_columnar(request, formato=None):
+    return formato == "columnar" or TIPO_COLUMNAR in request.headers.get("accept", "")
+
+def _lista(v):
+    # orjson serializa arrays numéricos/bool nativamente; texto y objetos van como lista
+    if isinstance(v, np.ndarray):
+        if orjson is not None and v.dtype.kind in "biuf": return np.ascontiguousarray(v)
+        return v.tolist()
+    return list(v)
+
+def respuesta_columnar(columnas, headers=None):
+    datos = {k: _lista(v) for k, v in columnas.items()}
+    if orjson is not None:
+        cuerpo = orjson.dumps(datos, option=orjson.OPT_SERIALIZE_NUMPY)
+    else:
+        cuerpo = json.dumps(datos, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return Response(content=cuerpo, media_type=TIPO_COLUMNAR, headers=headers)
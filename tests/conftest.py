@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import importlib
+
+import numpy as np
+import pandas as pd
+
+import pytest
+
+# --- ENTORNO DE PRUEBAS ---
+# La carpeta del repo es el paquete (imports relativos, sin __init__.py): se importa
+# por su nombre desde la carpeta padre, igual que benchmark.py. La BD es un SQLite
+# temporal (la API lo usa con aiosqlite, ver database.url_async) y los datos son los
+# sintéticos de benchmark.py; todo se fija antes de importar la app.
+# Requiere pytest y aiosqlite:  python -m pytest -q  (desde la raíz del repo)
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAQUETE = os.path.basename(RAIZ)
+sys.path.insert(0, os.path.dirname(RAIZ))
+
+DIR_PRUEBAS = tempfile.mkdtemp(prefix="ringen-pruebas-")
+os.environ["RINGEN_DB_URL"] = f"sqlite:///{os.path.join(DIR_PRUEBAS, 'pruebas.db')}"
+os.environ["RINGEN_DIR_DATOS"] = DIR_PRUEBAS
+for variable in ("RINGEN_DB_URL_ASYNC", "RINGEN_SNAPSHOT_DIR", "RINGEN_RECARGA_INTERVALO"):
+    os.environ.pop(variable, None)
+
+BANCOS = 400
+BARCOS = 30
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(DIR_PRUEBAS, ignore_errors=True)
+
+def modulo(nombre):
+    return importlib.import_module(f"{PAQUETE}.{nombre}")
+
+@pytest.fixture(scope="session")
+def main():
+    modulo("benchmark").generar_dataset(DIR_PRUEBAS, BANCOS, BARCOS)
+    return modulo("main")
+
+@pytest.fixture(scope="session")
+def cliente(main):
+    from fastapi.testclient import TestClient
+    with TestClient(main.app) as c:
+        # Hasta que termine la carga completa (la flota del seeder no retiene /ready)
+        limite = time.time() + 60
+        while not main.estado_arranque.resumen()["terminado"] and time.time() < limite: time.sleep(0.05)
+        assert c.get("/ready").status_code == 200
+        yield c
+
+@pytest.fixture(scope="session")
+def cabeceras(cliente):
+    cliente.post("/auth/registro", json={"username": "pruebas", "password": "clave", "nombre_completo": "Pruebas"})
+    token = cliente.post("/auth/login", json={"username": "pruebas", "password": "clave"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+# Dataset chico armado en memoria (bancos al azar + CHIMBOTE) para publicacion/compartido
+def dataset_prueba(version, n=50, semilla=0):
+    rng = np.random.default_rng(semilla)
+    bancos = pd.DataFrame({"ID Banco": np.arange(1, n + 1), "Latitud": rng.uniform(-15, -6, n).round(6),
+                           "Longitud": rng.uniform(-80, -76, n).round(6), "Toneladas Estimadas": rng.uniform(5, 100, n).round(2),
+                           "Zona": ["norte"] * n})
+    puertos = pd.DataFrame({"id": ["CHIMBOTE"], "nombre": ["CHIMBOTE"], "latitud": [-9.08], "longitud": [-78.59]})
+    almacen_b = modulo("almacen").AlmacenBancos(bancos)
+    ids = almacen_b.ids.astype(str).tolist() + ["CHIMBOTE"]
+    matriz = modulo("distancias").MatrizDistancias(ids, np.append(almacen_b.lat, np.float32(-9.08)), np.append(almacen_b.lon, np.float32(-78.59)))
+    return modulo("publicacion").Dataset(version, bancos, puertos, almacen_b, matriz, firma=[["bancos.csv", 1, 2]])
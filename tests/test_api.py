@@ -0,0 +1,87 @@
+# --- API SOBRE SQLITE ASYNC (AIOSQLITE) ---
+RUTA = {"id_embarcacion": "SYSTEM-0001", "puerto_salida_id": "CHIMBOTE"}
+
+def test_salud(cliente):
+    assert cliente.get("/health").json()["estado"] == "OK"
+    resumen = cliente.get("/ready").json()
+    assert resumen["listo"] and resumen["fases"]["matriz"]["estado"] == "LISTO"
+
+def test_login_invalido(cliente):
+    assert cliente.post("/auth/login", json={"username": "pruebas", "password": "otra"}).status_code == 401
+    assert cliente.get("/embarcaciones", headers={"Authorization": "Bearer basura"}).status_code == 401
+
+def test_crud_embarcaciones(cliente, cabeceras):
+    nuevo = {"nombre": "Prueba", "capacidad_bodega": 250, "velocidad_promedio": 11, "consumo": 1.4,
+             "material": "ACERO", "tripulacion": 9, "anio_fabricacion": 2015}
+    r = cliente.post("/embarcaciones", json=nuevo, headers=cabeceras)
+    assert r.status_code == 200
+    barco = r.json()
+    assert barco["estado"] == "EN_PUERTO" and barco["capacidad_bodega"] == 250
+
+    flota = cliente.get("/embarcaciones", headers=cabeceras).json()
+    assert barco["id_embarcacion"] in [b["id_embarcacion"] for b in flota]
+
+    url = f"/embarcaciones/{barco['id_embarcacion']}/estado"
+    assert cliente.patch(url, json={"estado": "MANTENIMIENTO"}, headers=cabeceras).json()["estado"] == "MANTENIMIENTO"
+    assert cliente.patch(url, json={"estado": "HUNDIDO"}, headers=cabeceras).status_code == 400
+    assert cliente.patch("/embarcaciones/NO-EXISTE/estado", json={"estado": "EN_RUTA"}, headers=cabeceras).status_code == 404
+
+def test_reportes(cliente, cabeceras):
+    kpis = cliente.get("/kpis").json()
+    activos, total = (int(v) for v in kpis["flota_activa"].split(" / "))
+    assert 0 < activos <= total
+    dashboard = cliente.get("/reportes/dashboard")
+    assert dashboard.status_code == 200 and dashboard.json()["zonas_mas_activas"]
+
+    biomasa = cliente.get("/reportes/biomasa").json()
+    assert biomasa["bancos"] > 0
+    caja = cliente.get("/reportes/biomasa?bbox=-80,-12,-76,-8&exacto=true").json()
+    assert 0 <= caja["bancos"] <= biomasa["bancos"]
+
+def test_bancos_y_puertos(cliente):
+    bancos = cliente.get("/bancos?limite=50")
+    assert bancos.status_code == 200 and len(bancos.json()) <= 50
+    assert int(bancos.headers["X-Total-Count"]) >= len(bancos.json())
+    assert cliente.get("/bancos?limite=50", headers={"If-None-Match": bancos.headers["ETag"]}).status_code == 304
+    assert {p["id"] for p in cliente.get("/puertos").json()} >= {"CHIMBOTE", "CALLAO"}
+
+def test_optimizar_ruta(cliente):
+    r = cliente.post("/optimizar-ruta/", json=dict(RUTA, capacidad_actual=300))
+    assert r.status_code == 200
+    ruta = r.json()
+    secuencia = ruta["secuencia_ruta"]
+    assert secuencia[0]["id_nodo"] == secuencia[-1]["id_nodo"] == "CHIMBOTE"
+    assert 0 < ruta["carga_total_tm"] <= 300
+    cargas = [n["carga_acumulada"] for n in secuencia]
+    assert cargas == sorted(cargas)
+    # Misma petición: sale de la caché con el mismo resultado
+    assert cliente.post("/optimizar-ruta/", json=dict(RUTA, capacidad_actual=300)).json() == ruta
+
+def test_metrica_consultas_distancia(main, cliente):
+    contador = main.metricas.CONSULTAS_DISTANCIA
+    origenes = ("matriz_tramos", "matriz_busqueda_local", "indice_haversine")
+    antes = {o: contador.valor(origen=o) for o in origenes}
+    assert cliente.post("/optimizar-ruta/", json=dict(RUTA, capacidad_actual=450)).status_code == 200
+    assert all(contador.valor(origen=o) > antes[o] for o in origenes)
+    assert 'origen="indice_haversine"' in cliente.get("/metrics").text
+
+def test_invalidar_solo_tokens_del_usuario(main, cliente, cabeceras):
+    cliente.post("/auth/registro", json={"username": "efimero", "password": "clave", "nombre_completo": "Efímero"})
+    otro = {"Authorization": "Bearer " + cliente.post("/auth/login", json={"username": "efimero", "password": "clave"}).json()["access_token"]}
+    for c in (cabeceras, otro):
+        assert cliente.get("/embarcaciones", headers=c).status_code == 200
+    token_propio, token_otro = cabeceras["Authorization"][7:], otro["Authorization"][7:]
+    assert {token_propio, token_otro} <= set(main.auth.principales._datos)
+
+    # Cambio fuera de la API: lo detecta el listener del modelo
+    with main.database.SessionLocal() as db:
+        db.query(main.models.Usuario).filter_by(username="efimero").one().nombre_completo = "Otro nombre"
+        db.commit()
+    assert token_otro not in main.auth.principales._datos and token_propio in main.auth.principales._datos
+    assert cliente.get("/embarcaciones", headers=otro).status_code == 200
+
+    with main.database.SessionLocal() as db:
+        db.delete(db.query(main.models.Usuario).filter_by(username="efimero").one())
+        db.commit()
+    assert cliente.get("/embarcaciones", headers=otro).status_code == 401
+    assert cliente.get("/embarcaciones", headers=cabeceras).status_code == 200
@@ -0,0 +1,48 @@
+import numpy as np
+
+from conftest import modulo
+
+RejillaBiomasa = modulo("biomasa").RejillaBiomasa
+
+def _bancos(n=3000, semilla=11):
+    rng = np.random.default_rng(semilla)
+    return rng.uniform(-18, -4, n), rng.uniform(-82, -70, n), rng.uniform(5, 100, n)
+
+def _fuerza_bruta(lat, lon, ton, lat_min, lat_max, lon_min, lon_max):
+    dentro = (lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)
+    return ton[dentro].sum(), int(dentro.sum())
+
+def test_consultar_exacto_igual_a_fuerza_bruta():
+    lat, lon, ton = _bancos()
+    rejilla = RejillaBiomasa(lat, lon, ton)
+    rng = np.random.default_rng(3)
+    for _ in range(200):
+        la = np.sort(rng.uniform(-19, -3, 2)); lo = np.sort(rng.uniform(-83, -69, 2))
+        r = rejilla.consultar(la[0], la[1], lo[0], lo[1], exacto=True)
+        toneladas, bancos = _fuerza_bruta(lat, lon, ton, la[0], la[1], lo[0], lo[1])
+        assert r["bancos"] == bancos
+        assert np.isclose(r["toneladas"], toneladas, atol=1e-6)
+        # Sin exacto se suman las celdas que toca: nunca menos que lo que cae dentro
+        aprox = rejilla.consultar(la[0], la[1], lo[0], lo[1])
+        assert aprox["bancos"] >= bancos and aprox["toneladas"] >= toneladas - 1e-6
+
+def test_totales_y_fuera_de_rejilla():
+    lat, lon, ton = _bancos(500)
+    rejilla = RejillaBiomasa(lat, lon, ton)
+    total = rejilla.consultar()
+    assert total["bancos"] == 500 and np.isclose(total["toneladas"], ton.sum())
+    assert rejilla.consultar(10, 20, 10, 20) == {"toneladas": 0.0, "bancos": 0}
+    assert RejillaBiomasa([], [], []).consultar(exacto=True) == {"toneladas": 0.0, "bancos": 0}
+
+def test_calor_conserva_totales():
+    lat, lon, ton = _bancos(1000)
+    rejilla = RejillaBiomasa(lat, lon, ton)
+    for agrupar in (1, 3, 10):
+        capa = rejilla.calor(agrupar)
+        assert capa["bancos"].sum() == 1000 and np.isclose(capa["toneladas"].sum(), ton.sum())
+
+def test_bancos_en_celda():
+    lat, lon, ton = _bancos(400)
+    rejilla = RejillaBiomasa(lat, lon, ton)
+    vistos = np.concatenate([rejilla.bancos_en_celda(f, c) for f in range(rejilla.filas) for c in range(rejilla.columnas)])
+    assert sorted(vistos.tolist()) == list(range(400))
@@ -0,0 +1,45 @@
+import threading
+
+import numpy as np
+
+from conftest import modulo
+
+busqueda_local = modulo("busqueda_local")
+
+def _puntos(n, semilla):
+    rng = np.random.default_rng(semilla)
+    p = rng.uniform(0, 100, (n, 2))
+    return np.sqrt(((p[:, None, :] - p[None, :, :]) ** 2).sum(-1))
+
+def _ruta_inicial(n, semilla):
+    # Puerto 0 al inicio y al final, bancos en orden aleatorio
+    medio = np.random.default_rng(semilla).permutation(np.arange(1, n)).tolist()
+    return [0] + medio + [0]
+
+def test_no_alarga_y_conserva_extremos():
+    for semilla in range(5):
+        d = _puntos(40, semilla)
+        ruta = _ruta_inicial(40, semilla)
+        optima, distancia = busqueda_local.optimizar_ruta(ruta, d, tiempo_limite_ms=None)
+        assert optima[0] == ruta[0] and optima[-1] == ruta[-1]
+        assert sorted(optima[1:-1]) == sorted(ruta[1:-1])
+        assert distancia <= busqueda_local._longitud(ruta, d) + 1e-9
+        assert np.isclose(distancia, busqueda_local._longitud(optima, d))
+
+def test_optimo_local_2opt():
+    # Sin presupuesto termina con pasadas completas: ningún 2-opt mejora
+    d = _puntos(30, 7)
+    optima, distancia = busqueda_local.optimizar_ruta(_ruta_inicial(30, 7), d, tiempo_limite_ms=None)
+    n = len(optima)
+    for i in range(n - 2):
+        for j in range(i + 2, n - 1):
+            a, b, c, e = optima[i], optima[i + 1], optima[j], optima[j + 1]
+            assert d[a, c] + d[b, e] >= d[a, b] + d[c, e] - 1e-9
+
+def test_rutas_cortas_y_cancelacion():
+    d = _puntos(10, 1)
+    assert busqueda_local.optimizar_ruta([0, 3, 0], d) == ([0, 3, 0], busqueda_local._longitud([0, 3, 0], d))
+    cancelar = threading.Event(); cancelar.set()
+    ruta = _ruta_inicial(10, 1)
+    optima, _ = busqueda_local.optimizar_ruta(ruta, d, cancelar=cancelar)
+    assert sorted(optima) == sorted(ruta)
@@ -0,0 +1,68 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+from conftest import modulo
+
+CacheRutas = modulo("cache_rutas").CacheRutas
+
+def test_singleflight():
+    cache = CacheRutas()
+    llamadas, resultados = [], []
+    def calcular():
+        llamadas.append(1); time.sleep(0.1); return "ruta"
+    hilos = [threading.Thread(target=lambda: resultados.append(cache.obtener_o_calcular("k", calcular))) for _ in range(8)]
+    for h in hilos: h.start()
+    for h in hilos: h.join()
+    assert len(llamadas) == 1 and resultados == ["ruta"] * 8
+    assert cache.fallos == 1 and cache.aciertos == 7
+
+def test_singleflight_async():
+    cache = CacheRutas()
+    llamadas = []
+    async def calcular():
+        llamadas.append(1); await asyncio.sleep(0.05); return 42
+    async def varias():
+        return await asyncio.gather(*(cache.obtener_o_calcular_async("k", calcular) for _ in range(5)))
+    assert asyncio.run(varias()) == [42] * 5 and len(llamadas) == 1
+
+def test_invalidar_durante_el_calculo_no_guarda():
+    cache = CacheRutas()
+    def calcular():
+        cache.invalidar()  # llegan datos nuevos mientras se calcula
+        return "vieja"
+    assert cache.obtener_o_calcular("k", calcular) == "vieja"
+    assert len(cache) == 0
+    assert cache.obtener_o_calcular("k", lambda: "nueva") == "nueva" and len(cache) == 1
+
+def test_invalidar_con_predicado():
+    cache = CacheRutas()
+    for clave in [("A", 1), ("A", 2), ("B", 1)]: cache.obtener_o_calcular(clave, lambda: 0)
+    cache.invalidar(lambda clave: clave[0] == "A")
+    assert len(cache) == 1
+
+def test_lru_y_ttl():
+    cache = CacheRutas(max_entradas=2, ttl_segundos=0.05)
+    cache.obtener_o_calcular("a", lambda: 1)
+    cache.obtener_o_calcular("b", lambda: 2)
+    cache.obtener_o_calcular("a", lambda: 0)   # acierto: "a" pasa a ser la más reciente
+    cache.obtener_o_calcular("c", lambda: 3)   # desaloja "b"
+    assert cache.obtener_o_calcular("a", lambda: -1) == 1
+    assert cache.obtener_o_calcular("b", lambda: -2) == -2
+    time.sleep(0.06)
+    assert cache.obtener_o_calcular("a", lambda: -1) == -1
+
+def test_error_no_se_cachea():
+    cache = CacheRutas()
+    def falla(): raise ValueError("sin matriz")
+    with pytest.raises(ValueError): cache.obtener_o_calcular("k", falla)
+    assert cache.obtener_o_calcular("k", lambda: "ok") == "ok"
+
+def test_cachear():
+    cache = CacheRutas()
+    assert cache.obtener_o_calcular("k", lambda: None, cachear=lambda v: v is not None) is None
+    assert len(cache) == 0
+    cache.obtener_o_calcular("k", lambda: 1, cachear=lambda v: v is not None)
+    assert len(cache) == 1
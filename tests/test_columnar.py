@@ -0,0 +1,30 @@
+# --- MODO COLUMNAR (?formato=columnar / Accept) ---
+def test_columnar_igual_a_filas(cliente, cabeceras):
+    filas = cliente.get("/puertos").json()
+    columnas = cliente.get("/puertos?formato=columnar").json()
+    assert [p["id"] for p in filas] == columnas["id"]
+    assert [p["latitud"] for p in filas] == columnas["latitud"]
+
+    bancos = cliente.get("/bancos?limite=100").json()
+    por_accept = cliente.get("/bancos?limite=100", headers={"Accept": "application/vnd.ringensoft.columnar+json"})
+    columnas = cliente.get("/bancos?limite=100&formato=columnar").json()
+    assert [b["id"] for b in bancos] == columnas["id"]
+    assert [b["toneladas"] for b in bancos] == columnas["toneladas"]
+    assert por_accept.json() == columnas and por_accept.headers["content-type"].startswith("application/vnd.ringensoft.columnar+json")
+
+    flota = cliente.get("/embarcaciones", headers=cabeceras).json()
+    columnas = cliente.get("/embarcaciones?formato=columnar", headers=cabeceras).json()
+    assert columnas["id_embarcacion"] == [b["id_embarcacion"] for b in flota]
+
+def test_puertos_columnar_sin_puertos(main, cliente):
+    import pandas as pd
+    ds = main.datos.actual
+    vacio = main.publicacion.Dataset(ds.version + 1, ds.bancos, pd.DataFrame(), ds.almacen, ds.matriz, ds.indice,
+                                     ds.capa, ds.rejilla, ds.zonas, ds.firma)
+    main.datos.publicar(vacio)
+    try:
+        assert cliente.get("/puertos").json() == []
+        assert cliente.get("/puertos?formato=columnar").json()["id"] == []
+    finally:
+        main.datos.publicar(ds)
+
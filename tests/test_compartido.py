@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from conftest import modulo, dataset_prueba as _dataset
+
+publicacion = modulo("publicacion")
+compartido = modulo("compartido")
+
+# --- SNAPSHOT COMPARTIDO ---
+def test_escribir_y_abrir(tmp_path):
+    ds = _dataset(3)
+    cab = compartido.escribir(ds, str(tmp_path))
+    assert compartido.leer_cabecera(str(tmp_path)) == cab
+    bancos, puertos, almacen_b, matriz = compartido.abrir(str(tmp_path), cab)
+
+    assert matriz.ids == ds.matriz.ids and matriz.modelo == ds.matriz.modelo
+    assert isinstance(matriz.valores, np.memmap) and np.array_equal(matriz.valores, ds.matriz.valores)
+    assert np.array_equal(matriz.lat, ds.matriz.lat) and np.array_equal(matriz.lon, ds.matriz.lon)
+    for k in compartido.ARRAYS_ALMACEN:
+        assert np.array_equal(getattr(almacen_b, k), getattr(ds.almacen, k))
+    assert almacen_b.columnas == ds.almacen.columnas
+    # Columnas numéricas sobre memory-map: se comparan los valores
+    assert bancos.to_dict("list") == ds.bancos.to_dict("list")
+    assert puertos.to_dict("list") == ds.puertos.to_dict("list")
+    assert compartido.firma(cab) == (ds.firma, 3)
+
+def test_escribir_sin_datos(tmp_path):
+    vacio = publicacion.Dataset(1, pd.DataFrame(), pd.DataFrame())
+    bancos, puertos, almacen_b, matriz = compartido.abrir(str(tmp_path), compartido.escribir(vacio, str(tmp_path)))
+    assert bancos.empty and puertos.empty and almacen_b is None and matriz is None
+
+def test_obtener_arma_una_vez(tmp_path):
+    directorio, armados = str(tmp_path), []
+    def construir(version):
+        armados.append(version); return _dataset(version)
+    firma = [["bancos.csv", 1, 2]]
+    cab = compartido.obtener(directorio, firma, construir)
+    assert cab["version"] == 1 and compartido.obtener(directorio, firma, construir)["version"] == 1
+    assert armados == [1]
+    # Otros archivos o forzar: snapshot nuevo con la versión siguiente
+    assert compartido.obtener(directorio, [["bancos.csv", 1, 3]], construir)["version"] == 2
+    assert compartido.obtener(directorio, [["bancos.csv", 1, 3]], construir, forzar=True)["version"] == 3
+    assert armados == [1, 2, 3]
+    assert compartido.firma_vigilada(directorio, None, ("x", 0)) == ("x", 3)
+
+def test_limpiar_conserva_los_ultimos(tmp_path):
+    for v in range(1, 6): compartido.escribir(_dataset(v, n=5), str(tmp_path))
+    subdirectorios = sorted(p.name for p in tmp_path.iterdir() if p.name.startswith("v"))
+    assert subdirectorios == [f"v{v:06d}" for v in range(6 - compartido.CONSERVAR, 6)]
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from conftest import modulo
+
+distancias = modulo("distancias")
+
+def test_matriz_haversine():
+    lat, lon = np.array([-9.08, -12.05, -5.09]), np.array([-78.59, -77.15, -81.11])
+    m = distancias.MatrizDistancias(["CHIMBOTE", "CALLAO", "PAITA"], lat, lon)
+    assert m.valores.dtype == np.float32 and m.modelo == "haversine"
+    assert np.allclose(m.valores, m.valores.T) and not m.valores.diagonal().any()
+    assert np.isclose(m.distancia(m.idx("CHIMBOTE"), m.idx("CALLAO")), distancias.haversine_vectorizado(-9.08, -78.59, -12.05, -77.15), rtol=1e-6)
+
+def test_tope_de_nodos():
+    ids, lat, lon = [str(i) for i in range(11)], np.zeros(11), np.linspace(-80, -70, 11)
+    with pytest.raises(distancias.MatrizDemasiadoGrande):
+        distancias.MatrizDistancias(ids, lat, lon, max_nodos=10)
+    # Una matriz ya calculada (marítima, snapshot) no pasa por el tope
+    m = distancias.MatrizDistancias(ids, lat, lon, valores=np.zeros((11, 11), dtype=np.float32), max_nodos=10)
+    assert m.modelo == "maritimo" and len(m) == 11
+
+def test_ruteo_sin_matriz_responde_503(main, cliente):
+    ds = main.datos.actual
+    sin_matriz = main.publicacion.Dataset(ds.version + 1, ds.bancos, ds.puertos, ds.almacen, None, ds.indice,
+                                          ds.capa, ds.rejilla, ds.zonas, ds.firma)
+    main.datos.publicar(sin_matriz)
+    try:
+        r = cliente.post("/optimizar-ruta/", json={"id_embarcacion": "SYSTEM-0001", "puerto_salida_id": "CHIMBOTE"})
+        assert r.status_code == 503
+        assert cliente.get("/bancos?limite=10").status_code == 200
+    finally:
+        main.datos.publicar(ds)
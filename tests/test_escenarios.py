@@ -0,0 +1,37 @@
+import numpy as np
+
+from conftest import modulo
+
+escenarios = modulo("escenarios")
+
+RUTA = {"id_embarcacion": "SYSTEM-0001", "puerto_salida_id": "CHIMBOTE"}
+
+def test_evaluar_igual_al_bucle_por_tramo():
+    rng = np.random.default_rng(2)
+    d = rng.uniform(1, 40, 12)
+    disponible = np.concatenate(([0.0], rng.uniform(5, 60, 11), [0.0]))
+    tabla = escenarios.evaluar(d, disponible, 1.5, 1.1, [10.0, 14.0], [80.0, 300.0], [6, 12])
+    k = 0
+    for vel in (10.0, 14.0):
+        for cap in (80.0, 300.0):
+            for trip in (6, 12):
+                carga, galones = 0.0, 0.0
+                for tramo, oferta in zip(d, disponible[:-1]):
+                    carga = min(carga + oferta, cap)
+                    galones += tramo * (1 + 0.5 * carga / cap)
+                galones *= 1.5 * 1.1 * (1 + trip * 0.005)
+                assert np.isclose(tabla["consumo_galones"][k], galones)
+                assert np.isclose(tabla["tiempo_horas"][k], d.sum() / (vel * 1.852))
+                assert tabla["carga_tm"][k] == min(disponible.sum(), cap)
+                k += 1
+
+def test_escenarios(cliente):
+    r = cliente.post("/optimizar-ruta/escenarios", json=dict(RUTA, velocidades=[8, 12], capacidades=[100, 300], tripulaciones=[5]))
+    assert r.status_code == 200
+    tabla = r.json()["escenarios"]
+    assert r.json()["n_escenarios"] == 4
+    # Más velocidad, menos horas; el consumo no depende de la velocidad
+    assert tabla["tiempo_horas"][0] > tabla["tiempo_horas"][2]
+    assert np.allclose(tabla["consumo_galones"][:2], tabla["consumo_galones"][2:])
+    assert cliente.post("/optimizar-ruta/escenarios", json=dict(RUTA, capacidades=[0.0001])).status_code == 422
+
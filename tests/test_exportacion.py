@@ -0,0 +1,64 @@
+import gzip
+import json
+
+import pandas as pd
+
+from conftest import modulo
+
+exportacion = modulo("exportacion")
+
+BBOX = (-80, -12, -76, -8)  # lon_min, lat_min, lon_max, lat_max
+SIN_GZIP = {"Accept-Encoding": "identity"}  # httpx pide gzip por defecto
+
+def _filtrados(main, bbox=None, toneladas_min=None):
+    ds = main.datos.actual
+    columnas = ds.almacen.columnas
+    df = ds.bancos
+    ok = pd.Series(True, index=df.index)
+    if bbox is not None:
+        ok &= df[columnas["longitud"]].between(bbox[0], bbox[2]) & df[columnas["latitud"]].between(bbox[1], bbox[3])
+    if toneladas_min is not None:
+        ok &= df[columnas["toneladas"]] >= toneladas_min
+    return df[ok], columnas
+
+def test_ndjson_completo(main, cliente):
+    r = cliente.get("/bancos/exportar", headers=SIN_GZIP)
+    assert r.status_code == 200 and r.headers["content-type"].startswith("application/x-ndjson")
+    assert "content-encoding" not in r.headers
+    filas = [json.loads(linea) for linea in r.text.splitlines()]
+    esperado, columnas = _filtrados(main)
+    assert len(filas) == len(esperado) > 0
+    assert [f[columnas["latitud"]] for f in filas] == esperado[columnas["latitud"]].tolist()
+
+def test_ndjson_filtrado(main, cliente):
+    toneladas_min = 50
+    r = cliente.get("/bancos/exportar", params={"bbox": ",".join(map(str, BBOX)), "toneladas_min": toneladas_min}, headers=SIN_GZIP)
+    filas = [json.loads(linea) for linea in r.text.splitlines()]
+    esperado, columnas = _filtrados(main, BBOX, toneladas_min)
+    assert 0 < len(filas) == len(esperado) < len(main.datos.actual.bancos)
+    for f in filas:
+        assert BBOX[1] <= f[columnas["latitud"]] <= BBOX[3] and BBOX[0] <= f[columnas["longitud"]] <= BBOX[2]
+        assert f[columnas["toneladas"]] >= toneladas_min
+
+def test_geojson_gzip(main, cliente):
+    params = {"formato": "geojson", "bbox": ",".join(map(str, BBOX))}
+    with cliente.stream("GET", "/bancos/exportar", params=params, headers={"Accept-Encoding": "gzip"}) as r:
+        assert r.headers["content-encoding"] == "gzip" and r.headers["content-type"].startswith("application/geo+json")
+        crudo = b"".join(r.iter_raw())
+    coleccion = json.loads(gzip.decompress(crudo))
+    esperado, columnas = _filtrados(main, BBOX)
+    assert coleccion["type"] == "FeatureCollection" and len(coleccion["features"]) == len(esperado) > 0
+    for f in coleccion["features"]:
+        props = f["properties"]
+        assert f["geometry"] == {"type": "Point", "coordinates": [props[columnas["longitud"]], props[columnas["latitud"]]]}
+
+def test_geojson_por_bloques():
+    # Bloques chicos con filtro: los primeros quedan vacíos y el JSON sigue siendo válido
+    df = pd.DataFrame({"Latitud": [-9.0 - i * 0.1 for i in range(23)], "Longitud": [-78.0] * 23,
+                       "Toneladas Estimadas": [float(i) for i in range(23)]})
+    partes = list(exportacion.geojson(df, toneladas_min=9, filas_por_bloque=4))
+    features = json.loads("".join(partes))["features"]
+    assert [f["properties"]["Toneladas Estimadas"] for f in features] == [float(i) for i in range(9, 23)]
+    lineas = "".join(exportacion.ndjson(df, toneladas_max=2, filas_por_bloque=2)).splitlines()
+    assert [json.loads(l)["Toneladas Estimadas"] for l in lineas] == [0.0, 1.0, 2.0]
+    assert json.loads(gzip.decompress(b"".join(exportacion.gzip(iter(partes))))) == json.loads("".join(partes))
@@ -0,0 +1,64 @@
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from conftest import modulo
+
+flota = modulo("flota")
+
+def _caso(bancos, semilla):
+    rng = np.random.default_rng(semilla)
+    p = rng.uniform(0, 100, (bancos + 1, 2))
+    d = np.sqrt(((p[:, None, :] - p[None, :, :]) ** 2).sum(-1))
+    return d, list(range(1, bancos + 1)), rng.uniform(5, 60, bancos)
+
+def test_ahorros_respeta_capacidad():
+    d, pool, demandas = _caso(25, 3)
+    locales = [0] + pool
+    rutas = flota._ahorros(d[np.ix_(locales, locales)], demandas, 120.0)
+    visitados = sorted(n for r, _ in rutas for n in r)
+    assert visitados == list(range(1, len(pool) + 1))
+    for r, carga in rutas:
+        assert np.isclose(carga, sum(demandas[n - 1] for n in r))
+        assert len(r) == 1 or carga <= 120.0 + 1e-9
+
+@pytest.mark.parametrize("semilla", range(8))
+def test_resolver_flota(semilla):
+    d, pool, demandas = _caso(30, semilla)
+    capacidades = [150.0, 100.0, 80.0]
+    resultado = flota.resolver_flota(0, capacidades, pool, demandas, d, tiempo_limite_ms=500)
+    assert len(resultado) == len(capacidades)
+    recogido = defaultdict(float)
+    for (ruta, recogidas, base, final), cap in zip(resultado, capacidades):
+        assert ruta[0] == ruta[-1] == 0
+        assert len(recogidas) == len(ruta) and recogidas[0] == recogidas[-1] == 0.0
+        assert sum(recogidas) <= cap + 1e-6
+        # La búsqueda local no alarga la ruta que recibe (la de después de los intercambios)
+        assert final <= base + 1e-6
+        assert np.isclose(final, flota.busqueda_local._longitud(ruta, d))
+        for nodo, t in zip(ruta, recogidas): recogido[nodo] += t
+    # Cada banco se reparte una sola vez entre la flota
+    for k, nodo in enumerate(pool):
+        assert recogido[nodo] <= demandas[k] + 1e-6
+    assert sum(recogido.values()) <= min(sum(capacidades), demandas.sum()) + 1e-6
+
+def test_intercambios_no_alargan_la_flota():
+    # Los intercambios pueden alargar la ruta de un barco, pero cada movimiento baja el total
+    for semilla in range(5):
+        d, pool, demandas = _caso(40, semilla)
+        capacidades = [200.0, 150.0, 120.0, 90.0]
+        dl = d.tolist()
+        rutas = flota._ahorros(d, demandas, max(capacidades))
+        paradas, recogidas, restante = flota._asignar(rutas, capacidades, demandas, dl)
+        antes = sum(flota._longitud(dl, p) for p in paradas)
+        cargas = sorted(p for r in recogidas for p in r)
+        vecinos = np.argsort(d, axis=1, kind='stable')[:, 1:flota.VECINOS_INTERCAMBIO + 1].tolist()
+        flota._intercambios(paradas, recogidas, capacidades, dl, vecinos, float("inf"))
+        assert sum(flota._longitud(dl, p) for p in paradas) <= antes + 1e-9
+        assert sorted(p for r in recogidas for p in r) == cargas
+        for r, cap in zip(recogidas, capacidades): assert sum(r) <= cap + 1e-6
+
+def test_sin_bancos():
+    d, _, _ = _caso(3, 1)
+    assert flota.resolver_flota(0, [100.0], [], [], d) == [([0, 0], [0.0, 0.0], 0.0, 0.0)]
@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import modulo
+
+fuentes = modulo("fuentes")
+
+@pytest.fixture
+def csv(tmp_path):
+    ruta = tmp_path / "bancos.csv"
+    pd.DataFrame({"ID Banco": [1, 2, 3], "Latitud": [-9.1, -9.2, None], "Zona": ["norte", None, "sur"]}).to_csv(ruta, index=False)
+    return str(ruta)
+
+@pytest.fixture
+def parseos(monkeypatch):
+    # Cuenta las lecturas del archivo original (las que la caché evita)
+    llamadas = []
+    original = fuentes._parsear
+    def contar(ruta, opciones):
+        llamadas.append(ruta); return original(ruta, opciones)
+    monkeypatch.setattr(fuentes, "_parsear", contar)
+    return llamadas
+
+def _caches(ruta):
+    d = os.path.join(os.path.dirname(ruta), fuentes.DIR_CACHE)
+    return sorted(os.listdir(d)) if os.path.isdir(d) else []
+
+def test_acierto_de_cache(csv, parseos):
+    original = fuentes.leer_tabla(csv)
+    cacheado = fuentes.leer_tabla(csv)
+    assert len(parseos) == 1 and len(_caches(csv)) == 1
+    assert isinstance(cacheado["ID Banco"].values.base, np.memmap)  # columnas numéricas sin copia
+    assert cacheado["ID Banco"].tolist() == original["ID Banco"].tolist()
+    assert np.isnan(cacheado["Latitud"].iloc[2]) and cacheado["Zona"].isna().tolist() == [False, True, False]
+
+def test_invalida_si_cambia_el_archivo(csv, parseos):
+    fuentes.leer_tabla(csv)
+    anterior = _caches(csv)
+    st = os.stat(csv)
+    os.utime(csv, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    fuentes.leer_tabla(csv)
+    assert len(parseos) == 2
+    nuevas = _caches(csv)
+    assert len(nuevas) == 1 and nuevas != anterior  # la versión vieja se borra
+
+@pytest.mark.parametrize("danar", ["columnas", "npy"])
+def test_reconstruye_si_esta_corrupta(csv, parseos, danar):
+    esperado = fuentes.leer_tabla(csv)
+    destino = os.path.join(os.path.dirname(csv), fuentes.DIR_CACHE, _caches(csv)[0])
+    archivo = "columnas.json" if danar == "columnas" else "0.npy"
+    with open(os.path.join(destino, archivo), "w") as f: f.write("basura")
+    df = fuentes.leer_tabla(csv)
+    assert len(parseos) == 2 and df["ID Banco"].tolist() == esperado["ID Banco"].tolist()
+    # Se reescribió: la siguiente lectura vuelve a salir de la caché
+    fuentes.leer_tabla(csv)
+    assert len(parseos) == 2
@@ -0,0 +1,55 @@
+import numpy as np
+
+from conftest import modulo, dataset_prueba as _dataset
+
+navegacion = modulo("navegacion")
+litoral = modulo("litoral")
+distancias = modulo("distancias")
+espacial = modulo("espacial")
+publicacion = modulo("publicacion")
+
+# Mar cuadrado (lon -82..-78, lat -10..-6) con una península de tierra que entra
+# desde el este hasta lon -80, entre lat -7.9 y -8.1
+MAR = np.array([[-82, -6], [-78, -6], [-78, -7.9], [-80, -7.9], [-80, -8.1], [-78, -8.1],
+                [-78, -10], [-82, -10], [-82, -6]], dtype=np.float64)
+PUNTA_NORTE, PUNTA_SUR = (-7.9, -80.0), (-8.1, -80.0)
+
+def _hav(a, b):
+    return float(distancias.haversine_vectorizado(a[0], a[1], b[0], b[1]))
+
+def test_tramo_dobla_la_punta():
+    # lat/lon: 0 y 1 a cada lado de la península, 2 se ve con 0, 3 en tierra
+    lat = np.array([-7.5, -8.5, -7.0, -8.0]); lon = np.array([-79.0, -79.0, -81.0, -78.5])
+    valores, info = navegacion.calcular(lat, lon, costa=navegacion.Costa([MAR]), mascara=litoral.MascaraMar([MAR]))
+    recto = distancias.haversine_vectorizado(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+
+    assert valores.shape == (4, 4) and np.allclose(valores, valores.T) and not np.diag(valores).any()
+    assert (valores >= recto * (1 - 1e-5)).all()
+    assert info["nodos_anclados"] == 1 and info["tramos_sin_camino"] == 0
+    # Se ven: línea recta
+    assert valores[0, 2] == np.float32(recto[0, 2])
+    # Tapados por la península: el camino va por el mar, alrededor de la punta
+    por_la_punta = _hav((lat[0], lon[0]), PUNTA_NORTE) + _hav(PUNTA_NORTE, PUNTA_SUR) + _hav(PUNTA_SUR, (lat[1], lon[1]))
+    assert por_la_punta * 0.999 <= valores[0, 1] <= por_la_punta * 1.05
+    assert valores[0, 1] > 2 * recto[0, 1]
+
+def test_greedy_ordena_por_la_matriz(main):
+    base = _dataset(1)
+    b = len(base.almacen.ids)
+    indice = espacial.IndiceEspacial(base.almacen.lat, base.almacen.lon)
+    nodo = {"idx": b, "lat": -9.08, "lon": -78.59}
+    cerca = int(np.argmin(base.matriz.valores[b, :b]))
+
+    def primer_banco(matriz):
+        ds = publicacion.Dataset(2, base.bancos, base.puertos, base.almacen, matriz, indice)
+        ruta, _ = main._fase_greedy(ds, nodo, cap_max=1)
+        return int(ruta.indices[1])
+
+    assert primer_banco(base.matriz) == cerca
+    # El más cercano en línea recta queda detrás de un cabo en la matriz marítima
+    valores = np.array(base.matriz.valores)
+    valores[b, cerca] = valores[cerca, b] = 590
+    maritima = distancias.MatrizDistancias(base.matriz.ids, base.matriz.lat, base.matriz.lon, valores=valores)
+    assert maritima.modelo == "maritimo"
+    primero = primer_banco(maritima)
+    assert primero != cerca and primero == int(np.argmin(valores[b, :b]))
@@ -0,0 +1,51 @@
+import gc
+import time
+
+import pytest
+
+from conftest import modulo, dataset_prueba as _dataset
+
+publicacion = modulo("publicacion")
+
+# --- PUBLICADOR ---
+def test_dataset_inmutable():
+    ds = _dataset(1)
+    with pytest.raises(AttributeError): ds.version = 2
+
+def test_publicar_y_soltar_versiones():
+    datos = publicacion.Publicador()
+    datos.publicar(_dataset(datos.siguiente_version()))
+    viejo = datos.actual
+    datos.publicar(_dataset(datos.siguiente_version()))
+    assert datos.actual.version == 2 and datos.vivos() == [1, 2]
+    del viejo; gc.collect()
+    assert datos.vivos() == [2]
+    # Una versión publicada desde fuera (snapshot compartido) adelanta el contador
+    datos.publicar(_dataset(7))
+    assert datos.siguiente_version() == 8
+
+def _esperar(datos):
+    limite = time.time() + 10
+    while datos.recargando and time.time() < limite: time.sleep(0.01)
+
+def test_recarga_fallida_conserva_el_actual():
+    datos = publicacion.Publicador()
+    datos.publicar(_dataset(datos.siguiente_version()))
+    def falla(version): raise ValueError("archivo corrupto")
+    assert datos.recargar(falla)
+    _esperar(datos)
+    assert datos.actual.version == 1 and datos.ultima_recarga["estado"] == "ERROR"
+    assert datos.recargar(lambda v: _dataset(v))
+    _esperar(datos)
+    assert datos.actual.version == 3 and datos.ultima_recarga["estado"] == "LISTO"
+
+# --- RECARGA EN CALIENTE (API) ---
+RUTA = {"id_embarcacion": "SYSTEM-0001", "puerto_salida_id": "CHIMBOTE"}
+
+def test_recarga_publica_version_nueva(main, cliente, cabeceras):
+    version = cliente.get("/datos/version").json()["version"]
+    assert cliente.post("/datos/recargar", headers=cabeceras).status_code == 202
+    limite = time.time() + 30
+    while main.datos.recargando and time.time() < limite: time.sleep(0.05)
+    assert cliente.get("/datos/version").json()["version"] > version
+    assert cliente.post("/optimizar-ruta/", json=dict(RUTA, capacidad_actual=300)).status_code == 200
@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from conftest import modulo
+
+semilla = modulo("semilla")
+
+PREFIJO = "SEMILLA"
+
+def _planilla(capacidades):
+    n = len(capacidades)
+    return pd.DataFrame({"Tipo de Casco": ["acero", "madera", "fibra"] * (n // 3) + ["acero"] * (n % 3),
+                         "Capacidad de Carga (TM)": capacidades, "Velocidad Promedio (nudos)": [11.5] * n,
+                         "Tripulación Máxima": [12.0] * n, "Año de Fabricación": [2001] * n})
+
+def _barcos(main):
+    with main.database.SessionLocal() as db:
+        filas = db.query(main.models.Embarcacion).filter(main.models.Embarcacion.id_embarcacion.like(f"{PREFIJO}-%"))
+        return {b.id_embarcacion: (b.nombre, b.capacidad_bodega, b.estado, b.owner_id) for b in filas}
+
+def test_preparar_flota():
+    filas = semilla.preparar_flota(pd.DataFrame({"Capacidad de Carga (TM)": ["250", None]}), prefijo="X")
+    assert [f["id_embarcacion"] for f in filas] == ["X-0000", "X-0001"]
+    assert [f["nombre"] for f in filas] == ["Ringen-001 NAV", "Ringen-002 NAV"]
+    assert [f["capacidad_bodega"] for f in filas] == [250.0, 0.0]
+    # Columnas que faltan en la planilla: valores por defecto
+    assert filas[0]["velocidad_promedio"] == 12.0 and filas[0]["tripulacion_maxima"] == 10 and filas[0]["owner_id"] is None
+
+def test_upsert_idempotente_y_actualiza(main, cliente, cabeceras):
+    engine = main.database.engine
+    assert semilla.importar_flota(engine, _planilla([100.0] * 7), prefijo=PREFIJO, upsert=True, tam_lote=3) == 7
+    antes = _barcos(main)
+    assert len(antes) == 7 and antes[f"{PREFIJO}-0001"] == ("Ringen-002 MAD", 100.0, "EN_PUERTO", None)
+
+    # Dos veces la misma planilla: mismas filas, nada duplicado
+    semilla.importar_flota(engine, _planilla([100.0] * 7), prefijo=PREFIJO, upsert=True, tam_lote=3)
+    assert _barcos(main) == antes
+
+    # Estado y dueño los cambia la app: el upsert solo toca las columnas de la planilla
+    with main.database.SessionLocal() as db:
+        id_usuario = db.query(main.models.Usuario).filter_by(username="pruebas").one().id_usuario
+        barco = db.get(main.models.Embarcacion, f"{PREFIJO}-0002")
+        barco.estado, barco.owner_id = "MANTENIMIENTO", id_usuario
+        db.commit()
+    semilla.importar_flota(engine, _planilla([100.0 + i for i in range(7)]), prefijo=PREFIJO, upsert=True, tam_lote=3)
+    despues = _barcos(main)
+    assert [despues[f"{PREFIJO}-{i:04d}"][1] for i in range(7)] == [100.0 + i for i in range(7)]
+    assert despues[f"{PREFIJO}-0002"][2:] == ("MANTENIMIENTO", id_usuario)
+
+    # Sin --upsert los ids repetidos fallan y la transacción no deja nada a medias
+    with pytest.raises(IntegrityError):
+        semilla.importar_flota(engine, _planilla([1.0] * 7), prefijo=PREFIJO, tam_lote=3)
+    assert _barcos(main) == despues
+
+def test_upsert_sin_soporte_nativo(main, cliente, monkeypatch):
+    # Motor sin INSERT ... ON CONFLICT: borra y vuelve a insertar cada lote
+    monkeypatch.setattr(semilla, "_sentencia_upsert", lambda dialecto, tabla, campos: None)
+    prefijo = f"{PREFIJO}B"
+    for capacidad in (50.0, 60.0):
+        semilla.importar_flota(main.database.engine, _planilla([capacidad] * 5), prefijo=prefijo, upsert=True, tam_lote=2)
+    with main.database.SessionLocal() as db:
+        barcos = db.query(main.models.Embarcacion).filter(main.models.Embarcacion.id_embarcacion.like(f"{prefijo}-%")).all()
+        assert len(barcos) == 5 and {b.capacidad_bodega for b in barcos} == {60.0}
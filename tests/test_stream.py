@@ -0,0 +1,72 @@
+import json
+import time
+import threading
+
+import anyio
+
+RUTA = {"id_embarcacion": "SYSTEM-0001", "puerto_salida_id": "CHIMBOTE", "capacidad_actual": 300}
+
+def _eventos(texto):
+    # "event: x\ndata: {...}\n\n" -> [(x, dict), ...]
+    salida = []
+    for bloque in texto.strip().split("\n\n"):
+        campos = dict(linea.split(": ", 1) for linea in bloque.splitlines())
+        salida.append((campos["event"], json.loads(campos["data"])))
+    return salida
+
+def test_secuencia_de_eventos(cliente):
+    r = cliente.post("/optimizar-ruta/stream", json=RUTA)
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/event-stream")
+    eventos = _eventos(r.text)
+    nombres = [e for e, _ in eventos]
+    assert nombres[0] == "greedy" and nombres[-1] == "final"
+    assert set(nombres[1:-1]) <= {"mejora"}
+
+    distancias = [d["distancia_total_km"] for _, d in eventos]
+    assert distancias[1:-1] == sorted(distancias[1:-1], reverse=True) and distancias[-1] <= distancias[0]
+    final = eventos[-1][1]
+    assert final["motivo"] == "convergencia"
+    # Mismo cálculo que /optimizar-ruta/ con la misma petición
+    assert final["ruta"] == cliente.post("/optimizar-ruta/", json=RUTA).json()
+    assert final["distancia_total_km"] == final["ruta"]["distancia_total_km"]
+
+def test_puerto_desconocido_antes_del_stream(cliente):
+    r = cliente.post("/optimizar-ruta/stream", json=dict(RUTA, puerto_salida_id="NO-EXISTE"))
+    assert r.status_code == 404 and r.headers["content-type"] == "application/json"
+    assert r.json()["detail"] == "Puerto no encontrado"
+
+def test_desconexion_cancela_la_busqueda(main, cliente, monkeypatch):
+    # Búsqueda local que solo termina cuando la cancelan (o a los 30 s)
+    cancelada = threading.Event()
+    def optimizar_ruta(ruta, matriz, cancelar=None, **_):
+        fin = time.monotonic() + 30
+        while not cancelar.is_set() and time.monotonic() < fin: time.sleep(0.01)
+        if cancelar.is_set(): cancelada.set()
+        return ruta, 0.0
+    monkeypatch.setattr(main.busqueda_local, "optimizar_ruta", optimizar_ruta)
+
+    # El TestClient junta toda la respuesta antes de devolverla: se habla ASGI
+    # directo (en el loop del cliente) y se corta después del primer evento
+    enviados = []
+    async def conversar():
+        primer_evento = anyio.Event()
+        cuerpo = json.dumps(dict(RUTA, tiempo_limite_ms=60000)).encode()
+        pedido = [{"type": "http.request", "body": cuerpo, "more_body": False}]
+        async def recibir():
+            if pedido: return pedido.pop()
+            await primer_evento.wait()
+            return {"type": "http.disconnect"}
+        async def enviar(mensaje):
+            enviados.append(mensaje)
+            if mensaje["type"] == "http.response.body" and mensaje.get("body"): primer_evento.set()
+        alcance = {"type": "http", "method": "POST", "path": "/optimizar-ruta/stream", "raw_path": b"/optimizar-ruta/stream",
+                   "query_string": b"", "root_path": "", "scheme": "http", "http_version": "1.1",
+                   "headers": [(b"content-type", b"application/json"), (b"host", b"testserver")],
+                   "client": ("testclient", 50000), "server": ("testserver", 80)}
+        with anyio.fail_after(20):
+            await main.app(alcance, recibir, enviar)
+
+    cliente.portal.call(conversar)
+    assert cancelada.wait(5)
+    cuerpos = b"".join(m.get("body", b"") for m in enviados if m["type"] == "http.response.body").decode()
+    assert [e for e, _ in _eventos(cuerpos)] == ["greedy"]
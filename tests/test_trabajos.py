@@ -0,0 +1,113 @@
+import time
+import asyncio
+
+import pytest
+
+from conftest import modulo
+
+trabajos = modulo("trabajos")
+
+# Corren en los procesos del pool (spawn): tienen que ser funciones de módulo
+def _esperar_cancelacion(cancelar, limite_s=30):
+    fin = time.monotonic() + limite_s
+    while not cancelar.is_set() and time.monotonic() < fin: time.sleep(0.01)
+    return "fin"
+
+def _sumar(cancelar, a, b):
+    return a + b
+
+async def _hasta(condicion, limite_s=60):
+    fin = time.monotonic() + limite_s
+    while not condicion():
+        assert time.monotonic() < fin, "tiempo agotado esperando el trabajo"
+        await asyncio.sleep(0.05)
+
+def test_cola_limites_y_cancelacion():
+    gestor = trabajos.GestorTrabajos(procesos=1, cola_max=5, por_usuario=4)
+
+    async def escenario():
+        propios = [gestor.enviar(1, _esperar_cancelacion) for _ in range(4)]
+        with pytest.raises(trabajos.LimiteUsuario):
+            gestor.enviar(1, _esperar_cancelacion)
+        ultimo = gestor.enviar(2, _esperar_cancelacion)
+        with pytest.raises(trabajos.ColaLlena):
+            gestor.enviar(3, _sumar, 1, 2)
+
+        # Con un proceso, el pool adelanta como mucho un par de trabajos: el último sigue en cola
+        primero = propios[0]
+        await _hasta(lambda: primero.a_dict()["estado"] == trabajos.EJECUTANDO)
+        assert ultimo.a_dict()["estado"] == trabajos.EN_COLA
+        assert gestor.cancelar(ultimo.id) and ultimo.estado == trabajos.CANCELADO
+
+        # En ejecución: la bandera compartida corta la espera dentro del proceso
+        assert gestor.cancelar(primero.id)
+        await _hasta(lambda: primero.terminado is not None)
+        assert primero.estado == trabajos.CANCELADO and primero.resultado is None
+
+        for t in propios[1:]: gestor.cancelar(t.id)
+        await _hasta(lambda: len(gestor) == 0)
+        assert not gestor.cancelar(primero.id)
+
+        # Con los cupos liberados la cola vuelve a aceptar trabajos
+        suma = gestor.enviar(3, _sumar, 1, 2)
+        await _hasta(lambda: suma.terminado is not None)
+        assert suma.estado == trabajos.TERMINADO and suma.resultado == 3
+        assert gestor.obtener(suma.id) is suma
+        assert gestor.por_estado() == {trabajos.CANCELADO: 5, trabajos.TERMINADO: 1}
+
+    try:
+        asyncio.run(escenario())
+    finally:
+        gestor.cerrar()
+
+RUTA = {"id_embarcacion": "SYSTEM-0001", "puerto_salida_id": "CHIMBOTE", "capacidad_actual": 300, "tiempo_limite_ms": 200}
+
+def _esperar_estado(cliente, cabeceras, id_trabajo, estados, limite_s=120):
+    fin = time.monotonic() + limite_s
+    while True:
+        trabajo = cliente.get(f"/optimizar-ruta/jobs/{id_trabajo}", headers=cabeceras).json()
+        if trabajo["estado"] in estados or time.monotonic() > fin: return trabajo
+        time.sleep(0.1)
+
+def test_trabajo_termina_y_queda_en_historial(main, cliente, cabeceras):
+    r = cliente.post("/optimizar-ruta/jobs", json=RUTA, headers=cabeceras)
+    assert r.status_code == 202 and r.headers["Location"].endswith(r.json()["id_trabajo"])
+    id_trabajo = r.json()["id_trabajo"]
+    trabajo = _esperar_estado(cliente, cabeceras, id_trabajo, (trabajos.TERMINADO, trabajos.ERROR))
+    assert trabajo["estado"] == trabajos.TERMINADO, trabajo.get("error")
+    assert trabajo["resultado"]["secuencia_ruta"][0]["id_nodo"] == "CHIMBOTE"
+
+    with main.database.SessionLocal() as db:
+        h = db.query(main.models.HistorialRuta).filter_by(id_trabajo=id_trabajo).one()
+        assert h.id_embarcacion == "SYSTEM-0001" and h.distancia_total_km == pytest.approx(trabajo["resultado"]["distancia_total_km"])
+    # Sin la copia en memoria, GET lo sigue encontrando en la BD
+    main.gestor_trabajos._terminados.pop(id_trabajo)
+    assert cliente.get(f"/optimizar-ruta/jobs/{id_trabajo}", headers=cabeceras).json()["estado"] == trabajos.TERMINADO
+
+    cliente.post("/auth/registro", json={"username": "ajeno", "password": "clave", "nombre_completo": "Ajeno"})
+    token = cliente.post("/auth/login", json={"username": "ajeno", "password": "clave"}).json()["access_token"]
+    assert cliente.get(f"/optimizar-ruta/jobs/{id_trabajo}", headers={"Authorization": f"Bearer {token}"}).status_code == 404
+
+def test_limites_de_cola_en_la_api(main, cliente, cabeceras, monkeypatch):
+    # Pool chico propio: un trabajo activo por usuario y uno en total
+    gestor = trabajos.GestorTrabajos(procesos=1, cola_max=1, por_usuario=1)
+    ds = main.datos.actual
+    gestor.publicar_snapshot(main._iniciar_proceso_rutas, ds.bancos, ds.puertos)
+    monkeypatch.setattr(main, "gestor_trabajos", gestor)
+    try:
+        # El proceso nuevo tarda en arrancar (spawn): el primer trabajo sigue activo
+        primero = cliente.post("/optimizar-ruta/jobs", json=RUTA, headers=cabeceras).json()["id_trabajo"]
+        r = cliente.post("/optimizar-ruta/jobs", json=RUTA, headers=cabeceras)
+        assert r.status_code == 429 and r.headers["Retry-After"] == "1"
+
+        cliente.post("/auth/registro", json={"username": "segundo", "password": "clave", "nombre_completo": "Segundo"})
+        token = cliente.post("/auth/login", json={"username": "segundo", "password": "clave"}).json()["access_token"]
+        r = cliente.post("/optimizar-ruta/jobs", json=RUTA, headers={"Authorization": f"Bearer {token}"})
+        assert r.status_code == 503 and r.headers["Retry-After"] == "1"
+
+        assert cliente.delete(f"/optimizar-ruta/jobs/{primero}", headers=cabeceras).status_code == 200
+        trabajo = _esperar_estado(cliente, cabeceras, primero, (trabajos.CANCELADO, trabajos.TERMINADO, trabajos.ERROR))
+        assert trabajo["estado"] == trabajos.CANCELADO and trabajo["resultado"] is None
+        assert cliente.post("/optimizar-ruta/jobs", json=RUTA, headers={"Authorization": f"Bearer {token}"}).status_code == 202
+    finally:
+        gestor.cerrar()
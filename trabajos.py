@@ -0,0 +1,171 @@
+import os
+import uuid
+import asyncio
+import threading
+import multiprocessing
+from collections import OrderedDict
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+
+# --- COLA DE TRABAJOS EN PROCESOS ---
+# Las optimizaciones pesadas no corren en el threadpool de FastAPI (el GIL las
+# serializa y frenan /kpis y el resto de rutas): van a un ProcessPoolExecutor.
+#   - Cada proceso recibe el snapshot de datos una sola vez (initializer).
+#   - Cola acotada: con COLA_MAX trabajos activos (en cola + ejecutando) se
+#     rechaza de inmediato (ColaLlena -> 503) en lugar de encolar sin límite.
+#   - Límite por usuario: POR_USUARIO trabajos activos (LimiteUsuario -> 429).
+#   - Cancelación: en cola se descarta; en ejecución se avisa al proceso con una
+#     bandera en memoria compartida (un byte por cupo) que la búsqueda consulta.
+PROCESOS = int(os.getenv("RINGEN_JOBS_PROCESOS", max(1, min(4, (os.cpu_count() or 2) - 1))))
+COLA_MAX = int(os.getenv("RINGEN_JOBS_COLA_MAX", 64))
+POR_USUARIO = int(os.getenv("RINGEN_JOBS_POR_USUARIO", 4))
+TERMINADOS_MAX = 1000  # trabajos terminados que se conservan en memoria (el resto, en la BD)
+
+EN_COLA, EJECUTANDO, TERMINADO, ERROR, CANCELADO = "EN_COLA", "EJECUTANDO", "TERMINADO", "ERROR", "CANCELADO"
+ACTIVOS = (EN_COLA, EJECUTANDO)
+
+class ColaLlena(Exception):
+    pass
+
+class LimiteUsuario(Exception):
+    pass
+
+# Banderas de cancelación, una por cupo. En los procesos del pool las deja
+# _iniciar_proceso; Cancelacion(cupo) se pasa como `cancelar` a la búsqueda local.
+_banderas = None
+
+class Cancelacion:
+    def __init__(self, cupo):
+        self.cupo = cupo
+
+    def is_set(self):
+        return _banderas is not None and _banderas[self.cupo] != 0
+
+def _iniciar_proceso(banderas, inicializar, args):
+    global _banderas
+    _banderas = banderas
+    if inicializar is not None: inicializar(*args)
+
+class Trabajo:
+    def __init__(self, id_usuario, cupo, datos=None):
+        self.id = uuid.uuid4().hex
+        self.id_usuario = id_usuario
+        self.cupo = cupo
+        self.datos = datos or {}
+        self.estado = EN_COLA
+        self.creado = datetime.now(timezone.utc)
+        self.terminado = None
+        self.resultado = None
+        self.error = None
+        self.futuro = None
+
+    def a_dict(self):
+        if self.estado == EN_COLA and self.futuro is not None and self.futuro.running(): self.estado = EJECUTANDO
+        return {
+            "id_trabajo": self.id, "estado": self.estado, **self.datos,
+            "creado": self.creado, "terminado": self.terminado,
+            "resultado": self.resultado, "error": self.error,
+        }
+
+class GestorTrabajos:
+    def __init__(self, procesos=PROCESOS, cola_max=COLA_MAX, por_usuario=POR_USUARIO, terminados_max=TERMINADOS_MAX):
+        self.procesos = procesos
+        self.cola_max = cola_max
+        self.por_usuario = por_usuario
+        self.terminados_max = terminados_max
+        self._contexto = multiprocessing.get_context("spawn")
+        self._banderas = self._contexto.RawArray('b', cola_max)
+        self._cupos_libres = list(range(cola_max))
+        self._activos = {}
+        self._terminados = OrderedDict()
+        self._pool = None
+        self._snapshot = (None, ())
+        self._lock = threading.Lock()
+        self._tareas = set()
+
+    def __len__(self):
+        return len(self._activos)
+
+    def por_estado(self):
+        with self._lock:
+            conteo = {}
+            for t in list(self._activos.values()) + list(self._terminados.values()):
+                conteo[t.estado] = conteo.get(t.estado, 0) + 1
+        return conteo
+
+    def publicar_snapshot(self, inicializar, *args):
+        # Datos nuevos: los trabajos que ya están en el pool terminan con el
+        # snapshot anterior; los siguientes usan un pool nuevo
+        with self._lock:
+            self._snapshot = (inicializar, args)
+            pool, self._pool = self._pool, None
+        if pool is not None: pool.shutdown(wait=False)
+
+    def _pool_actual(self):
+        if self._pool is None:
+            inicializar, args = self._snapshot
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.procesos, mp_context=self._contexto,
+                initializer=_iniciar_proceso, initargs=(self._banderas, inicializar, args)
+            )
+        return self._pool
+
+    def enviar(self, id_usuario, fn, *args, datos=None, al_terminar=None):
+        # fn(Cancelacion, *args) corre en un proceso del pool. al_terminar(trabajo)
+        # es una corrutina opcional (p. ej. guardar el resultado en la BD)
+        with self._lock:
+            if sum(1 for t in self._activos.values() if t.id_usuario == id_usuario) >= self.por_usuario:
+                raise LimiteUsuario()
+            if not self._cupos_libres:
+                raise ColaLlena()
+            trabajo = Trabajo(id_usuario, self._cupos_libres.pop(), datos)
+            self._banderas[trabajo.cupo] = 0
+            self._activos[trabajo.id] = trabajo
+            try:
+                trabajo.futuro = self._pool_actual().submit(fn, Cancelacion(trabajo.cupo), *args)
+            except Exception:
+                self._liberar(trabajo)
+                raise
+        tarea = asyncio.get_running_loop().create_task(self._esperar(trabajo, al_terminar))
+        self._tareas.add(tarea)
+        tarea.add_done_callback(self._tareas.discard)
+        return trabajo
+
+    async def _esperar(self, trabajo, al_terminar):
+        try:
+            trabajo.resultado = await asyncio.wrap_future(trabajo.futuro)
+            trabajo.estado = CANCELADO if self._banderas[trabajo.cupo] else TERMINADO
+        except asyncio.CancelledError:
+            trabajo.estado = CANCELADO
+        except Exception as e:
+            trabajo.estado, trabajo.error = ERROR, str(e) or type(e).__name__
+        trabajo.terminado = datetime.now(timezone.utc)
+        if trabajo.estado == CANCELADO: trabajo.resultado = None
+        with self._lock: self._liberar(trabajo)
+        if al_terminar is not None and trabajo.estado != CANCELADO:
+            await al_terminar(trabajo)
+
+    def _liberar(self, trabajo):
+        if self._activos.pop(trabajo.id, None) is None: return
+        self._cupos_libres.append(trabajo.cupo)
+        if trabajo.futuro is None: return
+        self._terminados[trabajo.id] = trabajo
+        while len(self._terminados) > self.terminados_max: self._terminados.popitem(last=False)
+
+    def obtener(self, id_trabajo):
+        with self._lock:
+            return self._activos.get(id_trabajo) or self._terminados.get(id_trabajo)
+
+    def cancelar(self, id_trabajo):
+        with self._lock:
+            trabajo = self._activos.get(id_trabajo)
+            if trabajo is None: return False
+            self._banderas[trabajo.cupo] = 1
+            if trabajo.futuro.cancel(): trabajo.estado = CANCELADO
+            return True
+
+    def cerrar(self):
+        with self._lock:
+            for t in self._activos.values(): self._banderas[t.cupo] = 1
+            pool, self._pool = self._pool, None
+        if pool is not None: pool.shutdown(wait=False, cancel_futures=True)